@@ -0,0 +1,56 @@
+import hashlib
+import hmac
+import os
+import secrets
+
+from ..cache_utils import TTLCache
+
+# ==============================
+# ==== VERIFIED-CREDENTIAL CACHE
+# ==============================
+# bcrypt.verify costs ~100-250 ms of CPU per request, so recently verified
+# credentials are remembered for a short time. Keys are an HMAC of
+# username + password with a per-process secret: the plaintext password is
+# never stored and the keys are useless outside this process.
+
+AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "1") == "1"
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+
+
+class CredentialCache:
+    def __init__(self, maxsize: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_TTL,
+                 enabled: bool = AUTH_CACHE_ENABLED):
+        self.enabled = enabled
+        self._secret = secrets.token_bytes(32)
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _key(self, username: str, password: str) -> str:
+        msg = username.encode("utf-8") + b"\x00" + password.encode("utf-8")
+        return hmac.new(self._secret, msg, hashlib.sha256).hexdigest()
+
+    def get(self, username: str, password: str):
+        """Return the cached user dict ({"username", "role"}) or None."""
+        if not self.enabled:
+            return None
+        user = self._cache.get(self._key(username, password))
+        return dict(user) if user else None
+
+    def put(self, username: str, password: str, user: dict):
+        if self.enabled:
+            self._cache.put(self._key(username, password), dict(user))
+
+    def invalidate_user(self, username: str) -> int:
+        return self._cache.pop_where(lambda u: u["username"] == username)
+
+    def invalidate_role(self, role: str) -> int:
+        return self._cache.pop_where(lambda u: u["role"].lower() == role.lower())
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, **self._cache.stats()}
+
+
+credential_cache = CredentialCache()
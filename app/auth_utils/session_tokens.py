@@ -0,0 +1,81 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+
+# ==============================
+# ===== SIGNED SESSION TOKENS ==
+# ==============================
+# /login issues a short-lived bearer token "<payload>.<signature>" where the
+# payload carries username, role and expiry. Verifying it is a single HMAC
+# check: no DB lookup, no bcrypt. Logout revokes a token by adding its id to
+# a small in-memory denylist that only holds entries until they would expire.
+
+SESSION_SECRET = os.getenv("SESSION_SECRET", "").encode("utf-8") or secrets.token_bytes(32)
+SESSION_TOKEN_TTL = int(os.getenv("SESSION_TOKEN_TTL", "1800"))
+
+_denylist = {}  # jti -> exp
+_denylist_lock = threading.Lock()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SESSION_SECRET, payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(username: str, role: str, ttl: int = SESSION_TOKEN_TTL) -> str:
+    claims = {
+        "sub": username,
+        "role": role,
+        "exp": int(time.time()) + ttl,
+        "jti": secrets.token_hex(8),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token: str):
+    """Return the token claims if the signature is valid, unexpired and not revoked; else None."""
+    try:
+        payload, signature = token.split(".")
+        # Non-ASCII input raises (UnicodeEncodeError is a ValueError, compare_digest a TypeError)
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+    except (ValueError, TypeError):
+        return None
+
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+
+    if claims.get("exp", 0) <= time.time():
+        return None
+    if claims.get("jti") in _denylist:
+        return None
+    return claims
+
+
+def revoke_token(token: str) -> bool:
+    claims = verify_token(token)
+    if not claims:
+        return False
+
+    now = time.time()
+    with _denylist_lock:
+        # Expired tokens fail verification anyway, so their ids can be dropped
+        for jti in [j for j, exp in _denylist.items() if exp <= now]:
+            del _denylist[jti]
+        _denylist[claims["jti"]] = claims["exp"]
+    return True
@@ -1,46 +1,50 @@
 import sqlite3
-import pandas as pd
 import os
+import time
+import asyncio
+import json
 from pathlib import Path
 from pydantic import BaseModel
-import duckdb
 
 from fastapi import FastAPI, UploadFile,File, Form, HTTPException, Depends
-from fastapi import BackgroundTasks
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from fastapi.responses import JSONResponse
-from langchain_community.embeddings.openai import OpenAIEmbeddings
+from fastapi.security import HTTPBasic, HTTPBasicCredentials, HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from passlib.hash import bcrypt
-from langchain_core.documents import Document
 
-from .rag_utils.rag_module import run_indexer,vectorstore,get_rag_chain
-from .rag_utils.query_classifier import detect_query_type_llm
-from .rag_utils.csv_query import ask_csv
-from .rag_utils.rag_chain import ask_rag
+from .rag_utils.rag_module import openai_embeddings,invalidate_rag_chains,sync_bm25_index
+from .rag_utils.query_router import QueryRouter, ROUTER_EMBEDDINGS
+from .rag_utils.csv_query import ask_csv, generate_sql, schema_catalog, fetch_sql_page
+from .rag_utils.rag_chain import ask_rag, retrieve_context, stream_rag_answer, document_sources
+from .rag_utils.index_queue import submit_index_job, get_index_job
+from .rag_utils.ingest import save_upload_stream, ingest_csv_to_duckdb
+from .rag_utils.index_version import get_index_version, bump_index_version
+from .rag_utils.answer_cache import answer_cache
+from .rag_utils.sql_cache import sql_cache
+from .rag_utils.semantic_cache import SemanticCache
+from .rag_utils.latency_stats import LatencyStats
+from .rag_utils.duckdb_manager import duckdb_manager
+from .rag_utils.db_pool import run_db
+from .auth_utils.credential_cache import credential_cache
+from .auth_utils.session_tokens import issue_token, verify_token, revoke_token, SESSION_TOKEN_TTL
 
 app = FastAPI()
-security = HTTPBasic()
+security = HTTPBasic(auto_error=False)
+bearer = HTTPBearer(auto_error=False)
 load_dotenv()
 
 # -------------------------
 # === DUCKDB SETUP ===
 # -------------------------
-# Set path to DuckDB database file
-DUCKDB_DIR = Path("static/data")
-DUCKDB_DIR.mkdir(parents=True, exist_ok=True)  # ensure directory exists
-
-DUCKDB_PATH = DUCKDB_DIR/"structured_queries.duckdb"
-
-# Connect to DuckDB file (creates file if not exists)
-duck_conn = duckdb.connect(str(DUCKDB_PATH))
-
-duck_conn.execute("""
-    CREATE TABLE IF NOT EXISTS tables_metadata (
-        table_name TEXT,
-        role TEXT
-    )
-""")
+# The DuckDB file (static/data/structured_queries.duckdb) is owned by duckdb_manager:
+# per-request read cursors, one writer. Read-only workers expect the schema to exist.
+if not duckdb_manager.read_only:
+    duckdb_manager.execute_write("""
+        CREATE TABLE IF NOT EXISTS tables_metadata (
+            table_name TEXT,
+            role TEXT
+        )
+    """)
 
 
 # -------------------------
@@ -68,11 +72,26 @@ CREATE TABLE IF NOT EXISTS documents (
     role TEXT,
     filepath TEXT NOT NULL,
     headers_str TEXT,
-    embedded INTEGER DEFAULT 0
+    embedded INTEGER DEFAULT 0,
+    content_hash TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chunk_manifest (
+    filepath TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    PRIMARY KEY (filepath, chunk_id)
 );
 """)
+
+# Columns added after the initial schema
+document_columns = {row[1] for row in c.execute("PRAGMA table_info(documents)")}
+if "content_hash" not in document_columns:
+    c.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
 conn.commit()
 
+# Keyword index for hybrid retrieval; backfilled from the vector store when it is missing chunks
+sync_bm25_index(c)
+
 def create_default_user():
     conn_local = sqlite3.connect("roles_docs.db")
     c_local = conn_local.cursor()
@@ -91,20 +110,58 @@ def create_default_user():
 # Call it on startup
 create_default_user()
 
+# Paraphrase-level answer cache, embedding questions with the shared (disk-cached) model
+semantic_cache = SemanticCache(openai_embeddings)
+
+# Local SQL/RAG router; the GPT classifier is only asked when it is unsure
+query_router = QueryRouter(openai_embeddings if ROUTER_EMBEDDINGS else None)
+with duckdb_manager.cursor() as cur:
+    query_router.refresh_schema(cur)
+
+# Rolling p50/p95 of /chat total time and /chat/stream time to first token
+chat_latency = LatencyStats()
+stream_latency = LatencyStats()
+
 # -------------------------
 # === AUTHENTICATION ===
 # -------------------------
-def authenticate(credentials: HTTPBasicCredentials = Depends(security)):
+def authenticate(
+    credentials: HTTPBasicCredentials = Depends(security),
+    token: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    # Bearer session token from /login: HMAC check only, no DB or bcrypt
+    if token:
+        claims = verify_token(token.credentials)
+        if not claims:
+            raise HTTPException(status_code=401, detail="Invalid or expired session token")
+        return {"username": claims["sub"], "role": claims["role"]}
+    return authenticate_basic(credentials)
+
+def authenticate_basic(credentials: HTTPBasicCredentials = Depends(security)):
+    # Username + password only; /login uses this so a token can't mint new tokens
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+
     username = credentials.username
     password = credentials.password
-    print("username: ", username)
-    print("password: ", password)
+
+    # Skip the DB lookup + bcrypt for recently verified credentials
+    cached = credential_cache.get(username, password)
+    if cached:
+        return cached
+
     c.execute("SELECT password, role FROM users WHERE username = ?", (username,))
     row = c.fetchone()
-    print("DB row:", row)
     if not row or not bcrypt.verify(password, row[0]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"username": username, "role": row[1]}
+
+    user = {"username": username, "role": row[1]}
+    credential_cache.put(username, password, user)
+    return user
 
 # === MODELS ===
 class ChatRequest(BaseModel):
@@ -114,8 +171,20 @@ class ChatRequest(BaseModel):
 # === ROUTES ===
 # -------------------------
 @app.get("/login")
-def login(user=Depends(authenticate)):
-    return {"message": f"Welcome {user['username']}!", "role": user["role"]}
+def login(user=Depends(authenticate_basic)):
+    return {
+        "message": f"Welcome {user['username']}!",
+        "role": user["role"],
+        "access_token": issue_token(user["username"], user["role"]),
+        "token_type": "bearer",
+        "expires_in": SESSION_TOKEN_TTL,
+    }
+
+@app.post("/logout")
+def logout(token: HTTPAuthorizationCredentials = Depends(bearer)):
+    if not token or not revoke_token(token.credentials):
+        raise HTTPException(status_code=401, detail="Invalid or expired session token")
+    return {"message": "Logged out"}
 
 @app.get("/roles")
 def get_roles(user=Depends(authenticate)):
@@ -123,6 +192,23 @@ def get_roles(user=Depends(authenticate)):
     roles = [r[0] for r in c.fetchall()]
     return {"roles": roles}
 
+@app.get("/metrics")
+def metrics(user=Depends(authenticate)):
+    if user["role"] != "C-Level":
+        raise HTTPException(status_code=403, detail="Only C-Level can view metrics.")
+    return {
+        "credential_cache": credential_cache.stats(),
+        "embedding_cache": openai_embeddings.stats(),
+        "answer_cache": answer_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "query_router": query_router.stats(),
+        "schema_catalog": schema_catalog.stats(),
+        "duckdb": duckdb_manager.stats(),
+        "sql_cache": sql_cache.stats(),
+        "chat_latency": chat_latency.stats(),
+        "chat_stream_latency": stream_latency.stats(),
+    }
+
 @app.post("/create-user")
 def create_user(
     username: str = Form(...),
@@ -141,6 +227,7 @@ def create_user(
     try:
         c.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", (username, hashed, role))
         conn.commit()
+        credential_cache.invalidate_user(username)
         return {"message": f"User '{username}' added with role '{role}'"}
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="User already exists")
@@ -153,6 +240,8 @@ def create_role(role_name: str = Form(...), user=Depends(authenticate)):
     try:
         c.execute("INSERT INTO roles (role_name) VALUES (?)", (role_name,))
         conn.commit()
+        credential_cache.invalidate_role(role_name)
+        invalidate_rag_chains()
         return {"message": f"Role '{role_name}' created"}
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="Role already exists")
@@ -161,6 +250,16 @@ def create_role(role_name: str = Form(...), user=Depends(authenticate)):
 
 UPLOAD_DIR = "static/uploads"
 
+def load_csv_table(filepath: str, table_name: str, role: str) -> list[str]:
+    # One writer at a time; chat SQL keeps reading on its own cursors meanwhile
+    with duckdb_manager.writer() as cur:
+        headers = ingest_csv_to_duckdb(cur, filepath, table_name)
+        cur.execute(
+            "INSERT INTO tables_metadata (table_name, role) VALUES (?, ?)",
+            (table_name, role)
+        )
+    return headers
+
 @app.post("/upload-docs")
 async def upload_docs(file: UploadFile = File(...), role: str = Form(...)):
     try:
@@ -172,36 +271,27 @@ async def upload_docs(file: UploadFile = File(...), role: str = Form(...)):
         os.makedirs(role_dir, exist_ok=True)
         filepath = os.path.join(role_dir, filename)
 
-        # Read content + save file
-        data = await file.read()  # Read once
-
-        with open(filepath, "wb") as f:
-            f.write(data)  # Save file for future indexing
-
-        # Convert to string content for validation (optional)
+        # Stream to disk in chunks (markdown is validated as UTF-8 on the way)
         if extension == ".csv":
-            from io import BytesIO
-            df = pd.read_csv(BytesIO(data))
-            content = df.to_string(index=False)
+            await save_upload_stream(file, filepath)
 
-             # Load for DuckDB
-            df1 = pd.read_csv(filepath)
+            # Single parse pass: DuckDB reads the saved file directly
             table_name = Path(filepath).stem.replace("-", "_")
+            if duckdb_manager.read_only:
+                raise HTTPException(status_code=503, detail="This worker's DuckDB file is read-only; CSV uploads are disabled.")
+            # ✅ Load the table and save metadata to DuckDB tables_metadata
+            headers = await run_db(load_csv_table, filepath, table_name, role)
+            bump_index_version(f"table {table_name} loaded")
 
             # Save metadata including headers
-            headers = df1.columns.tolist()
             headers_str = ",".join(headers)
 
-            duck_conn.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM df1")
-
-            # ✅ Save metadata to DuckDB tables_metadata
-            duck_conn.execute(
-                "INSERT INTO tables_metadata (table_name, role) VALUES (?, ?)",
-                (table_name, role)
-            )
+            with duckdb_manager.cursor() as cur:
+                query_router.refresh_schema(cur)
+            schema_catalog.invalidate(table_name)
 
         elif extension == ".md":
-            content = data.decode("utf-8")
+            await save_upload_stream(file, filepath, encoding="utf-8")
             headers_str = None  # explicitly set to None
             
         else:
@@ -210,18 +300,35 @@ async def upload_docs(file: UploadFile = File(...), role: str = Form(...)):
         # Save metadata to DB
         conn = sqlite3.connect("roles_docs.db")
         c = conn.cursor()
-        c.execute("INSERT INTO documents (filename, role, filepath,headers_str,embedded) VALUES (?, ?, ?,?,?)",
-                  (filename, role, filepath, headers_str,0))
+        # Re-uploads reuse the existing row; the indexer diffs chunks against the manifest
+        c.execute("UPDATE documents SET filename = ?, role = ?, headers_str = ?, embedded = 0 WHERE filepath = ?",
+                  (filename, role, headers_str, filepath))
+        if c.rowcount == 0:
+            c.execute("INSERT INTO documents (filename, role, filepath,headers_str,embedded) VALUES (?, ?, ?,?,?)",
+                      (filename, role, filepath, headers_str,0))
         #doc_id = c.lastrowid  # ✅ Get inserted doc ID
         conn.commit()
         conn.close()
-        
-        run_indexer()
-        print("Files indexed successfully")
-        return JSONResponse(content={"message": f"{filename} uploaded successfully for role '{role}'."})
 
+        # Embedding happens on the background index worker
+        job_id = submit_index_job(filename)
+        return JSONResponse(content={
+            "message": f"{filename} uploaded successfully for role '{role}'.",
+            "job_id": job_id,
+            "status_url": f"/index-jobs/{job_id}",
+        })
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+
+@app.get("/index-jobs/{job_id}")
+def index_job_status(job_id: str, user=Depends(authenticate)):
+    job = get_index_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown indexing job")
+    return job
     
    
 """
@@ -252,41 +359,230 @@ async def chat(req: ChatRequest, user=Depends(authenticate)):
         **({"sql": result["sql"]} if "sql" in result else {})
     }
 """
+# -------------------------
+# === SPECULATIVE CHAT ===
+# -------------------------
+# Opt-in: retrieval (and with SPECULATIVE_SQL also NL->SQL generation) run
+# concurrently with routing. The branch that loses is cancelled; when SQL
+# fails, the RAG fallback reuses the documents already retrieved.
+SPECULATIVE_CHAT = os.getenv("SPECULATIVE_CHAT", "0") == "1"
+SPECULATIVE_SQL = os.getenv("SPECULATIVE_SQL", "0") == "1"
+
+async def timed(stage: str, timings: dict, coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+def cancel_speculation(tasks: dict, timings: dict, keep=()):
+    for stage, task in tasks.items():
+        if stage not in keep and not task.done():
+            task.cancel()
+            timings.setdefault("cancelled", []).append(stage)
+
+def discard_speculation(tasks: dict):
+    """Cancel speculative tasks still running and consume failed ones' errors."""
+    for task in tasks.values():
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()   # marks it retrieved: no "Task exception was never retrieved"
+
+async def speculative_result(tasks: dict, stage: str):
+    """Result of a speculative stage, or None if it was not started, was cancelled or failed."""
+    task = tasks.get(stage)
+    if task is None or task.cancelled():
+        return None
+    try:
+        return await task
+    except Exception as e:
+        print(f"Speculative {stage} failed: {e}")
+        return None
+
+def chat_response(username: str, role: str, mode: str, fallback: bool, result: dict) -> dict:
+    """The answer body both /chat and /chat/stream cache, so a hit looks the same from either."""
+    return {
+        "user": username,
+        "role": role,
+        "mode": mode,
+        "fallback": fallback,
+        "answer": result["answer"],
+        **({"sql": result["sql"]} if "sql" in result else {}),
+        **({"sql_params": result["sql_params"]} if "sql_params" in result else {}),
+        **({"table": result["table"]} if "table" in result else {}),
+        "sources": result.get("sources", []),
+        "cached": False,
+    }
+
 @app.post("/chat")
 async def chat(req: ChatRequest, user=Depends(authenticate)):
     role = user["role"]
     username = user["username"]
     question = req.question
+    started = time.perf_counter()
+
+    # 0. Exact repeat for this role against the current data: serve from cache
+    version = get_index_version()
+    cached = answer_cache.get(role, question, version)
+    if cached:
+        return {**cached, "user": username, "cached": True}
+
+    # 0b. Paraphrase of an answered question for this role: skip classify/retrieve/generate
+    cached, similarity, question_vector = await semantic_cache.lookup(role, question, version)
+    if cached:
+        return {**cached, "user": username, "cached": True, "cache_similarity": round(similarity, 4)}
+
+    timings = {}
+
+    # Speculative mode: retrieval (and optionally NL->SQL) start while the question is routed
+    speculative = {}
+    if SPECULATIVE_CHAT:
+        speculative["retrieval"] = asyncio.create_task(
+            timed("retrieval", timings, retrieve_context(question, role)))
+        # Questions the NL->SQL cache or a learned template answers don't need a speculative translation
+        if SPECULATIVE_SQL and not sql_cache.covers(role, question, schema_catalog.version):
+            speculative["sql_generation"] = asyncio.create_task(
+                timed("sql_generation", timings, generate_sql(question, role)))
+
+    # Unused speculative tasks are cancelled even if routing or a handler raises
+    try:
+        # 1. Detect mode: SQL or RAG (local router, LLM only for low-confidence questions)
+        route = await timed("route", timings, query_router.aroute(question, vector=question_vector))
+        mode = route["mode"]
+        print(f"Detected mode: {mode} ({route['source']}, confidence {route['confidence']})")
+
+        result = {}
+        fallback_used = False
+
+        # 2. Route to appropriate handler
+        if mode == "SQL":
+            try:
+                sql = await speculative_result(speculative, "sql_generation")
+                result = await timed("sql", timings, ask_csv(question, role, username, return_sql=True, sql=sql))
+
+                if result.get("error") or not result.get("answer", "").strip():
+                    raise ValueError("SQL query blocked or failed")
+                cancel_speculation(speculative, timings)
+
+            except Exception as e:
+                print(f"[SQL Fallback Triggered] Error: {e}")
+                # Reuse documents the speculative retrieval already fetched
+                context = await speculative_result(speculative, "retrieval")
+                result = await timed("rag", timings, ask_rag(question, role, context=context))
+                fallback_used = True
+                mode = "SQL → fallback to RAG"
 
-    # 1. Detect mode: SQL or RAG
-    mode = detect_query_type_llm(question)
-    print(f"Detected mode: {mode}")
+        else:
+            cancel_speculation(speculative, timings, keep=("retrieval",))
+            context = await speculative_result(speculative, "retrieval")
+            result = await timed("rag", timings, ask_rag(question, role, context=context))
+    finally:
+        discard_speculation(speculative)
+
+    response = chat_response(username, role, mode, fallback_used, result)
+    if not result.get("error"):
+        answer_cache.put(role, question, version, response)
+        semantic_cache.store(role, question, version, response,
+                             latency=time.perf_counter() - started, vector=question_vector)
+
+    timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    chat_latency.record(total=timings["total"])
+    return {**response, "speculative": SPECULATIVE_CHAT, "timings_ms": timings}
+
+
+@app.get("/sql/page")
+async def sql_page(cursor: str, user=Depends(authenticate)):
+    """Next page of a truncated SQL answer (`table.next_cursor` from /chat)."""
+    page = await fetch_sql_page(cursor, user["role"])
+    if page is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired cursor")
+    if page.get("error"):
+        raise HTTPException(status_code=409, detail=page["answer"])
+    return page
 
-    result = {}
-    fallback_used = False
 
-    # 2. Route to appropriate handler
-    if mode == "SQL":
-        try:
-            result = await ask_csv(question, role, username, return_sql=True)
+# -------------------------
+# === STREAMING CHAT (SSE) ===
+# -------------------------
+# Events, in order:
+#   meta   {"mode", "sql"?, "sources", "cached"}   once the route / context is known
+#   token  {"text"}                                answer chunks as the model produces them
+#   done   {"ttft_ms", "total_ms", "fallback", "cached"}
+#   error  {"detail"}                              instead of done if the request failed
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, user=Depends(authenticate)):
+    role = user["role"]
+    username = user["username"]
+    question = req.question
 
-            if result.get("error") or not result.get("answer", "").strip():
-                raise ValueError("SQL query blocked or failed")
+    async def events():
+        started = time.perf_counter()
+        first_token = None
 
-        except Exception as e:
-            print(f"[SQL Fallback Triggered] Error: {e}")
-            result = await ask_rag(question, role)
-            fallback_used = True
-            mode = "SQL → fallback to RAG"
+        def ms(since=started):
+            return round((time.perf_counter() - since) * 1000, 1)
 
-    else:
-        result = await ask_rag(question, role)
+        try:
+            version = get_index_version()
+            cached = answer_cache.get(role, question, version)
+            question_vector = None
+            if not cached:
+                cached, _, question_vector = await semantic_cache.lookup(role, question, version)
+            if cached:
+                yield sse("meta", {"mode": cached["mode"], "sql": cached.get("sql"), "table": cached.get("table"),
+                                   "sources": cached.get("sources", []), "cached": True})
+                yield sse("token", {"text": cached["answer"]})
+                ttft = ms()
+                stream_latency.record(ttft=ttft, total=ttft)
+                yield sse("done", {"ttft_ms": ttft, "total_ms": ttft,
+                                   "fallback": cached.get("fallback", False), "cached": True})
+                return
+
+            route = await query_router.aroute(question, vector=question_vector)
+            mode = route["mode"]
+            fallback_used = False
+            result = None
+
+            if mode == "SQL":
+                result = await ask_csv(question, role, username, return_sql=True)
+                if result.get("error") or not result.get("answer", "").strip():
+                    print(f"[SQL Fallback Triggered] {result.get('answer')}")
+                    result = None
+                    fallback_used = True
+                    mode = "SQL → fallback to RAG"
+
+            if result is not None:
+                # SQL answers are complete tables: one token event
+                yield sse("meta", {"mode": mode, "sql": result.get("sql"), "table": result.get("table"),
+                                   "sources": [], "cached": False})
+                first_token = ms()
+                yield sse("token", {"text": result["answer"]})
+            else:
+                docs = await retrieve_context(question, role)
+                sources = document_sources(docs)
+                yield sse("meta", {"mode": mode, "sources": sources, "cached": False})
+                parts = []
+                async for text in stream_rag_answer(question, docs):
+                    if first_token is None:
+                        first_token = ms()
+                    parts.append(text)
+                    yield sse("token", {"text": text})
+                result = {"answer": "".join(parts), "sources": sources}
+
+            total = ms()
+            stream_latency.record(ttft=first_token, total=total)
+            response = chat_response(username, role, mode, fallback_used, result)
+            answer_cache.put(role, question, version, response)
+            semantic_cache.store(role, question, version, response, latency=total / 1000, vector=question_vector)
+            yield sse("done", {"ttft_ms": first_token, "total_ms": total, "fallback": fallback_used, "cached": False})
 
-    return {
-        "user": username,
-        "role": role,
-        "mode": mode,
-        "fallback": fallback_used,
-        "answer": result["answer"],
-        **({"sql": result["sql"]} if "sql" in result else {})
-    }
+        except Exception as e:
+            print(f"❌ Streaming chat failed: {e}")
+            yield sse("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
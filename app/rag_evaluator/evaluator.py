@@ -1,4 +1,9 @@
-from rag_module import vectorstore, model, chat_prompt  
+import sys
+from pathlib import Path
+
+# Import through the package so embeddings go through the shared on-disk cache
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.rag_utils.rag_module import vectorstore, model, chat_prompt, openai_embeddings
 
 from langchain.chains import RetrievalQA
 from langchain.schema import Document
@@ -118,3 +123,4 @@ if __name__ == "__main__":
     qa_list = generate_qa_dataset(docs)
     retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
     run_rag_eval(qa_list, retriever)
+    print("Embedding cache:", openai_embeddings.stats())
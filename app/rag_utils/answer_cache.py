@@ -0,0 +1,56 @@
+import os
+import re
+
+from ..cache_utils import TTLCache
+
+# ==============================
+# ===== EXACT ANSWER CACHE =====
+# ==============================
+# Repeated questions skip classification, retrieval and generation. Keys are
+# (role, normalized question, index version): answers never leak across roles
+# and are never served once the underlying documents or tables have changed.
+# A SQL answer is stored without its table's next_cursor: cursors expire after
+# SQL_CURSOR_TTL, long before a cached answer does.
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+
+
+def normalize_question(question: str) -> str:
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!. ")
+
+
+class AnswerCache:
+    def __init__(self, maxsize: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 enabled: bool = ANSWER_CACHE_ENABLED):
+        self.enabled = enabled
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _key(role: str, question: str, version: int):
+        return (role.lower(), normalize_question(question), version)
+
+    def get(self, role: str, question: str, version: int):
+        if not self.enabled:
+            return None
+        response = self._cache.get(self._key(role, question, version))
+        return dict(response) if response else None
+
+    def put(self, role: str, question: str, version: int, response: dict):
+        if not self.enabled:
+            return
+        response = dict(response)
+        if isinstance(response.get("table"), dict) and response["table"].get("next_cursor"):
+            response["table"] = {**response["table"], "next_cursor": None}
+        self._cache.put(self._key(role, question, version), response)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, **self._cache.stats()}
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,111 @@
+from pathlib import Path
+from collections import Counter
+
+import pandas as pd
+from langchain_core.documents import Document
+
+# ==============================
+# ===== CSV PROFILE DOCUMENTS ==
+# ==============================
+# Instead of one embedded Document per CSV row, a table is described by a
+# compact schema/profile document (columns, types, ranges, frequent values)
+# plus, optionally, one summary per group of rows. Row-level questions are
+# answered by the SQL agent over the same table in DuckDB.
+
+MAX_TRACKED_VALUES = 50   # beyond this many distinct values a column is treated as free text / ids
+TOP_VALUES = 8
+
+
+class _ColumnProfile:
+    def __init__(self, name):
+        self.name = name
+        self.numeric = True
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.total = 0.0
+        self.values = Counter()
+        self.high_cardinality = False
+        self.first = None
+        self.last = None
+
+    def update(self, series: pd.Series):
+        non_null = series.dropna()
+        self.count += len(series)
+        self.nulls += len(series) - len(non_null)
+        if non_null.empty:
+            return
+
+        if self.numeric and pd.api.types.is_numeric_dtype(non_null):
+            lo, hi = non_null.min(), non_null.max()
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+            self.total += float(non_null.sum())
+        else:
+            self.numeric = False
+
+        if self.first is None:
+            self.first = non_null.iloc[0]
+        self.last = non_null.iloc[-1]
+
+        if not self.high_cardinality:
+            self.values.update(non_null.astype(str).value_counts().to_dict())
+            if len(self.values) > MAX_TRACKED_VALUES:
+                self.high_cardinality = True
+                self.values.clear()
+
+    def describe(self) -> str:
+        non_null = self.count - self.nulls
+        nulls = f", {self.nulls} empty" if self.nulls else ""
+        if self.numeric and self.min is not None:
+            mean = self.total / non_null if non_null else 0
+            return f"- {self.name} (number): min {self.min}, max {self.max}, mean {mean:.2f}{nulls}"
+        if self.high_cardinality or (len(self.values) == non_null > TOP_VALUES):
+            return f"- {self.name} (text): mostly unique values, first {self.first}, last {self.last}{nulls}"
+        top = ", ".join(f"{v} ({n})" for v, n in self.values.most_common(TOP_VALUES))
+        return f"- {self.name} (text): {len(self.values)} distinct values: {top}{nulls}"
+
+
+def _profile(df: pd.DataFrame) -> list[str]:
+    columns = []
+    for name in df.columns:
+        col = _ColumnProfile(name)
+        col.update(df[name])
+        columns.append(col.describe())
+    return columns
+
+
+def profile_csv(filepath, role, group_rows=None) -> list[Document]:
+    """
+    Read the CSV in chunks (bounded memory) and return one profile Document for the
+    whole table, plus one summary Document per `group_rows` rows if `group_rows` is set.
+    """
+    path = Path(filepath)
+    table_name = path.stem.replace("-", "_")
+    metadata = {"role": role.lower(), "source": path.name}
+
+    profiles = {}
+    group_docs = []
+    rows = 0
+    for chunk in pd.read_csv(filepath, chunksize=group_rows or 10000):
+        for name in chunk.columns:
+            profiles.setdefault(name, _ColumnProfile(name)).update(chunk[name])
+
+        if group_rows:
+            content = "\n".join([
+                f"Table: {table_name} (from {path.name}), rows {rows + 1}-{rows + len(chunk)}",
+                "Columns:",
+                *_profile(chunk),
+            ])
+            group_docs.append(Document(page_content=content, metadata=dict(metadata)))
+        rows += len(chunk)
+
+    profile = "\n".join([
+        f"Table: {table_name} (from {path.name})",
+        f"Rows: {rows}",
+        f"Use SQL on table {table_name} for row-level questions (specific records, filters, aggregates).",
+        "Columns:",
+        *(col.describe() for col in profiles.values()),
+    ])
+    return [Document(page_content=profile, metadata=dict(metadata))] + group_docs
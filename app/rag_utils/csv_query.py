@@ -1,34 +1,34 @@
 import re
-import duckdb
-import os,tabulate
-from openai import OpenAI
-import sqlite3
 import os
-from pathlib import Path
+from openai import AsyncOpenAI
+from .db_pool import run_db
+from .duckdb_manager import duckdb_manager
+from .schema_catalog import SchemaCatalog
+from .sql_cache import sql_cache
+from .sql_results import fetch_page, columnar_json, markdown_preview, issue_cursor, resolve_cursor, QueryTimeout
 
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-DB_PATH = os.path.join(BASE_DIR, "roles_docs.db")
+# OpenAI setup
+aclient = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-# DuckDB setup
-DUCKDB_FILE = "static/data/structured_queries.duckdb"
-duck_conn = duckdb.connect(DUCKDB_FILE, read_only=False)
+# Reads go through the shared DuckDB manager, one cursor per call
+duck_fetch = duckdb_manager.fetch
 
-# OpenAI setup
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Per-table prompt schemas; invalidated by the upload endpoint when a table is (re)loaded
+schema_catalog = SchemaCatalog(duck_fetch)
 
 def get_allowed_tables_for_role(role: str) -> list[str]:
     if role.lower() == "c-level":
         query = "SELECT table_name FROM tables_metadata"
-        return [row[0] for row in duck_conn.execute(query).fetchall()]
+        return [row[0] for row in duck_fetch(query)[1]]
     elif role.lower() == "general":
         query = "SELECT table_name FROM tables_metadata WHERE role = 'general'"
-        return [row[0] for row in duck_conn.execute(query).fetchall()]
+        return [row[0] for row in duck_fetch(query)[1]]
     else:
         query = """
         SELECT table_name FROM tables_metadata
         WHERE role = ? OR role = 'general'
         """
-        return [row[0] for row in duck_conn.execute(query, [role]).fetchall()]
+        return [row[0] for row in duck_fetch(query, [role])[1]]
 
 def extract_tables_from_sql(sql: str) -> list[str]:
     # Extract tables used in FROM and JOIN clauses
@@ -43,41 +43,9 @@ def is_safe_query(sql: str) -> bool:
     lowered = sql.strip().lower().rstrip(";")
     return lowered.startswith("select") and all(word not in lowered for word in FORBIDDEN)
 
-def translate_nl_to_sql(question: str, allowed_tables: list[str]) -> str:
-    print("translate_nl_to_sql() called")
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    print("Using DB path:", DB_PATH)
-    cur = conn.cursor()
-
-    # fetch headers from table
-    cur.execute("""
-        SELECT filename, headers_str FROM documents 
-        WHERE embedded = 1 AND headers_str IS NOT NULL
-    """)
-    rows = cur.fetchall()
-    print("Raw rows from DB:", rows)
-    conn.close()
-
-    schemas = []
-    for filename, headers_str in rows:
-        try:
-            print("inside schemas")
-            table_name = Path(filename).stem.replace("-", "_")
-            print(table_name)
-            cols = ", ".join(headers_str.split(","))
-            print(cols)
-            schemas.append(f"Table: {table_name}\nColumns: {cols}")
-        except Exception as e:
-            print(f"❌ Error while building schema for {filename}: {e}")
-
-
-    print("Schemas:", schemas)
-
-    schema_block = "\n\n".join(schemas)
-    print("schema_block:\n", schema_block)
-
+def build_sql_prompt(question: str, schema_block: str) -> str:
     # Prompt for LLM
-    prompt = f"""
+    return f"""
     You are an assistant that converts natural language questions into safe SQL SELECT queries.
 
     Use only the following schemas:
@@ -95,8 +63,20 @@ def translate_nl_to_sql(question: str, allowed_tables: list[str]) -> str:
     SQL:
     """
 
+async def translate_nl_to_sql(question: str, allowed_tables: list[str]) -> str:
+    print("translate_nl_to_sql() called")
+
+    # Only the caller's tables, from the cached DuckDB catalog
+    schema_block = await run_db(schema_catalog.schema_block, allowed_tables)
+    if not schema_block:
+        print("No queryable tables for this role")
+        return "Error generating SQL"
+    print("schema_block:\n", schema_block)
+
+    prompt = build_sql_prompt(question, schema_block)
+
     try:
-        response = client.chat.completions.create(
+        response = await aclient.chat.completions.create(
             model="gpt-4",
             messages=[{"role": "user", "content": prompt}],
             temperature=0
@@ -115,34 +95,118 @@ def translate_nl_to_sql(question: str, allowed_tables: list[str]) -> str:
         return "Error generating SQL"
 
 #async def ask_csv(question: str, role: str) -> dict:
-async def ask_csv(question: str, role: str, username: str, return_sql: bool = False) -> dict:
-    allowed_tables = get_allowed_tables_for_role(role)
-
+async def generate_sql(question: str, role: str) -> str:
+    """NL->SQL for the role's tables, without executing it (used speculatively by /chat)."""
+    allowed_tables = await run_db(get_allowed_tables_for_role, role)
+    return await translate_nl_to_sql(question, allowed_tables)
+
+def check_sql(sql: str, allowed_tables: list[str]):
+    """Error response if `sql` must not run for this role, else None."""
+    if not is_safe_query(sql):
+        return {"answer": "Only SELECT queries are allowed.", "error": True}
+
+    raw_matches = extract_tables_from_sql(sql)
+    referenced_tables = flatten_matches(raw_matches)
+
+    for table in referenced_tables:
+        if table not in allowed_tables:
+            return {"answer": f"Access denied to table: {table}", "error": True}
+    return None
+
+def is_empty_answer(page: dict) -> bool:
+    """No rows, or a single row of NULL/zero values (what COUNT/SUM/AVG return when nothing matched)."""
+    table = page["arrow"]
+    if table.num_rows == 0:
+        return True
+    if table.num_rows == 1:
+        return all(value is None or value == 0 for value in table.to_pylist()[0].values())
+    return False
+
+def template_values_known(template, params: list, sql: str) -> bool:
+    """False if a string slot got a value its column doesn't hold (e.g. a city in a department slot)."""
+    tables = flatten_matches(extract_tables_from_sql(sql))
+    for column, value in template.string_filters(params):
+        known = [v for v in (schema_catalog.known_values(t, column) for t in tables) if v is not None]
+        if known and not any(value.lower() in {k.lower() for k in values} for values in known):
+            print(f"Template {template.id}: {value!r} is not a known {column} value")
+            return False
+    return True
+
+async def run_cached_sql(question: str, role: str, schema_version: int, allowed_tables: list[str]):
+    """(sql, params, page) from the NL->SQL cache, or None if it has nothing usable."""
+    cached = sql_cache.lookup(role, question, schema_version)
+    if not cached:
+        return None
+
+    sql, params, template = cached
     try:
-        sql = translate_nl_to_sql(question, allowed_tables)
-        print(f"[SQL GENERATED]:\n{sql}")
-
-        if not is_safe_query(sql):
-            return {"answer": "Only SELECT queries are allowed.", "error": True}
-
-        raw_matches = extract_tables_from_sql(sql)
-        referenced_tables = flatten_matches(raw_matches)
-
-        for table in referenced_tables:
-            if table not in allowed_tables:
-                return {"answer": f"Access denied to table: {table}", "error": True}
+        if check_sql(sql, allowed_tables):
+            raise ValueError("not allowed for this role")
+        if template is not None and not await run_db(template_values_known, template, params, sql):
+            raise ValueError("template slot value doesn't match its column")
+        page = await run_db(fetch_page, duckdb_manager, sql, params)
+    except Exception as e:
+        print(f"Cached SQL failed, translating again: {e}")
+        page = None
+
+    if template is not None and (page is None or is_empty_answer(page)):
+        sql_cache.reject(template)
+        return None
+    if page is None:
+        return None
+    print(f"[SQL FROM CACHE{' (template ' + template.id + ')' if template else ''}]:\n{sql} {params or ''}")
+    return sql, params, page
+
+def sql_response(page: dict, role: str, sql: str, params, schema_version: int) -> dict:
+    """Markdown preview plus the columnar table, with a cursor when more rows remain."""
+    next_cursor = None
+    if page["truncated"]:
+        next_cursor = issue_cursor(role, sql, params, page["offset"] + page["arrow"].num_rows, schema_version)
+    return {"answer": markdown_preview(page), "table": columnar_json(page, next_cursor)}
+
+async def fetch_sql_page(cursor: str, role: str):
+    """Next page of an earlier SQL answer, or None if the cursor is unknown/expired/another role's."""
+    state = resolve_cursor(cursor, role)
+    if state is None:
+        return None
+    if state["schema_version"] != schema_catalog.version:
+        return {"answer": "The data changed since this query ran; ask the question again.", "error": True}
+    try:
+        page = await run_db(fetch_page, duckdb_manager, state["sql"], state["params"], state["offset"])
+    except QueryTimeout as e:
+        return {"answer": f"❌ {e}", "error": True}
+    return sql_response(page, role, state["sql"], state["params"], state["schema_version"])
 
-        result = duck_conn.execute(sql).fetchall()
-        columns = [desc[0] for desc in duck_conn.description]
-        output = [list(row) for row in result]
+async def ask_csv(question: str, role: str, username: str, return_sql: bool = False, sql: str = None) -> dict:
+    allowed_tables = await run_db(get_allowed_tables_for_role, role)
+    schema_version = schema_catalog.version
 
-        markdown_table = tabulate.tabulate(output, headers=columns, tablefmt="github")
-        response = {
-            "answer": markdown_table if output else "Query executed, but no results found."
-        }
+    try:
+        # The cache wins over a speculatively generated `sql` (main.py skips speculation on covered questions)
+        cached = await run_cached_sql(question, role, schema_version, allowed_tables)
+        if cached:
+            sql, params, page = cached
+        else:
+            params = None
+            # `sql` may already have been generated speculatively; it is validated the same way
+            if sql is None:
+                sql = await translate_nl_to_sql(question, allowed_tables)
+            print(f"[SQL GENERATED]:\n{sql}")
+
+            denied = check_sql(sql, allowed_tables)
+            if denied:
+                return denied
+
+            # Arrow batches, capped by rows/bytes and interrupted after SQL_TIMEOUT_S
+            page = await run_db(fetch_page, duckdb_manager, sql)
+            sql_cache.store(role, question, schema_version, sql, returned_rows=not is_empty_answer(page))
+
+        response = sql_response(page, role, sql, params, schema_version)
 
         if return_sql:
             response["sql"] = sql
+            if params:
+                response["sql_params"] = params
 
         return response
 
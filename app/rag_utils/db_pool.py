@@ -0,0 +1,21 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# ==============================
+# ====== DATABASE THREAD POOL ==
+# ==============================
+# DuckDB and SQLite calls are blocking. Request handlers await them through
+# this bounded pool so a slow query never stalls the event loop, and at most
+# DB_POOL_SIZE queries run at once no matter how many requests are in flight.
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run `fn(*args, **kwargs)` on the database pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,82 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import duckdb
+
+# ==============================
+# ====== DUCKDB MANAGER ========
+# ==============================
+# One object owns the structured_queries.duckdb connection for the whole
+# process. Reads get their own cursor per call (cursors are cheap and safe to
+# use from different threads at once); writes (CSV loads, tables_metadata)
+# are serialized through a single writer lock. With DUCKDB_READ_ONLY=1 the
+# file is opened read-only and every write raises PermissionError. DuckDB
+# locks the file per process: any number of read-only processes can share it,
+# but only while no process has it open read-write (the open then fails with
+# "Conflicting lock is held"). So read-only workers serve a file nobody writes
+# to, e.g. a copy published after loading, not one next to a live writer.
+
+DUCKDB_FILE = os.getenv("DUCKDB_FILE", "static/data/structured_queries.duckdb")
+DUCKDB_READ_ONLY = os.getenv("DUCKDB_READ_ONLY", "0") == "1"
+
+
+class DuckDBManager:
+    def __init__(self, path: str = DUCKDB_FILE, read_only: bool = DUCKDB_READ_ONLY):
+        self.path = str(path)
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = duckdb.connect(self.path, read_only=read_only)
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.write_wait_max = 0.0
+
+    def cursor(self):
+        """A fresh cursor; use as `with manager.cursor() as cur:` so it is closed."""
+        return self._conn.cursor()
+
+    def fetch(self, sql: str, params=None):
+        """Run a read query on its own cursor and return (columns, rows)."""
+        with self.cursor() as cur:
+            rows = cur.execute(sql, params or []).fetchall()
+            columns = [desc[0] for desc in cur.description] if cur.description else []
+        with self._stats_lock:
+            self.reads += 1
+        return columns, rows
+
+    @contextmanager
+    def writer(self):
+        """Exclusive write cursor: one writer at a time, readers are not blocked."""
+        if self.read_only:
+            raise PermissionError(f"DuckDB at {self.path} is opened read-only")
+        start = time.perf_counter()
+        with self._write_lock:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.writes += 1
+                self.write_wait_max = max(self.write_wait_max, waited)
+            with self.cursor() as cur:
+                yield cur
+
+    def execute_write(self, sql: str, params=None):
+        with self.writer() as cur:
+            cur.execute(sql, params or [])
+
+    def close(self):
+        self._conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "read_only": self.read_only,
+            "reads": self.reads,
+            "writes": self.writes,
+            "write_wait_max_ms": round(self.write_wait_max * 1000, 1),
+        }
+
+
+duckdb_manager = DuckDBManager()
@@ -0,0 +1,206 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .db_pool import run_db
+
+# ==============================
+# ==== ON-DISK EMBEDDING CACHE =
+# ==============================
+# Vectors live in a memory-mapped float32 file (one fixed-size slot per text)
+# and a small SQLite index maps sha256(model + text) -> slot. When the file
+# would exceed EMBEDDING_CACHE_MAX_MB, the least recently used entries are
+# evicted and their slots reused, so the cache never grows past its budget.
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+EVICT_FRACTION = 0.1  # free 10% of the slots at a time so eviction is amortised
+
+
+class EmbeddingStore:
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.vectors_path = self.directory / "vectors.f32"
+
+        self.db = sqlite3.connect(str(self.directory / "index.sqlite"), check_same_thread=False)
+        self.db.executescript("""
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            slot INTEGER NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            name TEXT PRIMARY KEY,
+            value INTEGER
+        );
+        """)
+        self.db.commit()
+
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim = row[0] if row else None
+        self.vectors = None
+        self.free_slots = []
+        self.high_water = 0
+        self.evictions = 0
+        if self.dim:
+            self._open()
+
+    # ---------- storage ----------
+    @property
+    def max_slots(self):
+        return max(1, self.max_bytes // (self.dim * 4))
+
+    def _open(self):
+        row = self.db.execute("SELECT MAX(slot) FROM entries").fetchone()
+        self.high_water = (row[0] + 1) if row[0] is not None else 0
+        used = {r[0] for r in self.db.execute("SELECT slot FROM entries")}
+        self.free_slots = [s for s in range(self.high_water) if s not in used]
+        self._map(max(self.high_water, 1024))
+
+    def _map(self, capacity):
+        capacity = min(capacity, self.max_slots)
+        size = capacity * self.dim * 4
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _allocate(self, n):
+        slots = []
+        while len(slots) < n:
+            if self.free_slots:
+                slots.append(self.free_slots.pop())
+            elif self.high_water < self.max_slots:
+                if self.high_water >= self.vectors.shape[0]:
+                    self.vectors.flush()
+                    self._map(self.vectors.shape[0] * 2)
+                slots.append(self.high_water)
+                self.high_water += 1
+            elif not self._evict(max(n - len(slots), int(self.max_slots * EVICT_FRACTION))):
+                break  # nothing left to evict
+        return slots
+
+    def _evict(self, n):
+        rows = self.db.execute("SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (n,)).fetchall()
+        self.db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in rows])
+        self.free_slots.extend(slot for _, slot in rows)
+        self.evictions += len(rows)
+        return len(rows)
+
+    # ---------- API ----------
+    def get_many(self, keys):
+        """Return {key: vector} for the keys that are cached."""
+        if not self.dim or not keys:
+            return {}
+        found = {}
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            for key, slot in self.db.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch
+            ):
+                found[key] = np.array(self.vectors[slot])
+        if found:
+            now = time.time()
+            self.db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            self.db.commit()
+        return found
+
+    def put_many(self, items):
+        """Store {key: vector}."""
+        if not items:
+            return
+        if not self.dim:
+            self.dim = len(next(iter(items.values())))
+            self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (self.dim,))
+            self._open()
+
+        keys = list(items)[:self.max_slots]
+        slots = self._allocate(len(keys))
+        for key, slot in zip(keys, slots):
+            self.vectors[slot] = np.asarray(items[key], dtype=np.float32)
+        self.vectors.flush()
+
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+            [(key, slot, now) for key, slot in zip(keys, slots)]
+        )
+        self.db.commit()
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Drop-in wrapper around any LangChain Embeddings that serves repeated texts from disk."""
+
+    def __init__(self, underlying: Embeddings, model_name: str,
+                 cache_dir: str = EMBEDDING_CACHE_DIR, max_mb: int = EMBEDDING_CACHE_MAX_MB):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.store = EmbeddingStore(Path(cache_dir) / model_name.replace("/", "_"), max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, texts):
+        keys = [self._key(t) for t in texts]
+        with self._lock:
+            cached = self.store.get_many(list(set(keys)))
+        missing = list({k: t for k, t in zip(keys, texts) if k not in cached}.items())
+        with self._lock:
+            self.hits += sum(1 for k in keys if k in cached)
+            self.misses += len(missing)
+        return keys, cached, missing
+
+    def _store(self, cached, missing, vectors):
+        fresh = {key: vec for (key, _), vec in zip(missing, vectors)}
+        with self._lock:
+            self.store.put_many(fresh)
+        cached.update(fresh)
+
+    def embed_documents(self, texts):
+        keys, cached, missing = self._lookup(texts)
+        if missing:
+            self._store(cached, missing, self.underlying.embed_documents([t for _, t in missing]))
+        return [list(map(float, cached[k])) for k in keys]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        # SQLite + memmap work shares a lock with the indexing threads: keep it off the event loop
+        keys, cached, missing = await run_db(self._lookup, texts)
+        if missing:
+            vectors = await self.underlying.aembed_documents([t for _, t in missing])
+            await run_db(self._store, cached, missing, vectors)
+        return [list(map(float, cached[k])) for k in keys]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        with self._lock:
+            entries = self.store.count()
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": entries,
+            "evictions": self.store.evictions,
+            "max_mb": self.store.max_bytes // (1024 * 1024),
+        }
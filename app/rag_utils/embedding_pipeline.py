@@ -0,0 +1,123 @@
+import os
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# ==============================
+# ===== EMBEDDING PIPELINE =====
+# ==============================
+# Chunks are grouped into batches of at most EMBED_BATCH_TOKENS tokens,
+# EMBED_CONCURRENCY batches are embedded at a time, and rate-limit errors
+# (HTTP 429) are retried with exponential backoff + jitter, honouring the
+# provider's Retry-After header. Each finished batch is handed to a commit
+# callback on the calling thread, so a failed run keeps everything that
+# was already committed and the next run resumes from there.
+
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "8000"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+EMBED_BACKOFF_BASE = float(os.getenv("EMBED_BACKOFF_BASE", "1.0"))
+EMBED_BACKOFF_MAX = float(os.getenv("EMBED_BACKOFF_MAX", "60"))
+
+_encoder = None
+
+
+def count_tokens(text: str) -> int:
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = False  # tiktoken missing or offline: fall back to an estimate
+    if _encoder:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def batch_by_tokens(items, max_tokens=EMBED_BATCH_TOKENS, text_of=lambda item: item):
+    """Group items into batches whose summed token count stays under `max_tokens`."""
+    batches, current, current_tokens = [], [], 0
+    for item in items:
+        tokens = count_tokens(text_of(item))
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status == 429 or type(e).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(e: Exception):
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_backoff(fn, *args, max_retries=EMBED_MAX_RETRIES,
+                      base_delay=EMBED_BACKOFF_BASE, max_delay=EMBED_BACKOFF_MAX):
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == max_retries:
+                raise
+            delay = retry_after_seconds(e) or min(max_delay, base_delay * 2 ** attempt)
+            delay += random.uniform(0, delay / 4)
+            print(f"Rate limited, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
+
+def run_embedding_pipeline(batches, embed_fn, commit_fn, concurrency=EMBED_CONCURRENCY) -> dict:
+    """
+    Embed `batches` (lists of texts) concurrently with `embed_fn` and call
+    `commit_fn(batch_index, vectors)` for each batch as soon as it finishes.
+    On the first failure pending batches are cancelled, completed ones are
+    still committed, and the error is re-raised.
+    """
+    start = time.perf_counter()
+    committed_batches = 0
+    committed_chunks = 0
+    error = None
+
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = {pool.submit(call_with_backoff, embed_fn, texts): i for i, texts in enumerate(batches)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                vectors = future.result()
+            except Exception as e:
+                if error is None:
+                    error = e
+                    for f in futures:
+                        f.cancel()
+                continue
+            commit_fn(i, vectors)
+            committed_batches += 1
+            committed_chunks += len(batches[i])
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "batches": committed_batches,
+        "chunks": committed_chunks,
+        "seconds": round(elapsed, 3),
+        "chunks_per_sec": round(committed_chunks / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    print(f"Embedded {stats['chunks']} chunks in {stats['batches']} batches, "
+          f"{stats['seconds']}s ({stats['chunks_per_sec']} chunks/sec).")
+
+    if error is not None:
+        raise error
+    return stats
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import asyncio
+import sqlite3
+from typing import List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+
+from .db_pool import run_db
+
+# ==============================
+# ===== BM25 + VECTOR HYBRID ===
+# ==============================
+# Dense similarity misses exact terms (employee ids like FINEMP1006, policy
+# section names, quarter labels). Every chunk written to the vector store is
+# also written to a SQLite FTS5 table (chunk_fts, in roles_docs.db next to
+# chunk_manifest) in the same transaction, and removed with it. At query time
+# BM25 and vector candidates for the role are merged with reciprocal rank
+# fusion, so exact-term hits surface without raising k (and the prompt size).
+#
+# RETRIEVAL_MODE: hybrid (default) or dense (vector store only).
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+BM25_DB_PATH = "roles_docs.db"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+a an the and or of in on at to for from by with about into over is are was were be been being
+what which who whom whose when where why how do does did can could should would will shall may
+me my our your their his her its it this that these those there here i we you they he she
+give show tell list find all any some much many most more than as per
+""".split())
+
+
+def ensure_bm25_schema(c):
+    c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+            text, chunk_id UNINDEXED, role UNINDEXED, metadata UNINDEXED, tokenize = 'unicode61'
+        )
+    """)
+
+
+def index_chunks(c, chunks):
+    """Add (chunk_id, Document) pairs to the keyword index; re-adding an id replaces it."""
+    ensure_bm25_schema(c)
+    chunks = list(chunks)
+    c.executemany("DELETE FROM chunk_fts WHERE chunk_id = ?", [(chunk_id,) for chunk_id, _ in chunks])
+    c.executemany(
+        "INSERT INTO chunk_fts (text, chunk_id, role, metadata) VALUES (?, ?, ?, ?)",
+        [(doc.page_content, chunk_id, (doc.metadata.get("role") or "").lower(), json.dumps(doc.metadata))
+         for chunk_id, doc in chunks]
+    )
+
+
+def remove_chunks(c, chunk_ids):
+    ensure_bm25_schema(c)
+    c.executemany("DELETE FROM chunk_fts WHERE chunk_id = ?", [(chunk_id,) for chunk_id in chunk_ids])
+
+
+def count_chunks(c) -> int:
+    ensure_bm25_schema(c)
+    return c.execute("SELECT COUNT(*) FROM chunk_fts").fetchone()[0]
+
+
+def rebuild_from_store(c, store) -> int:
+    """Re-create the keyword index from everything in the vector store (ids, texts, metadata)."""
+    ensure_bm25_schema(c)
+    data = store.get(include=["documents", "metadatas"])
+    c.execute("DELETE FROM chunk_fts")
+    index_chunks(c, [
+        (chunk_id, Document(page_content=text or "", metadata=meta or {}))
+        for chunk_id, text, meta in zip(data["ids"], data["documents"], data["metadatas"])
+    ])
+    return len(data["ids"])
+
+
+def match_expression(question: str) -> Optional[str]:
+    """FTS5 query: any of the question's non-stopword terms, each quoted so no term is parsed as syntax."""
+    terms = []
+    for token in TOKEN_PATTERN.findall(question.lower()):
+        if token not in STOPWORDS and token not in terms:
+            terms.append(token)
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def bm25_search(question: str, roles: Optional[List[str]] = None, k: int = HYBRID_FETCH_K,
+                db_path: str = BM25_DB_PATH) -> List[Document]:
+    """Top-k chunks by BM25 for `question`, limited to `roles` (None = every role)."""
+    expression = match_expression(question)
+    if not expression:
+        return []
+    sql = "SELECT text, metadata FROM chunk_fts WHERE chunk_fts MATCH ?"
+    params = [expression]
+    if roles is not None:
+        sql += f" AND role IN ({', '.join('?' * len(roles))})"
+        params += [role.lower() for role in roles]
+    sql += " ORDER BY bm25(chunk_fts) LIMIT ?"
+    params.append(k)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        # Nothing indexed yet (no chunk_fts table)
+        print(f"BM25 search skipped: {e}")
+        return []
+    finally:
+        conn.close()
+    return [Document(page_content=text, metadata=json.loads(metadata)) for text, metadata in rows]
+
+
+def _doc_key(doc: Document):
+    return (doc.metadata.get("source"), doc.metadata.get("role"), doc.page_content)
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    """Merge ranked lists: score(doc) = sum over lists of 1 / (rrf_k + rank)."""
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ordered[:k]]
+
+
+class HybridRetriever(BaseRetriever):
+    """Vector retriever (already role-filtered, k = fetch_k) fused with BM25 over the same roles."""
+
+    vector_retriever: BaseRetriever
+    roles: Optional[List[str]] = None
+    k: int = 4
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = RRF_K
+    db_path: str = BM25_DB_PATH
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        dense = self.vector_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        sparse = bm25_search(query, self.roles, self.fetch_k, self.db_path)
+        return reciprocal_rank_fusion([dense, sparse], self.k, self.rrf_k)
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        dense, sparse = await asyncio.gather(
+            self.vector_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()}),
+            run_db(bm25_search, query, self.roles, self.fetch_k, self.db_path),
+        )
+        return reciprocal_rank_fusion([dense, sparse], self.k, self.rrf_k)
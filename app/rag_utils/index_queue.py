@@ -0,0 +1,92 @@
+import queue
+import threading
+import time
+import uuid
+
+from .rag_module import run_indexer
+
+# ==============================
+# ===== BACKGROUND INDEXING ====
+# ==============================
+# /upload-docs only records the document and enqueues a job; a single
+# in-process worker thread drains the queue and runs the indexer, so
+# uploads return immediately and embeddings are never computed twice.
+
+MAX_FINISHED_JOBS = 500
+
+_jobs = {}   # job_id -> job dict
+_jobs_lock = threading.Lock()
+_queue = queue.Queue()
+_worker = None
+
+
+def _start_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_worker_loop, name="index-worker", daemon=True)
+        _worker.start()
+
+
+def _prune_finished_jobs():
+    finished = [j for j in _jobs.values() if j["status"] in ("done", "failed")]
+    for job in sorted(finished, key=lambda j: j["finished_at"])[:-MAX_FINISHED_JOBS or None]:
+        del _jobs[job["job_id"]]
+
+
+def submit_index_job(filename: str = None) -> str:
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _prune_finished_jobs()
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "filename": filename,
+            "status": "queued",
+            "documents_total": None,
+            "documents_done": 0,
+            "indexed_documents": None,
+            "chunks_embedded": None,
+            "chunks_per_sec": None,
+            "error": None,
+            "queued_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+    _queue.put(job_id)
+    _start_worker()
+    return job_id
+
+
+def get_index_job(job_id: str):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def _update_job(job_id: str, **fields):
+    with _jobs_lock:
+        _jobs[job_id].update(fields)
+
+
+def _worker_loop():
+    while True:
+        job_id = _queue.get()
+        _update_job(job_id, status="running", started_at=time.time())
+
+        def on_progress(done, total):
+            _update_job(job_id, documents_done=done, documents_total=total)
+
+        try:
+            result = run_indexer(progress_callback=on_progress)
+            _update_job(
+                job_id,
+                status="done",
+                indexed_documents=result["documents"],
+                chunks_embedded=result["chunks"],
+                chunks_per_sec=result["chunks_per_sec"],
+                finished_at=time.time(),
+            )
+        except Exception as e:
+            print(f"❌ Indexing job {job_id} failed: {e}")
+            _update_job(job_id, status="failed", error=str(e), finished_at=time.time())
+        finally:
+            _queue.task_done()
@@ -0,0 +1,25 @@
+import threading
+
+# ==============================
+# ======= INDEX VERSION ========
+# ==============================
+# Monotonically increasing counter bumped whenever searchable data changes:
+# chunks added/removed by run_indexer or a DuckDB table (re)created on upload.
+# Caches key their entries by it, so nothing cached outlives the data it was
+# computed from.
+
+_version = 0
+_lock = threading.Lock()
+
+
+def get_index_version() -> int:
+    return _version
+
+
+def bump_index_version(reason: str = "") -> int:
+    global _version
+    with _lock:
+        _version += 1
+        version = _version
+    print(f"Index version -> {version}" + (f" ({reason})" if reason else ""))
+    return version
@@ -0,0 +1,105 @@
+import codecs
+import os
+
+# ==============================
+# ===== STREAMING UPLOADS ======
+# ==============================
+# Uploads are copied to disk chunk by chunk so peak memory depends on the
+# chunk size, not on the file size. CSVs are then parsed exactly once, by
+# DuckDB, straight from the saved file.
+#
+# CSV_STORAGE picks where the parsed table lives:
+#   table   - a regular table inside structured_queries.duckdb
+#   parquet - a zstd Parquet file under PARQUET_DIR, registered as a view
+#   auto    - parquet for CSVs of at least CSV_PARQUET_MIN_MB, table otherwise
+# Parquet keeps very large uploads out of the single .duckdb file; queries see
+# the same name and columns either way.
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+CSV_STORAGE = os.getenv("CSV_STORAGE", "auto")
+CSV_PARQUET_MIN_MB = float(os.getenv("CSV_PARQUET_MIN_MB", "256"))
+PARQUET_DIR = os.getenv("PARQUET_DIR", "static/data/parquet")
+
+
+async def save_upload_stream(upload, filepath: str, chunk_size: int = UPLOAD_CHUNK_SIZE,
+                             encoding: str = None) -> int:
+    """
+    Copy an UploadFile to `filepath` in `chunk_size` pieces and return the bytes written.
+    If `encoding` is given, the stream is validated incrementally (raises UnicodeDecodeError).
+    The file is written to a temporary name first so readers never see a partial upload.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)() if encoding else None
+    tmp_path = f"{filepath}.part"
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                if decoder:
+                    decoder.decode(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        if decoder:
+            decoder.decode(b"", final=True)
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return size
+
+
+def csv_storage_for(filepath: str, storage: str = CSV_STORAGE) -> str:
+    if storage == "auto":
+        return "parquet" if os.path.getsize(filepath) >= CSV_PARQUET_MIN_MB * 1024 * 1024 else "table"
+    if storage not in ("table", "parquet"):
+        raise ValueError(f"Unknown CSV_STORAGE {storage!r}")
+    return storage
+
+
+def _quote(path: str) -> str:
+    return path.replace("'", "''")
+
+
+def _replace_relation(duck_conn, table_name: str, create_sql: str, params=None):
+    """Swap `table_name` for a new table/view in one transaction, even if the old one was the other kind."""
+    found = duck_conn.execute(
+        "SELECT table_type FROM information_schema.tables WHERE table_name = ?", [table_name]
+    ).fetchall()
+    duck_conn.execute("BEGIN TRANSACTION")
+    try:
+        if found:
+            duck_conn.execute(f"DROP {'VIEW' if found[0][0] == 'VIEW' else 'TABLE'} {table_name}")
+        duck_conn.execute(create_sql, params or [])
+        duck_conn.execute("COMMIT")
+    except Exception:
+        duck_conn.execute("ROLLBACK")
+        raise
+
+
+def ingest_csv_to_duckdb(duck_conn, filepath: str, table_name: str, storage: str = CSV_STORAGE,
+                         parquet_dir: str = PARQUET_DIR) -> list[str]:
+    """
+    Load a CSV into DuckDB with its native reader (type inference included); return the column names.
+    With parquet storage the CSV is converted by DuckDB (COPY ... TO) and `table_name` becomes a view
+    over read_parquet().
+    """
+    parquet_path = os.path.abspath(os.path.join(parquet_dir, f"{table_name}.parquet"))
+    if csv_storage_for(filepath, storage) == "parquet":
+        os.makedirs(parquet_dir, exist_ok=True)
+        # Written under a temporary name so the current view never reads a half-written file
+        tmp_path = f"{parquet_path}.part"
+        duck_conn.execute(
+            f"COPY (SELECT * FROM read_csv_auto(?)) TO '{_quote(tmp_path)}' (FORMAT parquet, COMPRESSION zstd)",
+            [filepath]
+        )
+        os.replace(tmp_path, parquet_path)
+        _replace_relation(duck_conn, table_name,
+                          f"CREATE VIEW {table_name} AS SELECT * FROM read_parquet('{_quote(parquet_path)}')")
+    else:
+        _replace_relation(duck_conn, table_name,
+                          f"CREATE TABLE {table_name} AS SELECT * FROM read_csv_auto(?)", [filepath])
+        if os.path.exists(parquet_path):
+            os.remove(parquet_path)
+    return [row[0] for row in duck_conn.execute(f"DESCRIBE {table_name}").fetchall()]
@@ -0,0 +1,38 @@
+import os
+import threading
+from collections import defaultdict, deque
+
+# ==============================
+# ====== LATENCY PERCENTILES ===
+# ==============================
+# Rolling window of per-request latencies (time to first token, total, ...)
+# reported as p50/p95 on /metrics.
+
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "1000"))
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class LatencyStats:
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def record(self, **values_ms):
+        with self._lock:
+            self.requests += 1
+            for name, value in values_ms.items():
+                if value is not None:
+                    self._samples[name].append(value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items() if values}
+            result = {"requests": self.requests}
+        for name, ordered in samples.items():
+            result[f"{name}_p50_ms"] = round(_percentile(ordered, 50), 1)
+            result[f"{name}_p95_ms"] = round(_percentile(ordered, 95), 1)
+        return result
@@ -0,0 +1,489 @@
+import os
+import json
+import uuid
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# ==============================
+# ===== NUMPY VECTOR STORE =====
+# ==============================
+# Alternative to the Chroma persistent client (VECTOR_BACKEND=numpy in
+# rag_module). Embeddings live in one memory-mapped matrix (float32, or int8
+# with a per-row scale when NUMPY_STORE_DTYPE=int8); ids, texts and metadata
+# live in a SQLite file next to it, like the embedding cache. On open, one
+# boolean row mask per role is built from SQLite, so a role filter is a mask
+# OR instead of a metadata query, and search is a blocked brute-force dot
+# product with np.argpartition top-k. The masks are also saved as packed bits
+# (masks.npz, tagged with a generation counter kept in SQLite), so opening a
+# large store doesn't scan SQLite; vectors are paged in only when searched.
+#
+# Implements the LangChain VectorStore interface used by rag_module
+# (add_documents, delete, get(where=...), as_retriever with a role filter),
+# so get_rag_chain works unchanged. Existing Chroma data can be copied over
+# without re-embedding:
+#     python -m app.rag_utils.numpy_store --from-chroma chroma_db
+#
+# Smaller index: NUMPY_STORE_DIMS keeps only the first N dimensions
+# (text-embedding-3 vectors are trained so a renormalized prefix still ranks
+# well) and NUMPY_STORE_DTYPE=int8 / binary stores 1 byte / 1 bit per
+# dimension (binary is scored by Hamming distance), 4x-32x less than float32
+# at full width, more with truncation. NUMPY_RESCORE=float16|float32 also keeps
+# a full-dimension copy on disk that is never scanned: the index picks
+# NUMPY_RESCORE_FACTOR * k candidates and only those rows are read back to
+# rank by exact cosine. All four settings are fixed when the store is created.
+
+NUMPY_STORE_DIR = os.getenv("NUMPY_STORE_DIR", "numpy_store")
+NUMPY_STORE_DTYPE = os.getenv("NUMPY_STORE_DTYPE", "float32").lower()   # float32 | int8 | binary
+NUMPY_STORE_DIMS = int(os.getenv("NUMPY_STORE_DIMS", "0"))              # 0 = keep every dimension
+NUMPY_RESCORE = os.getenv("NUMPY_RESCORE", "none").lower()              # none | float16 | float32
+NUMPY_RESCORE_FACTOR = int(os.getenv("NUMPY_RESCORE_FACTOR", "4"))
+NUMPY_SCAN_ROWS = int(os.getenv("NUMPY_SCAN_ROWS", "4096"))   # rows per matmul block
+
+_INDEX_FILES = {"float32": ("vectors.f32", np.float32), "int8": ("vectors.i8", np.int8),
+                "binary": ("vectors.bits", np.uint8)}
+_RESCORE_FILES = {"float16": ("rescore.f16", np.float16), "float32": ("rescore.f32", np.float32)}
+
+
+def _normalize(vectors) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _where_sql(where: dict) -> Tuple[str, list]:
+    """Chroma-style where ({"k": v}, {"k": {"$in": [...]}}, {"$and": [...]}) -> SQL over metadata."""
+    if "$and" in where:
+        parts = [_where_sql(clause) for clause in where["$and"]]
+        return " AND ".join(f"({sql})" for sql, _ in parts), [p for _, params in parts for p in params]
+    clauses, params = [], []
+    for key, condition in where.items():
+        column = "role" if key == "role" else f"json_extract(metadata, '$.{key}')"
+        if isinstance(condition, dict) and "$in" in condition:
+            values = list(condition["$in"])
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params += values
+        elif isinstance(condition, dict) and "$eq" in condition:
+            clauses.append(f"{column} = ?")
+            params.append(condition["$eq"])
+        elif isinstance(condition, dict):
+            raise ValueError(f"Unsupported filter: {where}")
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(condition)
+    return " AND ".join(clauses) or "1", params
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount_rows(bits: np.ndarray) -> np.ndarray:
+    """Set bits per row of a uint8 matrix (np.bitwise_count is NumPy 2.0+; a lookup table otherwise)."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[bits].sum(axis=1, dtype=np.int32)
+
+
+def filter_roles(filter: Optional[dict]) -> Optional[List[str]]:
+    """The roles a search filter allows (None = every row); only role filters are supported."""
+    if not filter:
+        return None
+    if set(filter) != {"role"}:
+        raise ValueError(f"NumpyVectorStore only filters on role, got {filter}")
+    condition = filter["role"]
+    if isinstance(condition, dict):
+        return list(condition.get("$in", [condition.get("$eq")]))
+    return [condition]
+
+
+class NumpyVectorStore(VectorStore):
+    def __init__(self, embedding_function: Embeddings, persist_directory: str = NUMPY_STORE_DIR,
+                 dtype: str = NUMPY_STORE_DTYPE, dims: int = NUMPY_STORE_DIMS, rescore: str = NUMPY_RESCORE):
+        self._embedding = embedding_function
+        self.directory = Path(persist_directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self.db = sqlite3.connect(str(self.directory / "index.sqlite"), check_same_thread=False)
+        self.db.executescript("""
+        CREATE TABLE IF NOT EXISTS rows (
+            row INTEGER PRIMARY KEY,
+            id TEXT UNIQUE NOT NULL,
+            role TEXT,
+            document TEXT,
+            metadata TEXT
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        );
+        """)
+        self.db.commit()
+
+        meta = dict(self.db.execute("SELECT name, value FROM meta").fetchall())
+        # The files keep the layout they were created with; stores from before
+        # truncation/rescoring existed have neither key (full width, no rescore)
+        self.dtype = meta.get("dtype", dtype)
+        if self.dtype not in _INDEX_FILES:
+            raise ValueError(f"Unknown NUMPY_STORE_DTYPE {self.dtype!r}")
+        self.dim = int(meta["dim"]) if "dim" in meta else None
+        self.index_dims = int(meta.get("index_dims", self.dim)) if self.dim else None
+        self.requested_dims = dims
+        self.rescore = meta.get("rescore", "none" if self.dim else rescore)
+        if self.rescore != "none" and self.rescore not in _RESCORE_FILES:
+            raise ValueError(f"Unknown NUMPY_RESCORE {self.rescore!r}")
+
+        self.vectors = None
+        self.scales = None          # int8 only: per-row dequantization scale
+        self.full_vectors = None    # rescore only: full-dimension copy, read for candidates
+        self.live = np.zeros(0, dtype=bool)
+        self.role_masks = {}        # role -> bool row mask
+        self.free_rows = []
+        self.high_water = 0
+        if self.dim:
+            self._open()
+
+    # ---------- storage ----------
+    def _open(self):
+        if not self._load_masks():
+            self._rebuild_masks()
+        self.free_rows = np.flatnonzero(~self.live[:self.high_water]).tolist()
+
+    def _generation(self) -> int:
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _commit(self):
+        """Commit SQLite and save the masks under the new generation (a stale masks.npz is rebuilt on open)."""
+        generation = self._generation() + 1
+        self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('generation', ?)", (str(generation),))
+        self.db.commit()
+        n = self.high_water
+        arrays = {"live": np.packbits(self.live[:n])}
+        arrays.update({f"role:{role}": np.packbits(mask[:n]) for role, mask in self.role_masks.items()})
+        tmp_path = self.directory / "masks.tmp.npz"
+        np.savez(tmp_path, generation=generation, high_water=n, **arrays)
+        os.replace(tmp_path, self.directory / "masks.npz")
+
+    def _load_masks(self) -> bool:
+        try:
+            saved = np.load(self.directory / "masks.npz")
+        except (OSError, ValueError):
+            return False
+        if int(saved["generation"]) != self._generation():
+            return False
+        self.high_water = int(saved["high_water"])
+        self._map(max(self.high_water, 1024))
+        unpack = lambda bits: np.unpackbits(bits, count=self.high_water).astype(bool)
+        self.live[:self.high_water] = unpack(saved["live"])
+        for name in saved.files:
+            if name.startswith("role:"):
+                self.role_masks[name[5:]] = np.zeros(len(self.live), dtype=bool)
+                self.role_masks[name[5:]][:self.high_water] = unpack(saved[name])
+        return True
+
+    def _rebuild_masks(self):
+        rows = self.db.execute("SELECT row, role FROM rows").fetchall()
+        row_ids = np.array([r for r, _ in rows], dtype=np.int64)
+        roles = np.array([role or "" for _, role in rows], dtype=object)
+        self.high_water = int(row_ids.max()) + 1 if len(rows) else 0
+        self._map(max(self.high_water, 1024))
+        self.live[row_ids] = True
+        for role in set(roles) - {""}:
+            self.role_masks[role] = np.zeros(len(self.live), dtype=bool)
+            self.role_masks[role][row_ids[roles == role]] = True
+
+    def _memmap(self, name: str, dtype, shape: tuple) -> np.memmap:
+        path = self.directory / name
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _map(self, capacity: int):
+        name, dtype = _INDEX_FILES[self.dtype]
+        width = (self.index_dims + 7) // 8 if self.dtype == "binary" else self.index_dims
+        self.vectors = self._memmap(name, dtype, (capacity, width))
+        if self.dtype == "int8":
+            self.scales = self._memmap("scales.f32", np.float32, (capacity,))
+        if self.rescore != "none":
+            name, dtype = _RESCORE_FILES[self.rescore]
+            self.full_vectors = self._memmap(name, dtype, (capacity, self.dim))
+
+        grow = capacity - len(self.live)
+        if grow > 0:
+            self.live = np.concatenate([self.live, np.zeros(grow, dtype=bool)])
+            for role in self.role_masks:
+                self.role_masks[role] = np.concatenate([self.role_masks[role], np.zeros(grow, dtype=bool)])
+
+    def _mark(self, row: int, role: Optional[str]):
+        self.live[row] = True
+        if role is not None:
+            if role not in self.role_masks:
+                self.role_masks[role] = np.zeros(len(self.live), dtype=bool)
+            self.role_masks[role][row] = True
+
+    def _unmark(self, row: int):
+        self.live[row] = False
+        for mask in self.role_masks.values():
+            mask[row] = False
+
+    def _allocate(self, n: int) -> List[int]:
+        rows = [self.free_rows.pop() for _ in range(min(n, len(self.free_rows)))]
+        needed = n - len(rows)
+        if self.high_water + needed > self.vectors.shape[0]:
+            self.vectors.flush()
+            if self.full_vectors is not None:
+                self.full_vectors.flush()
+            self._map(max(self.vectors.shape[0] * 2, self.high_water + needed))
+        rows += list(range(self.high_water, self.high_water + needed))
+        self.high_water += needed
+        return rows
+
+    def _index_form(self, vectors: np.ndarray) -> np.ndarray:
+        """Unit vectors -> the truncated, renormalized vectors the index stores (before quantization)."""
+        if self.index_dims == self.dim:
+            return vectors
+        return _normalize(vectors[:, :self.index_dims])
+
+    def _write_vectors(self, rows: List[int], vectors: np.ndarray):
+        rows = np.asarray(rows)
+        index = self._index_form(vectors)
+        if self.dtype == "float32":
+            self.vectors[rows] = index
+        elif self.dtype == "binary":
+            self.vectors[rows] = np.packbits(index > 0, axis=1)
+        else:
+            scales = np.abs(index).max(axis=1) / 127
+            scales[scales == 0] = 1
+            self.vectors[rows] = np.round(index / scales[:, None]).astype(np.int8)
+            self.scales[rows] = scales
+            self.scales.flush()
+        self.vectors.flush()
+        if self.full_vectors is not None:
+            self.full_vectors[rows] = vectors
+            self.full_vectors.flush()
+
+    # ---------- VectorStore API ----------
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        return self.add_vectors(self._embedding.embed_documents(texts), texts, metadatas, ids)
+
+    def add_vectors(self, vectors, texts: List[str], metadatas: Optional[List[dict]] = None,
+                    ids: Optional[List[str]] = None) -> List[str]:
+        """Store precomputed embeddings (also used by the Chroma migration); existing ids are replaced."""
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(vectors)
+
+        with self._lock:
+            if not self.dim:
+                self.dim = vectors.shape[1]
+                self.index_dims = min(self.requested_dims or self.dim, self.dim)
+                self.db.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                                    [("dim", str(self.dim)), ("dtype", self.dtype),
+                                     ("index_dims", str(self.index_dims)), ("rescore", self.rescore)])
+                self._open()
+            self._delete_locked(ids)
+
+            rows = self._allocate(len(ids))
+            self._write_vectors(rows, vectors)
+            roles = [(meta or {}).get("role") for meta in metadatas]
+            self.db.executemany(
+                "INSERT INTO rows (row, id, role, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                [(row, chunk_id, role, text, json.dumps(meta or {}))
+                 for row, chunk_id, role, text, meta in zip(rows, ids, roles, texts, metadatas)]
+            )
+            for row, role in zip(rows, roles):
+                self._mark(row, role)
+            self._commit()
+        return ids
+
+    def _delete_locked(self, ids: List[str]):
+        found = []
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            found += [r[0] for r in self.db.execute(
+                f"SELECT row FROM rows WHERE id IN ({', '.join('?' * len(batch))})", batch)]
+        if found:
+            self.db.executemany("DELETE FROM rows WHERE row = ?", [(row,) for row in found])
+            for row in found:
+                self._unmark(row)
+            self.free_rows.extend(found)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            self._delete_locked(list(ids))
+            self._commit()
+        return True
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, limit: Optional[int] = None,
+            offset: int = 0, include: Iterable[str] = ("documents", "metadatas")) -> dict:
+        """Chroma-compatible get(): {"ids", "documents", "metadatas"} for matching rows."""
+        sql, params = "SELECT id, document, metadata FROM rows WHERE 1", []
+        if ids is not None:
+            sql += f" AND id IN ({', '.join('?' * len(ids))})"
+            params += list(ids)
+        if where:
+            clause, where_params = _where_sql(where)
+            sql += f" AND {clause}"
+            params += where_params
+        sql += " ORDER BY row"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._lock:
+            rows = self.db.execute(sql, params).fetchall()
+        include = set(include)
+        return {
+            "ids": [r[0] for r in rows],
+            "documents": [r[1] for r in rows] if "documents" in include else None,
+            "metadatas": [json.loads(r[2]) for r in rows] if "metadatas" in include else None,
+        }
+
+    def count(self) -> int:
+        return int(self.live.sum())
+
+    def _block_scores(self, block: np.ndarray, rows, query: np.ndarray) -> np.ndarray:
+        """Index scores of stored rows `block` (absolute row numbers `rows`) against the index-form query."""
+        if self.dtype == "binary":
+            # Share of agreeing signs mapped to [-1, 1], a cosine estimate
+            return 1 - 2 * _popcount_rows(block ^ query).astype(np.float32) / self.index_dims
+        scores = np.asarray(block, dtype=np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales[rows]
+        return scores
+
+    def search_rows(self, query_vector, k: int, roles: Optional[List[str]] = None) -> List[Tuple[int, float]]:
+        """[(row, score)] of the k best live rows, restricted to `roles` (None = all).
+
+        The score is the index's cosine estimate, or the exact cosine when the store rescores.
+        """
+        if not self.dim or k <= 0:
+            return []
+        vectors, n = self.vectors, self.high_water
+        mask = self.live[:n] if roles is None else np.logical_or.reduce(
+            [self.role_masks.get(role, np.zeros(len(self.live), dtype=bool))[:n] for role in roles] or [np.zeros(n, bool)])
+        full_query = _normalize(query_vector)[0]
+        query = self._index_form(full_query[None, :])[0]
+        if self.dtype == "binary":
+            query = np.packbits(query > 0)
+        final_k = k
+        if self.full_vectors is not None:
+            k = k * max(NUMPY_RESCORE_FACTOR, 1)
+
+        best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for start in range(0, n, NUMPY_SCAN_ROWS):
+            block_mask = mask[start:start + NUMPY_SCAN_ROWS]
+            if not block_mask.any():
+                continue
+            block = vectors[start:start + len(block_mask)]
+            if block_mask.mean() < 0.5:
+                # Sparse role: only touch (and page in) the rows the role may see
+                rows = np.flatnonzero(block_mask)
+                scores = self._block_scores(block[rows], start + rows, query)
+                rows = rows + start
+            else:
+                scores = self._block_scores(block, slice(start, start + len(block_mask)), query)
+                scores[~block_mask] = -np.inf
+                rows = np.arange(start, start + len(block_mask))
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                rows, scores = rows[top], scores[top]
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+
+        best_rows, best_scores = best_rows[np.isfinite(best_scores)], best_scores[np.isfinite(best_scores)]
+        if self.full_vectors is not None and len(best_rows):
+            # Exact cosine for the candidates only; sorted rows keep the reads sequential
+            best_rows = np.sort(best_rows)
+            best_scores = np.asarray(self.full_vectors[best_rows], dtype=np.float32) @ full_query
+        order = np.argsort(-best_scores, kind="stable")[:final_k]
+        return [(int(best_rows[i]), float(best_scores[i])) for i in order]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        hits = self.search_rows(embedding, k, filter_roles(filter))
+        if not hits:
+            return []
+        with self._lock:
+            found = {row: (doc_id, text, meta) for row, doc_id, text, meta in self.db.execute(
+                f"SELECT row, id, document, metadata FROM rows WHERE row IN ({', '.join('?' * len(hits))})",
+                [row for row, _ in hits])}
+        return [(Document(id=found[row][0], page_content=found[row][1], metadata=json.loads(found[row][2])), score)
+                for row, score in hits if row in found]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1) / 2   # cosine -> [0, 1]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+
+def migrate_from_chroma(store: VectorStore, chroma_dir: str, collection: str = "my_collection",
+                        batch_size: int = 1000) -> int:
+    """Copy ids, texts, metadata and stored embeddings from a Chroma directory into a store with
+    add_vectors (NumpyVectorStore, PartitionedVectorStore); no embedding calls."""
+    import chromadb
+
+    source = chromadb.PersistentClient(path=chroma_dir).get_collection(collection)
+    copied = 0
+    while True:
+        batch = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=copied)
+        if not batch["ids"]:
+            break
+        store.add_vectors(batch["embeddings"], batch["documents"], batch["metadatas"], batch["ids"])
+        copied += len(batch["ids"])
+        print(f"Copied {copied} chunks from {chroma_dir}/{collection}.")
+    return copied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy a Chroma collection into the NumPy vector store")
+    parser.add_argument("--from-chroma", default="chroma_db")
+    parser.add_argument("--collection", default="my_collection")
+    parser.add_argument("--to", default=NUMPY_STORE_DIR)
+    parser.add_argument("--dtype", default=NUMPY_STORE_DTYPE, choices=list(_INDEX_FILES))
+    parser.add_argument("--dims", type=int, default=NUMPY_STORE_DIMS, help="0 = keep every dimension")
+    parser.add_argument("--rescore", default=NUMPY_RESCORE, choices=["none", *_RESCORE_FILES])
+    args = parser.parse_args()
+
+    target = NumpyVectorStore(embedding_function=None, persist_directory=args.to, dtype=args.dtype,
+                              dims=args.dims, rescore=args.rescore)
+    print(f"Migrated {migrate_from_chroma(target, args.from_chroma, args.collection)} chunks to {args.to}.")
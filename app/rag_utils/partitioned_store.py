@@ -0,0 +1,243 @@
+import os
+import hashlib
+import argparse
+import threading
+from urllib.parse import quote, unquote
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from .numpy_store import NumpyVectorStore, NUMPY_STORE_DIR, filter_roles, migrate_from_chroma
+
+# ==============================
+# ===== ROLE PARTITIONS ========
+# ==============================
+# VECTOR_PARTITIONING=role keeps one collection (Chroma) or one store
+# directory (NumPy) per role instead of a single my_collection filtered on
+# role metadata, so a search only touches chunks the user may read. A
+# department user's query goes to its own partition plus general; C-Level
+# (no filter) fans out to every partition on a thread pool and the hits are
+# merged by score. Chunks are routed to their partition by metadata["role"].
+#
+# Implements the same VectorStore surface as NumpyVectorStore (add_documents,
+# delete, get(where=...), as_retriever with a role filter), so rag_module and
+# get_rag_chain work unchanged. An existing shared collection is copied into
+# partitions without re-embedding:
+#     python -m app.rag_utils.partitioned_store --from-chroma chroma_db
+
+VECTOR_PARTITIONING = os.getenv("VECTOR_PARTITIONING", "shared").lower()
+PARTITION_PREFIX = os.getenv("PARTITION_PREFIX", "my_collection_role_")
+PARTITION_FANOUT_WORKERS = int(os.getenv("PARTITION_FANOUT_WORKERS", "8"))
+
+_fanout = ThreadPoolExecutor(max_workers=PARTITION_FANOUT_WORKERS, thread_name_prefix="partition")
+
+
+def collection_name(role: str, prefix: str = PARTITION_PREFIX) -> str:
+    """
+    Chroma collection name for a role. Names allow only [a-zA-Z0-9._-] and 63
+    characters, so the readable part is sanitized and cut, and a hash of the raw
+    role keeps "r&d" and "r_d" (or two long roles) in separate collections.
+    """
+    safe = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in role)
+    digest = hashlib.sha1(role.encode("utf-8")).hexdigest()[:10]
+    return f"{prefix}{safe[:63 - len(prefix) - 11]}_{digest}"
+
+
+def _where_role(where: Optional[dict]) -> Optional[str]:
+    """The single role a get() where-clause pins down, if any (then only that partition is read)."""
+    if not where:
+        return None
+    if "$and" in where:
+        for clause in where["$and"]:
+            role = _where_role(clause)
+            if role is not None:
+                return role
+        return None
+    condition = where.get("role")
+    if isinstance(condition, dict):
+        return condition.get("$eq")
+    return condition
+
+
+class PartitionedVectorStore(VectorStore):
+    def __init__(self, embedding_function: Embeddings, backend: str = "chroma",
+                 persist_directory: Optional[str] = None, prefix: str = PARTITION_PREFIX):
+        if backend not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown partition backend {backend!r}")
+        self._embedding = embedding_function
+        self.backend = backend
+        self.prefix = prefix
+        self.persist_directory = persist_directory or (
+            "chroma_db" if backend == "chroma" else os.path.join(NUMPY_STORE_DIR, "partitions"))
+        self._lock = threading.Lock()
+        self.partitions: Dict[str, VectorStore] = {}
+
+        if backend == "chroma":
+            import chromadb
+            self._client = chromadb.PersistentClient(path=self.persist_directory)
+            roles = [c.metadata["role"] for c in self._client.list_collections()
+                     if c.name.startswith(prefix) and c.metadata and "role" in c.metadata]
+        else:
+            Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
+            roles = [unquote(p.name[len("role="):]) for p in Path(self.persist_directory).iterdir()
+                     if p.is_dir() and p.name.startswith("role=")]
+        for role in roles:
+            self.partitions[role] = self._open(role)
+
+    # ---------- partitions ----------
+    def _open(self, role: str) -> VectorStore:
+        if self.backend == "chroma":
+            from langchain_community.vectorstores import Chroma
+            store = Chroma(
+                collection_name=collection_name(role, self.prefix),
+                client=self._client,
+                embedding_function=self._embedding,
+                collection_metadata={"role": role},
+            )
+            owner = (store._collection.metadata or {}).get("role")
+            if owner != role:
+                raise ValueError(f"Collection {store._collection.name} belongs to role {owner!r}, not {role!r}")
+            return store
+        path = os.path.join(self.persist_directory, "role=" + quote(role, safe=""))
+        return NumpyVectorStore(embedding_function=self._embedding, persist_directory=path)
+
+    def partition(self, role: str) -> VectorStore:
+        """The role's partition, created on first write."""
+        with self._lock:
+            if role not in self.partitions:
+                self.partitions[role] = self._open(role)
+            return self.partitions[role]
+
+    def roles(self) -> List[str]:
+        return sorted(self.partitions)
+
+    def _group_by_role(self, metadatas: List[dict]) -> Dict[str, List[int]]:
+        groups: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            role = (meta or {}).get("role")
+            if not role:
+                raise ValueError("Partitioned vector store needs metadata['role'] on every chunk")
+            groups.setdefault(role, []).append(i)
+        return groups
+
+    # ---------- writes ----------
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        added = [None] * len(texts)
+        for role, rows in self._group_by_role(metadatas).items():
+            stored = self.partition(role).add_texts([texts[i] for i in rows], [metadatas[i] for i in rows],
+                                                    ids=[ids[i] for i in rows] if ids else None)
+            for i, chunk_id in zip(rows, stored):
+                added[i] = chunk_id
+        return added
+
+    def add_vectors(self, vectors, texts: List[str], metadatas: List[dict], ids: List[str]) -> List[str]:
+        """Insert precomputed embeddings (migration path); nothing is embedded."""
+        for role, rows in self._group_by_role(metadatas).items():
+            store = self.partition(role)
+            batch = ([vectors[i] for i in rows], [texts[i] for i in rows],
+                     [metadatas[i] for i in rows], [ids[i] for i in rows])
+            if self.backend == "chroma":
+                store._collection.upsert(embeddings=batch[0], documents=batch[1], metadatas=batch[2], ids=batch[3])
+            else:
+                store.add_vectors(*batch)
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        # A chunk id doesn't name its role, so every partition drops the ids it has
+        if ids:
+            for store in list(self.partitions.values()):
+                store.delete(ids=list(ids))
+        return True
+
+    # ---------- reads ----------
+    def get(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, limit: Optional[int] = None,
+            offset: int = 0, include: Iterable[str] = ("documents", "metadatas")) -> dict:
+        """Chroma-compatible get() over the partitions (only the role's own when where names one)."""
+        include = list(include)
+        role = _where_role(where)
+        stores = [self.partitions[role]] if role in self.partitions else [] if role else list(self.partitions.values())
+        merged = {"ids": [], "documents": [] if "documents" in include else None,
+                  "metadatas": [] if "metadatas" in include else None}
+        for store in stores:
+            found = store.get(ids=ids, where=where, include=include)
+            merged["ids"] += found["ids"]
+            for key in ("documents", "metadatas"):
+                if merged[key] is not None:
+                    merged[key] += found[key]
+        if limit is not None:
+            merged = {key: value[offset:offset + limit] if value is not None else None
+                      for key, value in merged.items()}
+        return merged
+
+    def count(self) -> int:
+        return sum(store.count() if isinstance(store, NumpyVectorStore) else store._collection.count()
+                   for store in self.partitions.values())
+
+    def _search_partition(self, role: str, embedding: List[float], k: int) -> List[Tuple[Document, float]]:
+        # The role filter is a second check: a partition only ever returns its own role's chunks
+        store = self.partitions[role]
+        if self.backend == "chroma":
+            # Chroma returns distances (lower is closer); negate so every backend sorts high-to-low
+            return [(doc, -distance) for doc, distance in
+                    store.similarity_search_by_vector_with_relevance_scores(embedding, k, filter={"role": role})]
+        return store.similarity_search_by_vector_with_score(embedding, k, filter={"role": role})
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        roles = filter_roles(filter)
+        targets = [role for role in (roles if roles is not None else self.partitions) if role in self.partitions]
+        if not targets:
+            return []
+        if len(targets) == 1:
+            hits = self._search_partition(targets[0], embedding, k)
+        else:
+            hits = [hit for partial in _fanout.map(lambda role: self._search_partition(role, embedding, k), targets)
+                    for hit in partial]
+        return sorted(hits, key=lambda hit: hit[1], reverse=True)[:k]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "PartitionedVectorStore":
+        store = cls(embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a shared Chroma collection into per-role partitions")
+    parser.add_argument("--from-chroma", default="chroma_db")
+    parser.add_argument("--collection", default="my_collection")
+    parser.add_argument("--backend", default="chroma", choices=["chroma", "numpy"])
+    parser.add_argument("--to", default=None, help="defaults to chroma_db (chroma) or numpy_store/partitions (numpy)")
+    args = parser.parse_args()
+
+    target = PartitionedVectorStore(embedding_function=None, backend=args.backend, persist_directory=args.to)
+    copied = migrate_from_chroma(target, args.from_chroma, args.collection)
+    for role in target.roles():
+        print(f"  {role}: {len(target.get(where={'role': role}, include=[])['ids'])} chunks")
+    print(f"Migrated {copied} chunks into {len(target.roles())} partitions under {target.persist_directory}. "
+          f"The {args.collection} collection is left in place; set VECTOR_PARTITIONING=role"
+          f"{' and VECTOR_BACKEND=numpy' if args.backend == 'numpy' else ''} to use the partitions.")
@@ -1,10 +1,18 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from functools import lru_cache
 import os
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Clients are created on first use, so importing the router works without OPENAI_API_KEY
+@lru_cache(maxsize=None)
+def get_client() -> OpenAI:
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def detect_query_type_llm(question: str) -> str:
-    prompt = f"""
+@lru_cache(maxsize=None)
+def get_aclient() -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+def classifier_prompt(question: str) -> str:
+    return f"""
 You are a classifier that decides if a user's question should be handled by structured SQL query logic or by unstructured document search (RAG).
 
 If the question contains terms related to **structured data analysis** (e.g., "average", "sum", "total", "count", "how many", "filter", "greater than", "less than", "top 5", "group by", "details of employee" etc.), classify it as:
@@ -24,9 +32,19 @@ Here is the question:
 Answer:
     """
 
-    response = client.chat.completions.create(
+def detect_query_type_llm(question: str) -> str:
+    response = get_client().chat.completions.create(
+        model="gpt-4",
+        messages=[{"role": "user", "content": classifier_prompt(question)}],
+        temperature=0
+    )
+
+    return response.choices[0].message.content.strip().upper()
+
+async def adetect_query_type_llm(question: str) -> str:
+    response = await get_aclient().chat.completions.create(
         model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
+        messages=[{"role": "user", "content": classifier_prompt(question)}],
         temperature=0
     )
 
@@ -0,0 +1,275 @@
+import os
+import re
+import math
+import time
+import threading
+
+import numpy as np
+
+from .query_classifier import detect_query_type_llm, adetect_query_type_llm
+
+# ==============================
+# ====== LOCAL QUERY ROUTER ====
+# ==============================
+# Decides SQL vs RAG without a GPT round trip. A question is scored from
+# keyword/regex features (the same cues the LLM prompt lists: average, sum,
+# count, top 5, group by, ...), mentions of DuckDB table and column names
+# from `tables_metadata`, and optionally its distance to SQL / RAG example
+# centroids in embedding space. The score is squashed to a probability;
+# only when the router is less than ROUTER_CONFIDENCE sure is the LLM
+# classifier called.
+
+ROUTER_CONFIDENCE = float(os.getenv("ROUTER_CONFIDENCE", "0.8"))
+ROUTER_LLM_FALLBACK = os.getenv("ROUTER_LLM_FALLBACK", "1") == "1"
+ROUTER_EMBEDDINGS = os.getenv("ROUTER_EMBEDDINGS", "0") == "1"
+
+BIAS = -1.5               # with no evidence either way a question is RAG (~0.82)
+CENTROID_WEIGHT = 25.0    # cosine margins are small (~0.02-0.1)
+
+SQL_PATTERNS = [
+    (r"\b(average|avg|mean|median|sum|count|how many|number of|group(ed)? by|order(ed)? by|sort(ed)? by)\b", 2.0),
+    (r"\b(top|bottom|first|last) \d+\b", 2.0),
+    (r"\b(highest|lowest|maximum|minimum|max|min|most|least|oldest|youngest)\b", 1.5),
+    (r"\b(joined|hired|born|reviewed) (after|before|in|since) \d{4}\b", 2.0),
+    (r"\b(greater|less|more|fewer|higher|lower|older|younger) than\b|\b(above|below|over|under|at least|at most) \d", 2.0),
+    (r"[<>]=?\s*\d|\bbetween \d", 2.0),
+    (r"\b(list|show|find|give me) (all|every|the)?\s*(employees|records|rows|people|staff)\b", 2.0),
+    (r"\b(which|who|what) (employees|employee|people|staff)\b", 1.5),
+    (r"\b(per|by|each|for every) (department|location|role|manager|team|city)\b", 1.5),
+    (r"\b(details|record|email( address)?|salary|phone) of\b", 2.0),
+    (r"\btotal\b", 1.0),             # also common in report questions ("total revenue")
+]
+
+RECORD_ID_PATTERN = re.compile(r"\b[A-Z]{3,}\d{3,}\b")   # ids such as FINEMP1000 (case-sensitive)
+RECORD_ID_WEIGHT = 2.5
+
+RAG_PATTERNS = [
+    (r"\b(summar(y|ize|ise)|overview|explain|describe|tell me about|what does .+ mean|defin(e|ition))\b", 2.0),
+    (r"\b(polic(y|ies)|process|procedure|guidelines?|handbook|rules?|eligib(le|ility)|entitled)\b", 2.0),
+    (r"\b(why|how (do|does|can|should|to))\b", 1.5),
+    (r"\b(strategy|strategies|impact|risks?|challenges?|invest(ed|ment)?|compliance|architecture|campaigns?)\b", 1.5),
+    (r"\b(report|quarter(ly)?|q[1-4]|fy\d{2,4}|yoy|year[- ]on[- ]year)\b", 1.0),
+]
+
+# Column-name words too generic to say anything about the question
+SCHEMA_STOPWORDS = {"id", "name", "date", "of", "the", "role", "type", "status", "data",
+                    "value", "pct", "last", "first", "full", "num", "no", "is", "at"}
+
+SQL_EXAMPLES = [
+    "What is the average salary per department?",
+    "How many employees joined in 2020?",
+    "List the top 5 employees by performance rating",
+    "Show all employees in Mumbai with leave balance above 20",
+    "What is the email address of employee FINEMP1010?",
+    "Count employees grouped by location",
+    "Which employees have attendance below 90 percent?",
+    "Who is the manager of the sales team members?",
+]
+
+RAG_EXAMPLES = [
+    "Summarize the quarterly financial report",
+    "What is the company's leave policy?",
+    "Explain the engineering deployment process",
+    "What were the main marketing campaign results in Q3?",
+    "What benefits are employees entitled to?",
+    "Describe the system architecture",
+    "What risks does the company face in 2025?",
+    "What is the code of conduct in the employee handbook?",
+]
+
+
+def _sigmoid(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-x))
+
+
+def _confidence(score: float) -> float:
+    p_sql = _sigmoid(score)
+    return max(p_sql, 1 - p_sql)
+
+
+def _normalize(vector):
+    vec = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class QueryRouter:
+    def __init__(self, embeddings=None, llm_fallback=detect_query_type_llm,
+                 confidence: float = ROUTER_CONFIDENCE, use_llm: bool = ROUTER_LLM_FALLBACK,
+                 allm_fallback=adetect_query_type_llm):
+        self.embeddings = embeddings
+        self.llm_fallback = llm_fallback
+        self.allm_fallback = allm_fallback
+        self.confidence = confidence
+        self.use_llm = use_llm
+        self.sql_patterns = [(re.compile(p, re.IGNORECASE), w) for p, w in SQL_PATTERNS]
+        self.sql_patterns.append((RECORD_ID_PATTERN, RECORD_ID_WEIGHT))
+        self.rag_patterns = [(re.compile(p, re.IGNORECASE), w) for p, w in RAG_PATTERNS]
+        self.tables = set()
+        self.column_phrases = set()
+        self.column_words = set()
+        self._centroids = None
+        self._lock = threading.Lock()
+        self.counts = {"rules": 0, "embedding": 0, "llm": 0}
+        self.local_seconds = 0.0
+        self.llm_seconds = 0.0
+
+    # ---------- schema ----------
+    def refresh_schema(self, duck_conn):
+        """Load table and column names of every table registered in tables_metadata."""
+        tables, phrases, words = set(), set(), set()
+        try:
+            names = [row[0] for row in duck_conn.execute("SELECT DISTINCT table_name FROM tables_metadata").fetchall()]
+        except Exception as e:
+            print(f"Router schema refresh skipped: {e}")
+            return
+        for table in names:
+            tables.add(table.lower().replace("_", " "))
+            try:
+                columns = [row[0] for row in duck_conn.execute(f'DESCRIBE "{table}"').fetchall()]
+            except Exception:
+                continue
+            for column in columns:
+                tokens = [t for t in re.split(r"[\s_\-]+", column.lower()) if t]
+                phrases.add(" ".join(tokens))
+                words.update(t for t in tokens if len(t) > 3 and t not in SCHEMA_STOPWORDS)
+
+        with self._lock:
+            self.tables = tables
+            self.column_phrases = {p for p in phrases if p not in SCHEMA_STOPWORDS}
+            self.column_words = words
+        print(f"Router schema: {len(tables)} tables, {len(phrases)} columns")
+
+    # ---------- scoring ----------
+    def _score(self, question: str) -> float:
+        text = " ".join(re.findall(r"[a-z0-9]+", question.lower()))
+        padded = f" {text} "
+
+        sql = sum(w for p, w in self.sql_patterns if p.search(question))
+        rag = sum(w for p, w in self.rag_patterns if p.search(question))
+
+        schema = 2.0 * sum(1 for t in self.tables if f" {t} " in padded)
+        phrases = [p for p in self.column_phrases if f" {p} " in padded]
+        schema += min(3.0, 1.5 * len(phrases))
+        matched = {w for p in phrases for w in p.split()}
+        words = [w for w in self.column_words - matched if f" {w} " in padded]
+        schema += min(1.5, 0.75 * len(words))
+
+        return BIAS + min(sql, 4.0) + min(schema, 4.0) - min(rag, 4.0)
+
+    def _set_centroids(self, vectors):
+        vectors = np.array([_normalize(v) for v in vectors])
+        sql, rag = vectors[:len(SQL_EXAMPLES)], vectors[len(SQL_EXAMPLES):]
+        self._centroids = (_normalize(sql.mean(axis=0)), _normalize(rag.mean(axis=0)))
+
+    def _wants_embedding(self, score: float) -> bool:
+        return self.embeddings is not None and _confidence(score) < self.confidence
+
+    def _decide(self, score: float, vector=None):
+        source = "rules"
+        if vector is not None and self._centroids is not None:
+            vec = _normalize(vector)
+            score += CENTROID_WEIGHT * float(vec @ self._centroids[0] - vec @ self._centroids[1])
+            source = "embedding"
+        mode = "SQL" if _sigmoid(score) >= 0.5 else "RAG"
+        return mode, _confidence(score), source
+
+    def _needs_llm(self, confidence: float) -> bool:
+        return confidence < self.confidence and self.use_llm
+
+    def _embedding_work(self, question: str, score: float, vector):
+        """
+        (example texts to embed or None, question to embed or None, vector) for this score.
+        Confident rules need no embeddings, so a caller-supplied vector is dropped too.
+        """
+        if not self._wants_embedding(score):
+            return None, None, None
+        examples = SQL_EXAMPLES + RAG_EXAMPLES if self._centroids is None else None
+        return examples, question if vector is None else None, vector
+
+    def _decide_locally(self, score: float, vector, start: float) -> dict:
+        """Rules (plus embedding features when `vector` is set), before any LLM call."""
+        mode, confidence, source = self._decide(score, vector)
+        return {"mode": mode, "confidence": confidence, "source": source,
+                "local": time.perf_counter() - start, "llm": 0.0,
+                "ask_llm": self._needs_llm(confidence)}
+
+    def _apply_llm(self, decision: dict, answer, seconds: float):
+        """Fold the LLM fallback's answer (or the exception it raised) into the decision."""
+        decision["llm"] = seconds
+        if isinstance(answer, Exception):
+            print(f"Router LLM fallback failed, keeping local decision: {answer}")
+            return
+        decision["mode"] = "SQL" if "SQL" in answer else "RAG"
+        decision["source"] = "llm"
+
+    def _record(self, decision: dict) -> dict:
+        self.counts[decision["source"]] += 1
+        self.local_seconds += decision["local"]
+        self.llm_seconds += decision["llm"]
+        return {"mode": decision["mode"], "confidence": round(decision["confidence"], 4),
+                "source": decision["source"]}
+
+    # ---------- routing ----------
+    # route/aroute only differ in how the embedding and LLM calls are made;
+    # scoring, thresholds and stats are the shared helpers above.
+    def route(self, question: str, vector=None) -> dict:
+        """
+        Return {"mode": "SQL"|"RAG", "confidence", "source": "rules"|"embedding"|"llm"}.
+        `vector` may be the question's embedding if the caller already has one.
+        """
+        start = time.perf_counter()
+        score = self._score(question)
+        examples, query, vector = self._embedding_work(question, score, vector)
+        try:
+            if examples:
+                self._set_centroids(self.embeddings.embed_documents(examples))
+            if query:
+                vector = self.embeddings.embed_query(query)
+        except Exception as e:
+            print(f"Router embedding features skipped: {e}")
+            vector = None
+
+        decision = self._decide_locally(score, vector, start)
+        if decision["ask_llm"] and self.llm_fallback is not None:
+            llm_start = time.perf_counter()
+            try:
+                answer = self.llm_fallback(question)
+            except Exception as e:
+                answer = e
+            self._apply_llm(decision, answer, time.perf_counter() - llm_start)
+        return self._record(decision)
+
+    async def aroute(self, question: str, vector=None) -> dict:
+        """Async `route`: embedding and LLM fallback calls are awaited, never blocking the event loop."""
+        start = time.perf_counter()
+        score = self._score(question)
+        examples, query, vector = self._embedding_work(question, score, vector)
+        try:
+            if examples:
+                self._set_centroids(await self.embeddings.aembed_documents(examples))
+            if query:
+                vector = await self.embeddings.aembed_query(query)
+        except Exception as e:
+            print(f"Router embedding features skipped: {e}")
+            vector = None
+
+        decision = self._decide_locally(score, vector, start)
+        if decision["ask_llm"] and self.allm_fallback is not None:
+            llm_start = time.perf_counter()
+            try:
+                answer = await self.allm_fallback(question)
+            except Exception as e:
+                answer = e
+            self._apply_llm(decision, answer, time.perf_counter() - llm_start)
+        return self._record(decision)
+
+    def stats(self) -> dict:
+        total = sum(self.counts.values())
+        return {
+            **self.counts,
+            "llm_rate": round(self.counts["llm"] / total, 4) if total else 0.0,
+            "avg_local_ms": round(1000 * self.local_seconds / total, 3) if total else 0.0,
+            "llm_seconds": round(self.llm_seconds, 3),
+            "tables": len(self.tables),
+        }
@@ -1,10 +1,36 @@
-from .rag_module import get_rag_chain
+from .rag_module import get_rag_chain, get_rag_retriever, question_answering_chain
 
 
-async def ask_rag(question: str, role: str, cohere_api_key: str = None) -> dict:
+async def retrieve_context(question: str, role: str, cohere_api_key: str = None) -> list:
+    retriever = get_rag_retriever(user_role=role, cohere_api_key=cohere_api_key)
+    return await retriever.ainvoke(question)
+
+
+def document_sources(docs) -> list[str]:
+    sources = []
+    for doc in docs or []:
+        source = doc.metadata.get("source")
+        if source and source not in sources:
+            sources.append(source)
+    return sources
+
+
+async def ask_rag(question: str, role: str, cohere_api_key: str = None, context: list = None) -> dict:
+    # Documents already retrieved (speculatively, or before a failed SQL attempt) skip retrieval
+    if context is not None:
+        answer = await question_answering_chain.ainvoke({"input": question, "context": context})
+        return {"answer": answer, "sources": document_sources(context)}
+
     chain = get_rag_chain(user_role=role, cohere_api_key=cohere_api_key)
-    result = chain.invoke({"input": question})
-    return {"answer": result["answer"]}
+    result = await chain.ainvoke({"input": question})
+    return {"answer": result["answer"], "sources": document_sources(result.get("context"))}
+
+
+async def stream_rag_answer(question: str, context: list):
+    """Yield the answer text in chunks as the model produces them."""
+    async for chunk in question_answering_chain.astream({"input": question, "context": context}):
+        if chunk:
+            yield chunk
 
     """
       # result now includes: {"context": [...], "answer": "..."}
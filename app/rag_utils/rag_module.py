@@ -5,6 +5,8 @@ import pandas as pd
 from collections import defaultdict
 from langchain.schema import Document
 import sqlite3
+import threading
+import hashlib
 
 
 from langchain_community.document_loaders import UnstructuredMarkdownLoader
@@ -17,6 +19,15 @@ from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_retrieval_chain
 
 from .secret_key import openapi_key,langchain_key,cohere_api_key
+from .embedding_cache import CachedEmbeddings
+from .embedding_pipeline import batch_by_tokens, run_embedding_pipeline
+from .csv_profile import profile_csv
+from .index_version import bump_index_version
+from .hybrid_search import (HybridRetriever, RETRIEVAL_MODE, HYBRID_FETCH_K,
+                            index_chunks, remove_chunks, count_chunks, rebuild_from_store)
+from .reranker import LocalReranker, RERANKER, RERANK_FETCH_K
+from .numpy_store import NumpyVectorStore, NUMPY_STORE_DIR
+from .partitioned_store import PartitionedVectorStore, VECTOR_PARTITIONING
 
 
 
@@ -32,32 +43,170 @@ os.environ["COHERE_API_KEY"] = cohere_api_key
 # ====Split,load,embed==========
 # ==============================
 
-openai_embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-vectorstore = Chroma(
-    collection_name="my_collection",
-    persist_directory="chroma_db",
-    embedding_function=openai_embeddings
-)
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Every embedding call (indexing, retrieval, evaluator) goes through the on-disk cache
+openai_embeddings = CachedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), model_name=EMBEDDING_MODEL)
+
+# chroma (default) or numpy: memory-mapped matrix + per-role row masks (see numpy_store.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+# VECTOR_PARTITIONING=role: one collection per role instead of a role filter (see partitioned_store.py)
+if VECTOR_PARTITIONING == "role":
+    vectorstore = PartitionedVectorStore(embedding_function=openai_embeddings, backend=VECTOR_BACKEND)
+elif VECTOR_BACKEND == "numpy":
+    vectorstore = NumpyVectorStore(embedding_function=openai_embeddings, persist_directory=NUMPY_STORE_DIR)
+else:
+    vectorstore = Chroma(
+        collection_name="my_collection",
+        persist_directory="chroma_db",
+        embedding_function=openai_embeddings
+    )
 
 
-def embed_documents_to_vectorstore(docs):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    splits = text_splitter.split_documents(docs)
-    vectorstore.add_documents(splits)
-    
-    print("Documents embedded and saved to vectorstore.")
-    print("Total documents:", len(vectorstore.get()["documents"]))
-    #print("Chunks being added:")
-    #for chunk in splits:
-    #    print(f"---\n{chunk.page_content[:150]}...\nMetadata: {chunk.metadata}")
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+
+def file_content_hash(filepath, block_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def make_chunk_id(source_key, text):
+    # Same source + same text -> same id, so unchanged chunks are never re-embedded
+    source = hashlib.sha1(source_key.encode("utf-8")).hexdigest()[:16]
+    return f"{source}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]}"
+
+
+def split_into_chunks(docs, source_key):
+    """Split docs and key each chunk by its content-derived id (identical chunks collapse)."""
+    chunks = {}
+    for chunk in text_splitter.split_documents(docs):
+        chunks.setdefault(make_chunk_id(source_key, chunk.page_content), chunk)
+    return chunks
+
+
+def get_indexed_chunk_ids(c, source_key, docs):
+    c.execute("SELECT chunk_id FROM chunk_manifest WHERE filepath = ?", (source_key,))
+    ids = {row[0] for row in c.fetchall()}
+    if ids or not docs:
+        return ids
+
+    # Chunks indexed before the manifest existed carry random ids; find them by metadata
+    # and adopt them into the manifest so they are cleaned up even if this run is interrupted
+    meta = docs[0].metadata
+    where = {"$and": [{"source": meta["source"]}, {"role": meta["role"]}]}
+    ids = set(vectorstore.get(where=where, include=[])["ids"])
+    c.executemany(
+        "INSERT OR IGNORE INTO chunk_manifest (filepath, chunk_id) VALUES (?, ?)",
+        [(source_key, chunk_id) for chunk_id in ids]
+    )
+    return ids
+
+
+def plan_document_update(docs, source_key, c):
+    """Diff a document's chunks against the manifest: returns ({new_id: chunk}, [stale_ids])."""
+    chunks = split_into_chunks(docs, source_key)
+    existing = get_indexed_chunk_ids(c, source_key, docs)
+
+    new_chunks = {chunk_id: chunk for chunk_id, chunk in chunks.items() if chunk_id not in existing}
+    stale_ids = [chunk_id for chunk_id in existing if chunk_id not in chunks]
+
+    print(f"{source_key}: {len(new_chunks)} new, {len(stale_ids)} stale, "
+          f"{len(chunks) - len(new_chunks)} unchanged chunks.")
+    return new_chunks, stale_ids
+
+
+def remove_stale_chunks(c, source_key, stale_ids):
+    if stale_ids:
+        vectorstore.delete(ids=stale_ids)
+        remove_chunks(c, stale_ids)
+        c.executemany(
+            "DELETE FROM chunk_manifest WHERE filepath = ? AND chunk_id = ?",
+            [(source_key, chunk_id) for chunk_id in stale_ids]
+        )
+        bump_index_version(f"{len(stale_ids)} stale chunks removed")
 
 
+def add_embedded_chunks(chunks, ids, vectors):
+    """Write chunks with the vectors already computed for them; nothing is embedded again."""
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+    if isinstance(vectorstore, (NumpyVectorStore, PartitionedVectorStore)):
+        vectorstore.add_vectors(vectors, texts, metadatas, ids)
+    else:
+        vectorstore._collection.upsert(ids=ids, embeddings=[list(v) for v in vectors],
+                                       documents=texts, metadatas=metadatas)
+
+
+def embed_chunks(c, pending, on_batch_committed=None):
+    """
+    Embed (source_key, chunk_id, chunk) triples in token-bounded, concurrent batches.
+    Each batch is written to the vector store and the manifest and committed on its own,
+    so an interrupted run only has to embed what is still missing.
+    """
+    batches = batch_by_tokens(pending, text_of=lambda item: item[2].page_content)
+
+    def commit(i, vectors):
+        batch = batches[i]
+        add_embedded_chunks([chunk for _, _, chunk in batch], [chunk_id for _, chunk_id, _ in batch], vectors)
+        c.executemany(
+            "INSERT OR IGNORE INTO chunk_manifest (filepath, chunk_id) VALUES (?, ?)",
+            [(source_key, chunk_id) for source_key, chunk_id, _ in batch]
+        )
+        index_chunks(c, [(chunk_id, chunk) for _, chunk_id, chunk in batch])
+        c.connection.commit()
+        bump_index_version(f"{len(batch)} chunks added")
+        if on_batch_committed:
+            on_batch_committed(batch)
+
+    return run_embedding_pipeline(
+        [[chunk.page_content for _, _, chunk in batch] for batch in batches],
+        vectorstore.embeddings.embed_documents,
+        commit,
+    )
+
+
+def embed_documents_to_vectorstore(docs, source_key, c):
+    """Sync one document's chunks with the vector store: embed only new chunks, drop stale ones."""
+    new_chunks, stale_ids = plan_document_update(docs, source_key, c)
+    embed_chunks(c, [(source_key, chunk_id, chunk) for chunk_id, chunk in new_chunks.items()])
+    remove_stale_chunks(c, source_key, stale_ids)
+    return len(new_chunks), len(stale_ids)
+
+
+def sync_bm25_index(c):
+    """Rebuild the BM25 index from the vector store if they drifted apart (e.g. chunks indexed before it existed)."""
+    stored = len(vectorstore.get(include=[])["ids"])
+    if count_chunks(c) != stored:
+        rebuilt = rebuild_from_store(c, vectorstore)
+        c.connection.commit()
+        print(f"BM25 index rebuilt from the vector store ({rebuilt} chunks).")
 
 
-def load_file(filepath, role):
+
+
+# How CSVs are embedded (the same tables are queryable row by row via SQL/DuckDB):
+#   rows    - one Document per row (legacy; grows linearly with the table)
+#   profile - one schema/profile Document per table
+#   groups  - profile + one summary Document per CSV_GROUP_ROWS rows
+CSV_INDEX_MODE = os.getenv("CSV_INDEX_MODE", "groups").lower()
+CSV_GROUP_ROWS = int(os.getenv("CSV_GROUP_ROWS", "500"))
+
+
+def load_file(filepath, role, csv_mode=None):
     ext = Path(filepath).suffix.lower()
+    csv_mode = csv_mode or CSV_INDEX_MODE
     try:
-        if ext == ".csv":
+        if ext == ".csv" and csv_mode == "profile":
+            return profile_csv(filepath, role)
+
+        elif ext == ".csv" and csv_mode == "groups":
+            return profile_csv(filepath, role, group_rows=CSV_GROUP_ROWS)
+
+        elif ext == ".csv":
             df1 = pd.read_csv(filepath)
             documents = []
             for row in df1.to_dict(orient="records"):
@@ -87,30 +236,109 @@ def load_file(filepath, role):
         return None
 
 
-def run_indexer():
-    conn = sqlite3.connect("roles_docs.db")
-    c = conn.cursor()
-    c.execute("SELECT id, filepath, role FROM documents WHERE embedded = 0")
-    
-    all_docs = []
+# embedded: 0 = pending, -1 = claimed by a running indexer, 1 = indexed
+_indexer_lock = threading.Lock()
+
 
+def claim_pending_documents(c):
+    """Atomically mark pending rows as in-progress so concurrent runs never pick the same document."""
+    c.execute("SELECT id, filepath, role FROM documents WHERE embedded = 0")
+    claimed = []
     for doc_id, path, role in c.fetchall():
-        docs = load_file(path, role)
-        if docs:
-            if isinstance(docs, list):
-                all_docs.extend(docs)
-            else:
-                all_docs.append(docs)
-
-            # Mark this file as embedded
-            c.execute("UPDATE documents SET embedded = 1 WHERE id = ?", (doc_id,))
-
-    if all_docs:
-        embed_documents_to_vectorstore(all_docs)
+        c.execute("UPDATE documents SET embedded = -1 WHERE id = ? AND embedded = 0", (doc_id,))
+        if c.rowcount == 1:
+            claimed.append((doc_id, path, role))
+    return claimed
+
+
+def run_indexer(progress_callback=None):
+    with _indexer_lock:
+        conn = sqlite3.connect("roles_docs.db", timeout=30)
+        c = conn.cursor()
+        sync_bm25_index(c)
+        claimed = claim_pending_documents(c)
         conn.commit()
 
-    conn.close()
-    print(f"Indexed {len(all_docs)} document chunks.")
+        done = []
+        stats = {"chunks": 0, "chunks_per_sec": 0.0}
+
+        def mark_indexed(doc_id, content_hash):
+            # A re-upload while we were indexing resets embedded to 0; leave it pending then
+            c.execute(
+                "UPDATE documents SET embedded = 1, content_hash = ? WHERE id = ? AND embedded = -1",
+                (content_hash, doc_id)
+            )
+            conn.commit()
+            done.append(doc_id)
+            if progress_callback:
+                progress_callback(len(done), len(claimed))
+
+        try:
+            # 1. Work out what changed in every claimed document
+            plans = {}  # path -> [doc_id, content_hash, stale_ids, chunks still to embed]
+            pending = []
+            for doc_id, path, role in claimed:
+                try:
+                    content_hash = file_content_hash(path)
+                except OSError as e:
+                    print(f"Failed to process {path}: {e}")
+                    continue
+
+                c.execute("SELECT content_hash FROM documents WHERE id = ?", (doc_id,))
+                unchanged = c.fetchone()[0] == content_hash
+                if unchanged:
+                    c.execute("SELECT 1 FROM chunk_manifest WHERE filepath = ? LIMIT 1", (path,))
+                    unchanged = c.fetchone() is not None
+
+                if unchanged:
+                    # Re-upload of identical content: nothing to embed
+                    print(f"{path}: unchanged, skipping.")
+                    mark_indexed(doc_id, content_hash)
+                    continue
+
+                docs = load_file(path, role)
+                if not docs:
+                    continue  # released back to pending below
+
+                new_chunks, stale_ids = plan_document_update(docs, path, c)
+                plans[path] = [doc_id, content_hash, stale_ids, len(new_chunks)]
+                pending.extend((path, chunk_id, chunk) for chunk_id, chunk in new_chunks.items())
+            conn.commit()
+
+            def finish_document(path):
+                doc_id, content_hash, stale_ids, _ = plans[path]
+                remove_stale_chunks(c, path, stale_ids)
+                mark_indexed(doc_id, content_hash)
+
+            def on_batch_committed(batch):
+                for path, _, _ in batch:
+                    plans[path][3] -= 1
+                for path in {path for path, _, _ in batch}:
+                    if plans[path][3] == 0:
+                        finish_document(path)
+
+            # 2. Documents that only lost chunks are finished straight away
+            for path, plan in plans.items():
+                if plan[3] == 0:
+                    finish_document(path)
+
+            # 3. Embed everything new across all documents in shared batches
+            if pending:
+                stats = embed_chunks(c, pending, on_batch_committed)
+        finally:
+            c.executemany(
+                "UPDATE documents SET embedded = 0 WHERE id = ? AND embedded = -1",
+                [(doc_id,) for doc_id, _, _ in claimed]
+            )
+            conn.commit()
+            conn.close()
+
+    print(f"Indexed {len(done)} documents ({stats['chunks']} new chunks embedded).")
+    return {
+        "documents": len(done),
+        "chunks": stats["chunks"],
+        "chunks_per_sec": stats["chunks_per_sec"],
+    }
 
 
 # ==============================
@@ -146,42 +374,99 @@ question_answering_chain = create_stuff_documents_chain(model, chat_prompt)
 # ==============================
 # Add a Reranker
 # ==============================
-def wrap_with_reranker(retriever, cohere_api_key, top_n=4):
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "4"))
+
+
+def wrap_with_reranker(retriever, cohere_api_key, top_n=RETRIEVER_K):
+    # Optional dependency, imported only when a Cohere key is actually passed
+    from langchain.retrievers import ContextualCompressionRetriever
+    try:
+        from langchain_cohere import CohereRerank
+    except ImportError:
+        print("langchain-cohere is not installed; using the local reranker instead.")
+        return wrap_with_local_reranker(retriever, top_n)
+
     #print("[INFO] Using Cohere reranker.")
-    reranker = CohereRerank(cohere_api_key=cohere_api_key, top_n=top_n)
+    reranker = CohereRerank(cohere_api_key=cohere_api_key, top_n=top_n, model="rerank-english-v3.0")
     return ContextualCompressionRetriever(
         base_compressor=reranker,
         base_retriever=retriever
     )
 
-def get_rag_chain(user_role: str,cohere_api_key: str = None):
+
+def wrap_with_local_reranker(retriever, top_n=RETRIEVER_K):
+    from langchain.retrievers import ContextualCompressionRetriever
+
+    return ContextualCompressionRetriever(
+        base_compressor=LocalReranker(embeddings=openai_embeddings, top_n=top_n),
+        base_retriever=retriever
+    )
+
+
+def get_role_retriever(user_role: str, k: int = RETRIEVER_K):
     user_role = user_role.lower()
 
     if user_role == "c-level":
         # C-level sees everything
-        retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
+        return vectorstore.as_retriever(search_kwargs={"k": k})
 
     elif user_role == "general":
         # General role sees only general documents
-        retriever = vectorstore.as_retriever(search_kwargs={
-            "k": 4,
+        return vectorstore.as_retriever(search_kwargs={
+            "k": k,
             "filter": {"role": "general"}
         })
 
     else:
         # All other roles see their docs + general
-        retriever = vectorstore.as_retriever(search_kwargs={
-            "k": 4,
+        return vectorstore.as_retriever(search_kwargs={
+            "k": k,
             "filter": {
                 "role": {"$in": [user_role, "general"]}
             }
         })
 
+
+def get_readable_roles(user_role: str):
+    """Roles whose chunks `user_role` may read (None = all), matching get_role_retriever's filter."""
+    user_role = user_role.lower()
+    if user_role == "c-level":
+        return None
+    if user_role == "general":
+        return ["general"]
+    return [user_role, "general"]
+
+
+def get_hybrid_retriever(user_role: str, k: int = RETRIEVER_K):
+    # Over-fetch from both sides, fuse, keep k
+    return HybridRetriever(
+        vector_retriever=get_role_retriever(user_role, k=max(k, HYBRID_FETCH_K)),
+        roles=get_readable_roles(user_role),
+        k=k,
+        fetch_k=max(k, HYBRID_FETCH_K),
+    )
+
+
+def build_rag_retriever(user_role: str, cohere_api_key: str = None):
+    # With a reranker, fetch RERANK_FETCH_K candidates and let it keep RETRIEVER_K
+    rerank = bool(cohere_api_key) or RERANKER == "local"
+    k = max(RERANK_FETCH_K, RETRIEVER_K) if rerank else RETRIEVER_K
+    if RETRIEVAL_MODE == "hybrid":
+        retriever = get_hybrid_retriever(user_role, k)
+    else:
+        retriever = get_role_retriever(user_role, k)
+
     # wrap with reranker
     if cohere_api_key:
         print("Using cohere reranker")
         retriever = wrap_with_reranker(retriever, cohere_api_key)
+    elif RERANKER == "local":
+        retriever = wrap_with_local_reranker(retriever)
+    return retriever
 
+
+def build_rag_chain(user_role: str,cohere_api_key: str = None, retriever=None):
+    retriever = retriever or build_rag_retriever(user_role, cohere_api_key)
     return create_retrieval_chain(retriever, question_answering_chain)
     """
     from langchain_core.runnables import RunnableLambda, RunnableMap
@@ -194,6 +479,42 @@ def get_rag_chain(user_role: str,cohere_api_key: str = None):
     })"""
 
 
+# ==============================
+# Per-role chain registry
+# ==============================
+# Chains are stateless, so one prebuilt chain per (role, reranker key) is shared by
+# all requests. The retrieval settings (RETRIEVER_K, RETRIEVAL_MODE, RERANKER,
+# the vector store) are fixed at import, so the registry is only dropped when
+# roles change (invalidate_rag_chains).
+_chain_registry = {}
+_chain_registry_lock = threading.Lock()
+
+
+def invalidate_rag_chains():
+    with _chain_registry_lock:
+        _chain_registry.clear()
+
+
+def _registry_entry(user_role: str, cohere_api_key: str = None):
+    key = (user_role.lower(), cohere_api_key)
+
+    with _chain_registry_lock:
+        entry = _chain_registry.get(key)
+        if entry is None:
+            retriever = build_rag_retriever(user_role, cohere_api_key)
+            entry = _chain_registry[key] = (retriever, build_rag_chain(user_role, cohere_api_key, retriever))
+    return entry
+
+
+def get_rag_chain(user_role: str,cohere_api_key: str = None):
+    return _registry_entry(user_role, cohere_api_key)[1]
+
+
+def get_rag_retriever(user_role: str, cohere_api_key: str = None):
+    """The role-filtered retriever the role's chain uses, for retrieval ahead of generation."""
+    return _registry_entry(user_role, cohere_api_key)[0]
+
+
 """
 # ========== MAIN EXECUTION ==========
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+import os
+from typing import Any, Optional, Sequence
+
+import numpy as np
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import Document, BaseDocumentCompressor
+
+from .hybrid_search import TOKEN_PATTERN, STOPWORDS
+
+# ==============================
+# ===== LOCAL RERANKER =========
+# ==============================
+# The retriever over-fetches RERANK_FETCH_K candidates and a reranker cuts them
+# down to the RETRIEVER_K chunks that go into the prompt. The local reranker
+# runs on CPU with no network call: each candidate is scored by cosine
+# similarity to the question (vectors come from the embedding cache, so
+# already-indexed chunks cost no API call) blended with lexical overlap
+# (share of the question's terms found in the chunk), then picked with MMR so
+# near-duplicate chunks don't fill the prompt.
+#
+# RERANKER: none (default) or local. A cohere_api_key passed to /chat still
+# selects Cohere's hosted reranker.
+
+RERANKER = os.getenv("RERANKER", "none").lower()
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "20"))
+RERANK_LEXICAL_WEIGHT = float(os.getenv("RERANK_LEXICAL_WEIGHT", "0.3"))
+RERANK_MMR_LAMBDA = float(os.getenv("RERANK_MMR_LAMBDA", "0.7"))
+
+
+def _terms(text: str) -> set:
+    return {t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS}
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class LocalReranker(BaseDocumentCompressor):
+    """Cosine + lexical-overlap relevance, MMR selection; a drop-in for CohereRerank."""
+
+    embeddings: Optional[Any] = None
+    top_n: int = 4
+    lexical_weight: float = RERANK_LEXICAL_WEIGHT
+    mmr_lambda: float = RERANK_MMR_LAMBDA
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def scores(self, query: str, documents: Sequence[Document]):
+        """(relevance per document, document-document cosine matrix or None)."""
+        q_terms = _terms(query)
+        lexical = np.array([len(q_terms & _terms(d.page_content)) / len(q_terms) if q_terms else 0.0
+                            for d in documents], dtype=np.float32)
+        if self.embeddings is None:
+            return lexical, None
+
+        doc_vectors = _unit_rows(self.embeddings.embed_documents([d.page_content for d in documents]))
+        query_vector = _unit_rows([self.embeddings.embed_query(query)])[0]
+        semantic = doc_vectors @ query_vector
+        relevance = (1 - self.lexical_weight) * semantic + self.lexical_weight * lexical
+        return relevance, doc_vectors @ doc_vectors.T
+
+    def compress_documents(self, documents: Sequence[Document], query: str,
+                           callbacks: Optional[Callbacks] = None) -> Sequence[Document]:
+        if not documents:
+            return []
+        relevance, similarity = self.scores(query, documents)
+        if similarity is None:
+            order = np.argsort(-relevance, kind="stable")[:self.top_n]
+            return [documents[i] for i in order]
+
+        selected = []
+        candidates = list(range(len(documents)))
+        while candidates and len(selected) < self.top_n:
+            if selected:
+                redundancy = similarity[np.ix_(candidates, selected)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(candidates), dtype=np.float32)
+            mmr = self.mmr_lambda * relevance[candidates] - (1 - self.mmr_lambda) * redundancy
+            best = candidates[int(np.argmax(mmr))]
+            selected.append(best)
+            candidates.remove(best)
+        return [documents[i] for i in selected]
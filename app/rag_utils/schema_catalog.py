@@ -0,0 +1,103 @@
+import threading
+
+# ==============================
+# ======= SCHEMA CATALOG =======
+# ==============================
+# Schema text for NL->SQL prompts, built from DuckDB's own catalog
+# (SUMMARIZE: column types, ranges, distinct counts) and cached per table.
+# Prompts only include the tables the caller's role may query. A table's
+# entry is dropped when it is re-uploaded; `version` changes on every
+# invalidation so anything derived from the schema can be keyed on it.
+# known_values() serves the distinct values of a column (e.g. to check that a
+# value substituted into a cached SQL template exists in the column it filters).
+
+SAMPLE_VALUES = 15   # text columns with at most this many distinct values list them all
+KNOWN_VALUES_MAX = 1000   # above this many distinct values a column's values aren't kept
+
+
+class SchemaCatalog:
+    def __init__(self, fetch):
+        """`fetch(sql, params)` runs a query and returns (columns, rows)."""
+        self.fetch = fetch
+        self._tables = {}
+        self._values = {}         # (table, column) -> set of values as strings, or None
+        self._lock = threading.Lock()
+        self.version = 0
+        self.builds = 0
+
+    def _describe_column(self, table, name, col_type, lo, hi, distinct, null_pct) -> str:
+        parts = [f"{name} {col_type}"]
+        numeric_or_date = any(t in col_type for t in ("INT", "DOUBLE", "DECIMAL", "FLOAT", "DATE", "TIME"))
+        if numeric_or_date and lo is not None:
+            parts.append(f"range {lo} .. {hi}")
+        elif distinct is not None and distinct <= SAMPLE_VALUES:
+            _, rows = self.fetch(f'SELECT DISTINCT "{name}" FROM "{table}" WHERE "{name}" IS NOT NULL '
+                                 f'ORDER BY 1 LIMIT ?', [SAMPLE_VALUES + 1])
+            values = ", ".join(repr(str(r[0])) for r in rows[:SAMPLE_VALUES])
+            parts.append(f"values {values}" + (", ..." if len(rows) > SAMPLE_VALUES else ""))
+        elif lo is not None:
+            parts.append(f"e.g. {lo!r}")
+        if distinct is not None:
+            parts.append(f"~{distinct} distinct")
+        if null_pct:
+            parts.append(f"{float(null_pct):.0f}% null")
+        return f"  - {parts[0]}" + (f" ({'; '.join(parts[1:])})" if len(parts) > 1 else "")
+
+    def _build(self, table: str) -> str:
+        columns, rows = self.fetch(f'SUMMARIZE "{table}"')
+        summary = [dict(zip(columns, row)) for row in rows]
+        row_count = summary[0]["count"] if summary else 0
+        lines = [f"Table: {table} ({row_count} rows)", "Columns:"]
+        for col in summary:
+            lines.append(self._describe_column(table, col["column_name"], col["column_type"], col["min"],
+                                               col["max"], col["approx_unique"], col["null_percentage"]))
+        self.builds += 1
+        return "\n".join(lines)
+
+    def table_schema(self, table: str):
+        with self._lock:
+            cached = self._tables.get(table)
+        if cached is not None:
+            return cached
+        try:
+            schema = self._build(table)
+        except Exception as e:
+            print(f"❌ Error while building schema for {table}: {e}")
+            return None
+        with self._lock:
+            self._tables[table] = schema
+        return schema
+
+    def schema_block(self, tables: list[str]) -> str:
+        """Prompt text for `tables` only (unknown tables are skipped)."""
+        schemas = [self.table_schema(t) for t in sorted(set(tables))]
+        return "\n\n".join(s for s in schemas if s)
+
+    def known_values(self, table: str, column: str):
+        """Distinct values of `column` as strings, or None if it has too many or doesn't exist."""
+        with self._lock:
+            if (table, column) in self._values:
+                return self._values[(table, column)]
+        try:
+            _, rows = self.fetch(f'SELECT DISTINCT CAST("{column}" AS VARCHAR) FROM "{table}" '
+                                 f'WHERE "{column}" IS NOT NULL LIMIT ?', [KNOWN_VALUES_MAX + 1])
+            values = {r[0] for r in rows} if len(rows) <= KNOWN_VALUES_MAX else None
+        except Exception:
+            values = None
+        with self._lock:
+            self._values[(table, column)] = values
+        return values
+
+    def invalidate(self, table: str = None):
+        with self._lock:
+            if table is None:
+                self._tables.clear()
+                self._values.clear()
+            else:
+                self._tables.pop(table, None)
+                for key in [k for k in self._values if k[0] == table]:
+                    del self._values[key]
+            self.version += 1
+
+    def stats(self) -> dict:
+        return {"tables": len(self._tables), "builds": self.builds, "version": self.version}
@@ -0,0 +1,119 @@
+import os
+import time
+import threading
+
+import numpy as np
+
+# ==============================
+# ==== SEMANTIC ANSWER CACHE ===
+# ==============================
+# Paraphrased questions ("how many leave days do I get" / "annual leave
+# entitlement") reuse a previous answer for the same role when the cosine
+# similarity of their embeddings is above SEMANTIC_CACHE_THRESHOLD.
+# Each role has its own fixed-capacity matrix of normalized float32 vectors;
+# lookups are one matrix-vector product. A role's entries are dropped as soon
+# as the index version changes, and the least recently used entry is replaced
+# when the role is full. SQL-routed answers (including "SQL → fallback to
+# RAG") are never stored: questions that differ only in a value ("average
+# salary in Finance" / "... in Sales", two employee ids) embed almost
+# identically but need different numbers.
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_CAPACITY = int(os.getenv("SEMANTIC_CACHE_CAPACITY", "500"))
+
+
+class _RoleIndex:
+    def __init__(self, dim, capacity, version):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.entries = []       # slot -> {"question", "response", "latency", "last_used"}
+        self.version = version
+
+
+class SemanticCache:
+    def __init__(self, embeddings, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 capacity: int = SEMANTIC_CACHE_CAPACITY, enabled: bool = SEMANTIC_CACHE_ENABLED):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.capacity = capacity
+        self.enabled = enabled
+        self._roles = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    @staticmethod
+    def _normalize(vector):
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    async def lookup(self, role: str, question: str, version: int):
+        """
+        Return (cached_response_or_None, similarity, question_vector).
+        The vector is handed back so a miss can be stored without embedding twice.
+        """
+        if not self.enabled:
+            return None, 0.0, None
+
+        start = time.perf_counter()
+        try:
+            vec = self._normalize(await self.embeddings.aembed_query(question))
+        except Exception as e:
+            print(f"Semantic cache lookup skipped: {e}")
+            return None, 0.0, None
+
+        with self._lock:
+            index = self._roles.get(role.lower())
+            if index is None or index.version != version or not index.entries:
+                self.misses += 1
+                return None, 0.0, vec
+
+            sims = index.vectors[:len(index.entries)] @ vec
+            best = int(np.argmax(sims))
+            similarity = float(sims[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None, similarity, vec
+
+            entry = index.entries[best]
+            entry["last_used"] = time.monotonic()
+            self.hits += 1
+            self.latency_saved += max(0.0, entry["latency"] - (time.perf_counter() - start))
+            return dict(entry["response"]), similarity, vec
+
+    def store(self, role: str, question: str, version: int, response: dict, latency: float, vector):
+        if not self.enabled or vector is None or response.get("mode", "").startswith("SQL"):
+            return
+
+        with self._lock:
+            index = self._roles.get(role.lower())
+            if index is None or index.version != version:
+                index = self._roles[role.lower()] = _RoleIndex(len(vector), self.capacity, version)
+
+            entry = {"question": question, "response": dict(response),
+                     "latency": latency, "last_used": time.monotonic()}
+            if len(index.entries) < self.capacity:
+                slot = len(index.entries)
+                index.entries.append(entry)
+            else:
+                slot = min(range(len(index.entries)), key=lambda i: index.entries[i]["last_used"])
+                index.entries[slot] = entry
+            index.vectors[slot] = vector
+
+    def clear(self):
+        with self._lock:
+            self._roles.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "entries": sum(len(i.entries) for i in self._roles.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "latency_saved_s": round(self.latency_saved, 3),
+        }
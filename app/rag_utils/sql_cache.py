@@ -0,0 +1,222 @@
+import os
+import re
+import hashlib
+import threading
+
+from ..cache_utils import TTLCache
+from .answer_cache import normalize_question
+
+# ==============================
+# ===== NL->SQL CACHE + TEMPLATES
+# ==============================
+# Two layers in front of the GPT-4 translation in csv_query:
+#   1. exact: generated SQL keyed by (role, normalized question, schema version)
+#   2. templates: once a generated query has run and returned rows, every
+#      literal that appears both in the question and in the SQL ('Finance',
+#      5, 2020) becomes a slot. "average salary in Sales" then matches the
+#      template learned from "average salary in Finance" and runs as a
+#      parameterized DuckDB query without calling the LLM. Each string slot
+#      remembers the column it is compared with; csv_query only runs the
+#      template if the new value is one of that column's known values (so
+#      "employees in Mumbai" can't reuse a department = ? template), and treats
+#      an empty result or an all-NULL/zero aggregate row as a miss. A template
+#      that misses is counted as a fallback and the LLM translation runs as before.
+
+SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "1") == "1"
+SQL_TEMPLATES_ENABLED = os.getenv("SQL_TEMPLATES_ENABLED", "1") == "1"
+SQL_CACHE_TTL = float(os.getenv("SQL_CACHE_TTL", "86400"))
+SQL_CACHE_SIZE = int(os.getenv("SQL_CACHE_SIZE", "1000"))
+SQL_TEMPLATES_PER_ROLE = int(os.getenv("SQL_TEMPLATES_PER_ROLE", "200"))
+
+STRING_LITERAL = re.compile(r"'((?:[^']|'')*)'")
+NUMBER_LITERAL = re.compile(r"(?<![\w.'])(\d+(?:\.\d+)?)(?![\w.'])")
+# The column a literal is compared with: "department = 'x'", "UPPER(dept) <> 'x'", "city IN ('a', 'x'"
+COMPARED_COLUMN = re.compile(r'"?([\w-]+)"?\)?\s*(?:=|<>|!=|\bIN\s*\((?:[^()]*,)?)\s*$', re.IGNORECASE)
+CASE_TRANSFORMS = {"same": lambda s: s, "lower": str.lower, "upper": str.upper, "title": str.title}
+
+
+def _question_text(question: str) -> str:
+    return re.sub(r"\s+", " ", question.strip()).rstrip("?!. ")
+
+
+def _sql_literals(sql: str):
+    """[(start, end, value, kind)] for string and numeric literals in `sql`, in order."""
+    literals = [(m.start(), m.end(), m.group(1).replace("''", "'"), "string") for m in STRING_LITERAL.finditer(sql)]
+    masked = STRING_LITERAL.sub(lambda m: " " * len(m.group(0)), sql)
+    literals += [(m.start(), m.end(), m.group(1), "number") for m in NUMBER_LITERAL.finditer(masked)]
+    return sorted(literals)
+
+
+class SqlTemplate:
+    def __init__(self, pattern: str, sql: str, slots: list, question: str):
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.sql = sql
+        self.slots = slots            # per SQL parameter: (question group index, kind, case transform, column)
+        self.question = question      # the question it was learned from
+        self.id = hashlib.sha1(f"{pattern}\x00{sql}".encode("utf-8")).hexdigest()[:10]
+        self.uses = 0
+        self.fallbacks = 0
+
+    def match(self, question: str):
+        m = self.pattern.fullmatch(_question_text(question))
+        if not m:
+            return None
+        params = []
+        for group, kind, transform, _ in self.slots:
+            value = m.group(group + 1)
+            if kind == "number":
+                params.append(float(value) if "." in value else int(value))
+            else:
+                params.append(CASE_TRANSFORMS[transform](value))
+        return params
+
+    def string_filters(self, params: list):
+        """[(column, value)] for the string parameters compared with a column."""
+        return [(column, value) for (_, kind, _, column), value in zip(self.slots, params)
+                if kind == "string" and column]
+
+    @classmethod
+    def learn(cls, question: str, sql: str):
+        text = _question_text(question)
+        literals = _sql_literals(sql)
+        values = [value for _, _, value, _ in literals]
+
+        found = []   # (question span, sql literal)
+        for literal in literals:
+            start, end, value, kind = literal
+            if not value.strip() or values.count(value) != 1:
+                continue
+            hits = list(re.finditer(rf"(?<!\w){re.escape(value)}(?!\w)", text, re.IGNORECASE))
+            if len(hits) != 1:
+                continue
+            asked = hits[0].group(0)
+            transform = next((name for name, fn in CASE_TRANSFORMS.items() if fn(asked) == value), None)
+            if transform is None:
+                continue
+            found.append((hits[0].span(), literal, transform))
+        if not found:
+            return None
+
+        # Question pattern: literal text escaped, slots in question order
+        by_question = sorted(found, key=lambda f: f[0][0])
+        pattern, pos = "", 0
+        for (q_start, q_end), (_, _, _, kind), _ in by_question:
+            pattern += re.escape(text[pos:q_start]).replace(r"\ ", r"\s+")
+            pattern += r"(\d+(?:\.\d+)?)" if kind == "number" else r"(.+?)"
+            pos = q_end
+        pattern += re.escape(text[pos:]).replace(r"\ ", r"\s+")
+
+        # SQL with ? placeholders, slots in SQL order
+        template_sql, pos, slots = "", 0, []
+        for (q_span, literal, transform) in sorted(found, key=lambda f: f[1][0]):
+            start, end, _, kind = literal
+            compared = COMPARED_COLUMN.search(sql[:start]) if kind == "string" else None
+            template_sql += sql[pos:start] + "?"
+            pos = end
+            slots.append((by_question.index((q_span, literal, transform)), kind, transform,
+                          compared.group(1) if compared else None))
+        template_sql += sql[pos:]
+        return cls(pattern, template_sql, slots, text)
+
+
+class SqlCache:
+    def __init__(self, maxsize: int = SQL_CACHE_SIZE, ttl: float = SQL_CACHE_TTL,
+                 enabled: bool = SQL_CACHE_ENABLED, templates: bool = SQL_TEMPLATES_ENABLED,
+                 templates_per_role: int = SQL_TEMPLATES_PER_ROLE):
+        self.enabled = enabled
+        self.templates_enabled = templates
+        self.templates_per_role = templates_per_role
+        self._exact = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._templates = {}          # (role, schema version) -> [SqlTemplate], most recent first
+        self._lock = threading.Lock()
+        self.template_lookups = 0
+
+    def lookup(self, role: str, question: str, schema_version: int):
+        """Return (sql, params, template) or None. `template` is None for exact hits."""
+        if not self.enabled:
+            return None
+        sql = self._exact.get((role.lower(), normalize_question(question), schema_version))
+        if sql:
+            return sql, None, None
+        if not self.templates_enabled:
+            return None
+
+        with self._lock:
+            self.template_lookups += 1
+            templates = list(self._templates.get((role.lower(), schema_version), []))
+        for template in templates:
+            params = template.match(question)
+            if params is not None:
+                template.uses += 1
+                return template.sql, params, template
+        return None
+
+    def covers(self, role: str, question: str, schema_version: int) -> bool:
+        """Whether lookup() has SQL for the question, without counting a lookup or a template use."""
+        if not self.enabled:
+            return False
+        if (role.lower(), normalize_question(question), schema_version) in self._exact:
+            return True
+        if not self.templates_enabled:
+            return False
+        with self._lock:
+            templates = list(self._templates.get((role.lower(), schema_version), []))
+        return any(template.match(question) is not None for template in templates)
+
+    def store(self, role: str, question: str, schema_version: int, sql: str, returned_rows: bool):
+        """Remember SQL that ran without error; a non-empty answer is required before it becomes a template."""
+        if not self.enabled:
+            return
+        self._exact.put((role.lower(), normalize_question(question), schema_version), sql)
+        if not (self.templates_enabled and returned_rows):
+            return
+
+        template = SqlTemplate.learn(question, sql)
+        if template is None:
+            return
+        with self._lock:
+            # Schema changed: templates learned against older versions no longer apply
+            for key in [k for k in self._templates if k[0] == role.lower() and k[1] != schema_version]:
+                del self._templates[key]
+            templates = self._templates.setdefault((role.lower(), schema_version), [])
+            if any(t.id == template.id for t in templates):
+                return
+            templates.insert(0, template)
+            del templates[self.templates_per_role:]
+        print(f"Learned SQL template {template.id}: {template.pattern.pattern}")
+
+    def reject(self, template: SqlTemplate):
+        """The template didn't fit this question (unknown value, failed query or empty answer)."""
+        template.fallbacks += 1
+
+    def clear(self):
+        self._exact.clear()
+        with self._lock:
+            self._templates.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            templates = [t for ts in self._templates.values() for t in ts]
+            lookups = self.template_lookups
+        hits = sum(t.uses - t.fallbacks for t in templates)
+        return {
+            "enabled": self.enabled,
+            "exact": self._exact.stats(),
+            "template_lookups": lookups,
+            "template_hits": hits,
+            "template_hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "templates": [
+                {
+                    "id": t.id,
+                    "learned_from": t.question,
+                    "sql": t.sql,
+                    "hits": t.uses - t.fallbacks,
+                    "fallbacks": t.fallbacks,
+                    "hit_rate": round((t.uses - t.fallbacks) / lookups, 4) if lookups else 0.0,
+                }
+                for t in templates
+            ],
+        }
+
+
+sql_cache = SqlCache()
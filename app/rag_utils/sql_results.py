@@ -0,0 +1,132 @@
+import os
+import time
+import secrets
+import threading
+
+import duckdb
+import pyarrow as pa
+import tabulate
+
+from ..cache_utils import TTLCache
+
+# ==============================
+# ===== SQL RESULT PAGES =======
+# ==============================
+# Query results are streamed from DuckDB as Arrow record batches and cut at
+# SQL_MAX_ROWS rows / SQL_MAX_BYTES bytes, so an unbounded SELECT never
+# materializes the whole table in Python. The LIMIT/OFFSET is pushed into
+# DuckDB; when more rows remain, an opaque cursor token (kept server-side,
+# bound to the caller's role) fetches the next page. Queries running longer
+# than SQL_TIMEOUT_S are interrupted.
+
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "1000"))
+SQL_MAX_BYTES = int(os.getenv("SQL_MAX_BYTES", str(8 * 1024 * 1024)))
+SQL_TIMEOUT_S = float(os.getenv("SQL_TIMEOUT_S", "15"))
+SQL_PREVIEW_ROWS = int(os.getenv("SQL_PREVIEW_ROWS", "50"))
+SQL_BATCH_ROWS = int(os.getenv("SQL_BATCH_ROWS", "8192"))
+SQL_CURSOR_TTL = float(os.getenv("SQL_CURSOR_TTL", "900"))
+
+_cursors = TTLCache(maxsize=10000, ttl=SQL_CURSOR_TTL)
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+def _subquery_body(sql: str) -> str:
+    """`sql` without its final `;`, which may sit before a trailing `-- comment`."""
+    sql = sql.strip().rstrip(";")
+    tokens = duckdb.tokenize(sql)
+    if tokens and sql[tokens[-1][0]] == ";":
+        sql = sql[:tokens[-1][0]]
+    return sql
+
+
+def fetch_page(conn, sql: str, params=None, offset: int = 0, max_rows: int = SQL_MAX_ROWS,
+               max_bytes: int = SQL_MAX_BYTES, timeout: float = SQL_TIMEOUT_S) -> dict:
+    """
+    Run `sql` and return {"arrow", "offset", "truncated", "bytes", "elapsed_ms"} holding at
+    most `max_rows` rows / `max_bytes` bytes starting at `offset`. A page always has at least
+    one row when any remain (even if that row alone exceeds `max_bytes`), so following the
+    next cursor always makes progress.
+    """
+    # The newline keeps a trailing `-- comment` from swallowing the closing paren
+    paged = f"SELECT * FROM ({_subquery_body(sql)}\n) AS page LIMIT {int(max_rows) + 1} OFFSET {int(offset)}"
+    start = time.perf_counter()
+    cur = conn.cursor()
+    timer = threading.Timer(timeout, cur.interrupt) if timeout else None
+    try:
+        if timer:
+            timer.start()
+        reader = cur.execute(paged, params or []).to_arrow_reader(SQL_BATCH_ROWS)
+        batches, rows, nbytes, truncated = [], 0, 0, False
+        for batch in reader:
+            take = min(batch.num_rows, max_rows - rows)
+            if take < batch.num_rows:
+                truncated = True
+            batch = batch.slice(0, take)
+            if batch.num_rows and nbytes + batch.nbytes > max_bytes:
+                row_bytes = batch.nbytes / batch.num_rows
+                fits = int((max_bytes - nbytes) // row_bytes)
+                batch = batch.slice(0, max(1 if rows == 0 else 0, fits))
+                truncated = True
+            if batch.num_rows:
+                batches.append(batch)
+                rows += batch.num_rows
+                nbytes += batch.nbytes
+            if truncated:
+                break
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+    except duckdb.InterruptException:
+        raise QueryTimeout(f"Query timed out after {timeout:g}s")
+    finally:
+        if timer:
+            timer.cancel()
+        cur.close()
+
+    return {
+        "arrow": table,
+        "offset": int(offset),
+        "truncated": truncated,
+        "bytes": nbytes,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def columnar_json(page: dict, next_cursor: str = None) -> dict:
+    table = page["arrow"]
+    return {
+        "columns": [{"name": f.name, "type": str(f.type)} for f in table.schema],
+        "data": table.to_pydict(),
+        "row_count": table.num_rows,
+        "offset": page["offset"],
+        "truncated": page["truncated"],
+        "next_cursor": next_cursor,
+    }
+
+
+def markdown_preview(page: dict, rows: int = SQL_PREVIEW_ROWS) -> str:
+    table = page["arrow"]
+    if table.num_rows == 0:
+        return "Query executed, but no results found."
+    head = table.slice(0, rows)
+    markdown = tabulate.tabulate(list(zip(*(col.to_pylist() for col in head.columns))),
+                                 headers=head.column_names, tablefmt="github")
+    if table.num_rows > rows or page["truncated"]:
+        more = "more rows available" if page["truncated"] else f"{table.num_rows} rows in the table data"
+        markdown += f"\n\n_Showing the first {head.num_rows} rows; {more}._"
+    return markdown
+
+
+def issue_cursor(role: str, sql: str, params, offset: int, schema_version: int) -> str:
+    token = secrets.token_urlsafe(16)
+    _cursors.put(token, {"role": role.lower(), "sql": sql, "params": params,
+                         "offset": offset, "schema_version": schema_version})
+    return token
+
+
+def resolve_cursor(token: str, role: str):
+    state = _cursors.get(token)
+    if not state or state["role"] != role.lower():
+        return None
+    return state
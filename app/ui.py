@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 from requests.auth import HTTPBasicAuth
 import base64
 
@@ -43,17 +44,34 @@ with left_col:
 # -------------------------
 # SESSION INIT
 # -------------------------
-if "auth" not in st.session_state:
-    st.session_state.auth = None
+if "token" not in st.session_state:
+    st.session_state.token = None
 if "role" not in st.session_state:
     st.session_state.role = None
 if "page" not in st.session_state:
     st.session_state.page = "login"
 
+# Bearer token issued by /login; the password is never kept in the session
+def auth_headers():
+    return {"Authorization": f"Bearer {st.session_state.token}"}
+
+# Parse a text/event-stream response into (event, data) pairs as lines arrive
+def iter_sse(res):
+    event, data = "message", []
+    for line in res.iter_lines(decode_unicode=True):
+        if line == "":
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
 # Load roles into session state if not present
 def fetch_roles():
     try:
-        role_res = requests.get(f"{API_URL}/roles", auth=HTTPBasicAuth(*st.session_state.auth))
+        role_res = requests.get(f"{API_URL}/roles", headers=auth_headers())
         return role_res.json().get("roles", [])
     except:
         return []
@@ -71,9 +89,8 @@ if st.session_state.page == "login":
    
         res = requests.get(f"{API_URL}/login", auth=HTTPBasicAuth(username, password))
         if res.status_code == 200:
-            st.session_state.auth = (username, password)
+            st.session_state.token = res.json()["access_token"]
             st.session_state.username = username
-            st.session_state.password = password
             st.session_state.role = res.json()["role"]
         
             # Fetch roles once login is successful
@@ -100,7 +117,11 @@ if st.session_state.page == "main":
         st.markdown(f"**👤 User:** `{username}`  \n**🛡️ Role:** `{role}`")
         # --- Logout ---
         if st.button("🚪 Logout"):
-            st.session_state.auth = None
+            try:
+                requests.post(f"{API_URL}/logout", headers=auth_headers())
+            except:
+                pass
+            st.session_state.token = None
             st.session_state.role = None
             st.session_state.page = "login"
             st.rerun()
@@ -129,14 +150,34 @@ if st.session_state.page == "main":
         question = st.text_input("Your Question")
         if st.button("Submit"):
             res = requests.post(
-                f"{API_URL}/chat",
+                f"{API_URL}/chat/stream",
                 json={"question": question, "role": st.session_state.role},
-                auth=HTTPBasicAuth(*st.session_state.auth)
+                headers=auth_headers(),
+                stream=True
             )
             st.markdown("**Answer:**")
             if res.status_code == 200:
-                st.success("✅ Answer:")
-                st.write(res.json()["answer"])
+                meta_box = st.empty()
+                answer_box = st.empty()
+                answer = ""
+                # Render tokens as they arrive instead of waiting for the full answer
+                for event, data in iter_sse(res):
+                    if event == "meta":
+                        sources = ", ".join(data.get("sources") or [])
+                        meta_box.caption(f"Mode: {data['mode']}" + (f" · Sources: {sources}" if sources else ""))
+                        if data.get("sql"):
+                            st.code(data["sql"], language="sql")
+                    elif event == "token":
+                        answer += data["text"]
+                        answer_box.markdown(answer + "▌")
+                    elif event == "done":
+                        answer_box.markdown(answer)
+                        st.caption(f"First token in {data['ttft_ms']} ms · total {data['total_ms']} ms"
+                                   + (" · cached" if data.get("cached") else ""))
+                    elif event == "error":
+                        st.error(f"❌ Something went wrong while processing your question: {data['detail']}")
+            elif res.status_code == 401:
+                st.error("Session expired. Please log in again.")
             else:
                 st.error("❌ Something went wrong while processing your question.")
             
@@ -145,7 +186,7 @@ if st.session_state.page == "main":
     if st.session_state.role == "C-Level":
         with tab2:
             st.subheader("Upload Documents")
-            role_res = requests.get(f"{API_URL}/roles", auth=HTTPBasicAuth(*st.session_state.auth))
+            role_res = requests.get(f"{API_URL}/roles", headers=auth_headers())
             #roles = role_res.json().get("roles", [])
             roles = st.session_state.roles
 
@@ -158,14 +199,29 @@ if st.session_state.page == "main":
                     f"{API_URL}/upload-docs",
                     files={"file": doc_file},
                     data={"role": selected_role},
-                    auth=HTTPBasicAuth(*st.session_state.auth)
+                    headers=auth_headers()
                 )
                 
                 if res.ok:
                     st.success(res.json()["message"])
+                    st.session_state.index_job_id = res.json().get("job_id")
                 else:
                     st.error(res.json().get("detail", "Something went wrong."))
 
+            # Indexing runs in the background; let the user check on it
+            if st.session_state.get("index_job_id") and st.button("Check indexing status"):
+                job_res = requests.get(
+                    f"{API_URL}/index-jobs/{st.session_state.index_job_id}",
+                    headers=auth_headers()
+                )
+                if job_res.ok:
+                    job = job_res.json()
+                    st.info(f"Indexing status: **{job['status']}**")
+                    if job.get("error"):
+                        st.error(job["error"])
+                else:
+                    st.error(job_res.json().get("detail", "Something went wrong."))
+
         # --- Admin Tab (C-Level) ---
         with tab3:
             st.subheader("Add User")
@@ -176,7 +232,7 @@ if st.session_state.page == "main":
                 res = requests.post(
                     f"{API_URL}/create-user",
                     data={"username": new_user, "password": new_pass, "role": new_role},
-                    auth=HTTPBasicAuth(*st.session_state.auth)
+                    headers=auth_headers()
                 )
                 
                 if res.ok:
@@ -190,7 +246,7 @@ if st.session_state.page == "main":
                 res = requests.post(
                 f"{API_URL}/create-role",
                 data={"role_name": new_role_input},
-                auth=HTTPBasicAuth(*st.session_state.auth)
+                headers=auth_headers()
             )
                 if res.ok:
                     st.success(res.json()["message"])
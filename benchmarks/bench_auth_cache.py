@@ -0,0 +1,47 @@
+"""
+Authenticated requests/sec against /login with the verified-credential cache on and off.
+
+Run from the repo root:
+    python benchmarks/bench_auth_cache.py --requests 50
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.auth_utils.credential_cache import credential_cache
+
+client = TestClient(app)
+
+
+def run(n_requests: int, auth=("admin", "admin123")) -> float:
+    # warm-up request so the cache (when enabled) is populated
+    client.get("/login", auth=auth)
+
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        res = client.get("/login", auth=auth)
+        assert res.status_code == 200, res.text
+    elapsed = time.perf_counter() - start
+    return n_requests / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    results = {}
+    for enabled in (False, True):
+        credential_cache.clear()
+        credential_cache.enabled = enabled
+        results[enabled] = run(args.requests)
+
+    print("=== Auth throughput (/login) ===")
+    print(f"Cache off: {results[False]:8.1f} req/s")
+    print(f"Cache on:  {results[True]:8.1f} req/s")
+    print(f"Speed-up:  {results[True] / results[False]:8.1f}x")
@@ -0,0 +1,84 @@
+"""
+/chat latency as the number of concurrent users grows.
+
+Each simulated user logs in once and sends --requests questions back to back;
+all users run at the same time against a live server. With a non-blocking
+pipeline p50/p99 should stay roughly flat as --users grows (until the OpenAI
+rate limit or DB_POOL_SIZE is reached); a blocking call in the handler shows
+up as latency growing linearly with the number of users.
+
+Start the server with the answer caches off so every request does real work:
+    ANSWER_CACHE_ENABLED=0 SEMANTIC_CACHE_ENABLED=0 uvicorn app.main:app --port 8000
+
+Then, from the repo root:
+    python benchmarks/bench_chat_concurrency.py --users 1 5 10 25 50
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+import httpx
+import pandas as pd
+
+QUESTIONS = Path(__file__).resolve().parent / "data" / "router_questions.csv"
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def user_session(client, token, questions, latencies, errors):
+    headers = {"Authorization": f"Bearer {token}"}
+    for question in questions:
+        start = time.perf_counter()
+        try:
+            res = await client.post("/chat", json={"question": question}, headers=headers)
+            res.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(str(e))
+
+
+async def run_level(url, auth, users, requests, questions):
+    async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+        res = await client.get("/login", auth=auth)
+        res.raise_for_status()
+        token = res.json()["access_token"]
+
+        latencies, errors = [], []
+        sessions = [
+            user_session(client, token,
+                         [questions[(u * requests + i) % len(questions)] for i in range(requests)],
+                         latencies, errors)
+            for u in range(users)
+        ]
+        start = time.perf_counter()
+        await asyncio.gather(*sessions)
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--requests", type=int, default=3, help="questions per user")
+    args = parser.parse_args()
+
+    questions = list(pd.read_csv(QUESTIONS)["question"])
+    auth = (args.username, args.password)
+
+    print(f"=== /chat concurrency against {args.url} ===")
+    print(f"{'users':>6} {'requests':>9} {'errors':>7} {'p50 s':>8} {'p99 s':>8} {'req/s':>8}")
+    for users in args.users:
+        latencies, errors, elapsed = asyncio.run(run_level(args.url, auth, users, args.requests, questions))
+        if not latencies:
+            print(f"{users:>6} {0:>9} {len(errors):>7}  all requests failed: {errors[0]}")
+            sys.exit(1)
+        print(f"{users:>6} {len(latencies):>9} {len(errors):>7} {percentile(latencies, 50):>8.2f} "
+              f"{percentile(latencies, 99):>8.2f} {len(latencies) / elapsed:>8.2f}")
@@ -0,0 +1,74 @@
+"""
+Index size and build time for each CSV_INDEX_MODE (rows / profile / groups).
+
+The HR export is scaled up to --rows rows (ids rewritten so rows stay unique).
+Build time covers loading + splitting; index size is the number of chunks, the
+tokens that would be sent to the embedding API and the float32 vector bytes.
+Pass --embed to also time the real embedding calls (needs OPENAI_API_KEY).
+
+Run from the repo root:
+    python benchmarks/bench_csv_index_modes.py --rows 100000
+"""
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+from app.rag_utils.rag_module import load_file, split_into_chunks, openai_embeddings
+from app.rag_utils.embedding_pipeline import count_tokens
+
+HR_CSV = Path(__file__).resolve().parent.parent / "resources" / "data" / "hr" / "hr_data.csv"
+EMBEDDING_DIM = 1536  # text-embedding-3-small
+
+
+def scaled_csv(path: str, rows: int):
+    base = pd.read_csv(HR_CSV)
+    repeats = -(-rows // len(base))
+    df = pd.concat([base] * repeats, ignore_index=True).head(rows)
+    df["employee_id"] = [f"FINEMP{1000 + i}" for i in range(len(df))]
+    df.to_csv(path, index=False)
+
+
+def run(csv_path: str, mode: str, embed: bool) -> dict:
+    start = time.perf_counter()
+    docs = load_file(csv_path, "hr", csv_mode=mode)
+    chunks = split_into_chunks(docs, csv_path)
+    build = time.perf_counter() - start
+
+    texts = [c.page_content for c in chunks.values()]
+    result = {
+        "mode": mode,
+        "chunks": len(texts),
+        "tokens": sum(count_tokens(t) for t in texts),
+        "vector_mb": len(texts) * EMBEDDING_DIM * 4 / 1024 / 1024,
+        "build_s": build,
+    }
+    if embed:
+        start = time.perf_counter()
+        openai_embeddings.embed_documents(texts)
+        result["embed_s"] = time.perf_counter() - start
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--modes", nargs="+", default=["rows", "profile", "groups"])
+    parser.add_argument("--embed", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = str(Path(tmp) / "hr_data.csv")
+        scaled_csv(csv_path, args.rows)
+
+        print(f"=== CSV index modes, {args.rows} rows ===")
+        print(f"{'mode':>8} {'chunks':>9} {'tokens':>11} {'vectors MB':>11} {'build s':>9} {'embed s':>9}")
+        for mode in args.modes:
+            r = run(csv_path, mode, args.embed)
+            embed_s = f"{r['embed_s']:.2f}" if "embed_s" in r else "-"
+            print(f"{r['mode']:>8} {r['chunks']:>9} {r['tokens']:>11} {r['vector_mb']:>11.1f} "
+                  f"{r['build_s']:>9.2f} {embed_s:>9}")
@@ -0,0 +1,112 @@
+"""
+CSV ingestion time, peak memory and on-disk size: the old pandas path
+(pd.read_csv twice, then CREATE TABLE ... FROM df) vs DuckDB's native reader
+into a table vs DuckDB converting the CSV to Parquet and registering a view.
+
+Every measurement runs in a fresh subprocess against a file-backed DuckDB so
+peaks don't leak between runs. "RSS MB" is the growth over the process
+baseline; ".duckdb MB" is the database file after the load (the Parquet path
+keeps the rows in a separate .parquet file, listed under "parquet MB");
+"query s" times one GROUP BY over the loaded table.
+
+Run from the repo root:
+    python benchmarks/bench_csv_ingest.py --sizes-mb 50 200 500
+"""
+import sys
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import resource
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+QUERY = "SELECT department, AVG(salary), COUNT(*) FROM bench GROUP BY department"
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_csv(path: str, size_mb: int):
+    departments = ["Finance", "HR", "Marketing", "Engineering", "Sales"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["employee_id", "full_name", "department", "salary", "rating", "joined"])
+        i = 0
+        while f.tell() < size_mb * 1024 * 1024:
+            writer.writerow([f"EMP{i:08d}", f"Name {i}", random.choice(departments),
+                             random.randint(30000, 200000), random.randint(1, 5),
+                             f"20{random.randint(10, 24)}-0{random.randint(1, 9)}-1{random.randint(0, 9)}"])
+            i += 1
+
+
+def child(mode: str, csv_path: str, workdir: str):
+    import duckdb
+    import pandas as pd
+    from app.rag_utils.ingest import ingest_csv_to_duckdb
+
+    db_path = os.path.join(workdir, f"{mode}.duckdb")
+    parquet_dir = os.path.join(workdir, f"{mode}_parquet")
+    conn = duckdb.connect(db_path)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == "pandas":
+        df = pd.read_csv(csv_path)
+        content = df.to_string(index=False)
+        df1 = pd.read_csv(csv_path)
+        conn.execute("CREATE OR REPLACE TABLE bench AS SELECT * FROM df1")
+        headers = list(df1.columns)
+    else:
+        headers = ingest_csv_to_duckdb(conn, csv_path, "bench", storage=mode, parquet_dir=parquet_dir)
+    conn.execute("CHECKPOINT")
+    ingest_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    conn.execute(QUERY).fetchall()
+    query_seconds = time.perf_counter() - start
+    conn.close()
+
+    parquet_bytes = sum(f.stat().st_size for f in Path(parquet_dir).glob("*.parquet")) if os.path.isdir(parquet_dir) else 0
+    print(json.dumps({"seconds": ingest_seconds, "query_seconds": query_seconds, "columns": len(headers),
+                      "duckdb_mb": os.path.getsize(db_path) / 1024 / 1024, "parquet_mb": parquet_bytes / 1024 / 1024,
+                      "peak_rss_mb": peak_rss_mb(), "baseline_rss_mb": baseline}))
+
+
+def measure(mode: str, csv_path: str, workdir: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, csv_path, workdir],
+        capture_output=True, text=True, check=True, cwd=ROOT,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], sys.argv[4])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--modes", nargs="+", default=["pandas", "table", "parquet"])
+    args = parser.parse_args()
+
+    print(f"{'CSV MB':>7} {'path':>8} {'ingest s':>9} {'RSS MB':>8} {'.duckdb MB':>11} {'parquet MB':>11} {'query s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes_mb:
+            csv_path = os.path.join(tmp, f"bench_{size_mb}.csv")
+            make_csv(csv_path, size_mb)
+            for mode in args.modes:
+                workdir = tempfile.mkdtemp(dir=tmp)
+                r = measure(mode, csv_path, workdir)
+                print(f"{size_mb:>7} {mode:>8} {r['seconds']:>9.2f} {r['peak_rss_mb'] - r['baseline_rss_mb']:>8.1f} "
+                      f"{r['duckdb_mb']:>11.1f} {r['parquet_mb']:>11.1f} {r['query_seconds']:>8.3f}")
+            os.remove(csv_path)
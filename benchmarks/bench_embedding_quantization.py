@@ -0,0 +1,118 @@
+"""
+Index size vs recall for truncated / quantized embeddings in the NumPy vector
+store, on our own corpus (resources/data chunked like the indexer, role = folder
+name) with the evaluator's QA questions plus --id-questions employee-id
+lookups (see bench_retrieval.py), each searched with its role filter.
+
+A config is dtype[/dims][+rescore], e.g. "binary/512+float16": the index keeps
+the first 512 dimensions as sign bits and a float16 full-dimension copy is
+read back for the top --rescore-factor * k candidates. "index MB" is what a
+search scans (vectors + int8 scales), "disk MB" adds the rescoring copy, and
+"smaller" is float32 full-width index size / this index size.
+"recall@k" is the overlap with the exact float32 top k; "answer@k" is the
+share of questions with a relevant chunk in the top k (as in bench_retrieval).
+
+Needs OPENAI_API_KEY for the embeddings (cached on disk after the first run).
+
+Run from the repo root:
+    python benchmarks/bench_embedding_quantization.py --k 4 10
+"""
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+import numpy as np
+from bench_retrieval import DATA_DIR, load_questions
+from app.rag_utils import numpy_store
+from app.rag_utils.numpy_store import NumpyVectorStore
+from app.rag_utils.rag_module import load_file, split_into_chunks, openai_embeddings, get_readable_roles
+
+CONFIGS = ["float32", "float32/512", "float32/256", "int8", "int8/512", "int8/256+float16",
+           "binary", "binary+float16", "binary/512+float16", "binary/256+float16"]
+
+
+def parse_config(config: str):
+    """"binary/512+float16" -> ("binary", 512, "float16")."""
+    config, _, rescore = config.partition("+")
+    dtype, _, dims = config.partition("/")
+    return dtype, int(dims or 0), rescore or "none"
+
+
+def load_corpus(csv_mode: str):
+    chunks = {}
+    for path in sorted(DATA_DIR.glob("*/*")):
+        docs = load_file(str(path), path.parent.name, csv_mode=csv_mode)
+        if docs:
+            chunks.update(split_into_chunks(docs, str(path)))
+    ids, docs = list(chunks), list(chunks.values())
+    vectors = np.asarray(openai_embeddings.embed_documents([d.page_content for d in docs]), dtype=np.float32)
+    return ids, docs, vectors
+
+
+def index_mb(store: NumpyVectorStore) -> float:
+    rows = store.high_water
+    size = store.vectors[:rows].nbytes + (store.scales[:rows].nbytes if store.scales is not None else 0)
+    return size / 1024 / 1024
+
+
+def run(store: NumpyVectorStore, questions, query_vectors, k: int):
+    results, latencies, answered = [], [], []
+    for (_, _, role, relevant), vector in zip(questions, query_vectors):
+        roles = get_readable_roles(role)
+        start = time.perf_counter()
+        hits = store.similarity_search_by_vector_with_score(vector, k, {"role": {"$in": roles}} if roles else None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([doc.id for doc, _ in hits])
+        answered.append(any(relevant(doc) for doc, _ in hits))
+    return results, statistics.median(latencies), sum(answered) / len(answered)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", nargs="+", default=CONFIGS)
+    parser.add_argument("--k", type=int, nargs="+", default=[4, 10])
+    parser.add_argument("--rescore-factor", type=int, default=numpy_store.NUMPY_RESCORE_FACTOR)
+    parser.add_argument("--id-questions", type=int, default=30)
+    parser.add_argument("--csv-mode", default="rows")
+    args = parser.parse_args()
+    numpy_store.NUMPY_RESCORE_FACTOR = args.rescore_factor
+
+    ids, docs, vectors = load_corpus(args.csv_mode)
+    questions = load_questions(args.id_questions)
+    query_vectors = openai_embeddings.embed_documents([q for _, q, _, _ in questions])
+    print(f"{len(ids)} chunks x {vectors.shape[1]} dims, {len(questions)} questions, "
+          f"rescore factor {args.rescore_factor}")
+    print(f"{'config':>20} {'index MB':>9} {'disk MB':>8} {'smaller':>8} "
+          + " ".join(f"{f'recall@{k}':>9} {f'answer@{k}':>9}" for k in args.k) + f" {'query ms':>9}")
+
+    baseline_mb, exact = None, {}
+    configs = ["float32"] + [c for c in args.configs if c != "float32"]   # exact baseline first
+    with tempfile.TemporaryDirectory() as tmp:
+        for config in configs:
+            dtype, dims, rescore = parse_config(config)
+            path = Path(tmp) / config.replace("/", "_").replace("+", "_")
+            store = NumpyVectorStore(embedding_function=None, persist_directory=str(path),
+                                     dtype=dtype, dims=dims, rescore=rescore)
+            for start in range(0, len(ids), 1000):
+                store.add_vectors(vectors[start:start + 1000], [d.page_content for d in docs[start:start + 1000]],
+                                  [d.metadata for d in docs[start:start + 1000]], ids[start:start + 1000])
+            size = index_mb(store)
+            baseline_mb = baseline_mb or size
+            disk = size + (store.full_vectors[:store.high_water].nbytes / 1024 / 1024
+                           if store.full_vectors is not None else 0)
+
+            columns, latencies = [], []
+            for k in args.k:
+                results, latency, answer = run(store, questions, query_vectors, k)
+                exact.setdefault(k, results)
+                recall = np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(results, exact[k]) if b])
+                columns.append(f"{recall:>9.3f} {answer:>9.2f}")
+                latencies.append(latency)
+            print(f"{config:>20} {size:>9.2f} {disk:>8.2f} {baseline_mb / size:>7.1f}x "
+                  + " ".join(columns) + f" {statistics.median(latencies):>9.2f}")
@@ -0,0 +1,113 @@
+"""
+Role partitions vs one shared collection with a role filter, as the number of
+roles and chunks grows, on the same synthetic clustered 1536-d embeddings as
+bench_vector_store.py (chunks spread evenly over --roles roles).
+
+"shared" is the current layout: one collection, department queries filtered
+with {"role": {"$in": [role, "general"]}}. "partitioned" is
+VECTOR_PARTITIONING=role: one collection per role, department queries search
+two partitions, C-Level queries fan out to every partition and merge by score.
+Latencies are medians over --queries queries, including fetching the hit
+documents. "agree@k" is the overlap of the partitioned top k with the shared
+top k for the same department query (1.0 for exact search).
+
+Run from the repo root:
+    python benchmarks/bench_partitions.py --roles 4 16 64 --chunks 10000 100000 --chroma-max 20000
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from bench_vector_store import batches, queries, role_names
+from app.rag_utils.numpy_store import NumpyVectorStore
+from app.rag_utils.partitioned_store import PartitionedVectorStore
+
+
+def build_shared(backend: str, path: str, n: int, n_roles: int):
+    if backend == "chroma":
+        from langchain_community.vectorstores import Chroma
+        store = Chroma(collection_name="bench", persist_directory=path, embedding_function=None)
+    else:
+        store = NumpyVectorStore(embedding_function=None, persist_directory=path)
+    start = time.perf_counter()
+    for ids, vectors, metadatas in batches(n, n_roles):
+        if backend == "chroma":
+            store._collection.add(ids=ids, embeddings=vectors, documents=ids, metadatas=metadatas)
+        else:
+            store.add_vectors(vectors, ids, metadatas, ids)
+    return store, time.perf_counter() - start
+
+
+def build_partitioned(backend: str, path: str, n: int, n_roles: int):
+    store = PartitionedVectorStore(embedding_function=None, backend=backend, persist_directory=path)
+    start = time.perf_counter()
+    for ids, vectors, metadatas in batches(n, n_roles):
+        store.add_vectors(vectors, ids, metadatas, ids)
+    return store, time.perf_counter() - start
+
+
+def search(store, vector, k: int, roles):
+    """Hit ids; Chroma's own wrapper for the shared Chroma collection, with_score otherwise."""
+    role_filter = {"role": {"$in": roles}} if roles else None
+    if isinstance(store, (NumpyVectorStore, PartitionedVectorStore)):
+        hits = store.similarity_search_by_vector_with_score(vector, k, role_filter)
+    else:
+        hits = store.similarity_search_by_vector_with_relevance_scores(vector, k, role_filter)
+    return [doc.page_content for doc, _ in hits]
+
+
+def timed(store, qs, k: int, roles_for):
+    latencies, results = [], []
+    for i, q in enumerate(qs):
+        start = time.perf_counter()
+        results.append(search(store, q.tolist(), k, roles_for(i)))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roles", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--backends", nargs="+", default=["numpy", "chroma"])
+    parser.add_argument("--chroma-max", type=int, default=20000, help="Chroma builds take very long beyond this")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'roles':>6} {'backend':>8} {'layout':>12} {'build s':>8} "
+          f"{'dept ms':>8} {'c-level ms':>11} {'agree@k':>8}")
+    qs = queries(args.queries)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.chunks:
+            for n_roles in args.roles:
+                roles = role_names(n_roles)
+
+                def department(i):
+                    return [roles[1 + i % (n_roles - 1)], "general"]
+
+                for backend in args.backends:
+                    if backend == "chroma" and n > args.chroma_max:
+                        print(f"{n:>8} {n_roles:>6} {backend:>8} {'skipped':>12}")
+                        continue
+                    shared_ids = None
+                    for layout, build in (("shared", build_shared), ("partitioned", build_partitioned)):
+                        path = os.path.join(tmp, f"{backend}_{layout}_{n}_{n_roles}")
+                        store, build_s = build(backend, path, n, n_roles)
+                        dept_ms, ids = timed(store, qs, args.k, department)
+                        clevel_ms, _ = timed(store, qs, args.k, lambda i: None)
+                        if layout == "shared":
+                            shared_ids = ids
+                        agree = statistics.mean(len(set(a) & set(b)) / len(b) for a, b in zip(ids, shared_ids) if b)
+                        print(f"{n:>8} {n_roles:>6} {backend:>8} {layout:>12} {build_s:>8.1f} "
+                              f"{dept_ms:>8.2f} {clevel_ms:>11.2f} {agree:>8.3f}")
+                        del store
+                        subprocess.run(["rm", "-rf", path])
@@ -0,0 +1,94 @@
+"""
+Accuracy and latency of the local SQL/RAG router against a labeled question set.
+
+The router's schema features come from the HR export loaded into an in-memory
+DuckDB, as the upload endpoint would register it. By default low-confidence
+questions are decided locally; pass --llm to let them fall back to the GPT
+classifier, and --compare-llm to also time the GPT classifier on every
+question (both need OPENAI_API_KEY). --embeddings enables the centroid features.
+
+Run from the repo root:
+    python benchmarks/bench_query_router.py
+    python benchmarks/bench_query_router.py --llm --compare-llm
+"""
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import duckdb
+import pandas as pd
+from app.rag_utils.query_router import QueryRouter
+from app.rag_utils.query_classifier import detect_query_type_llm
+
+ROOT = Path(__file__).resolve().parent.parent
+HR_CSV = ROOT / "resources" / "data" / "hr" / "hr_data.csv"
+LABELED = Path(__file__).resolve().parent / "data" / "router_questions.csv"
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def report(name, predictions, labels, latencies):
+    correct = sum(p == l for p, l in zip(predictions, labels))
+    ms = [1000 * t for t in latencies]
+    print(f"{name:>14} {correct / len(labels):>9.1%} {statistics.mean(ms):>10.3f} "
+          f"{percentile(ms, 50):>10.3f} {percentile(ms, 95):>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", default=str(LABELED))
+    parser.add_argument("--llm", action="store_true", help="fall back to GPT for low-confidence questions")
+    parser.add_argument("--compare-llm", action="store_true", help="also classify every question with GPT")
+    parser.add_argument("--embeddings", action="store_true")
+    parser.add_argument("--confidence", type=float, default=None)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.questions)
+    labels = list(df["label"])
+
+    duck = duckdb.connect()
+    duck.execute("CREATE TABLE hr_data AS SELECT * FROM read_csv_auto(?)", [str(HR_CSV)])
+    duck.execute("CREATE TABLE tables_metadata AS SELECT 'hr_data' AS table_name, 'HR' AS role")
+
+    embeddings = None
+    if args.embeddings:
+        from app.rag_utils.rag_module import openai_embeddings
+        embeddings = openai_embeddings
+
+    kwargs = {"confidence": args.confidence} if args.confidence is not None else {}
+    router = QueryRouter(embeddings, use_llm=args.llm, **kwargs)
+    router.refresh_schema(duck)
+
+    predictions, latencies, misses = [], [], []
+    for question, label in zip(df["question"], labels):
+        start = time.perf_counter()
+        route = router.route(question)
+        latencies.append(time.perf_counter() - start)
+        predictions.append(route["mode"])
+        if route["mode"] != label:
+            misses.append((label, route, question))
+
+    print(f"=== Query router, {len(labels)} labeled questions ===")
+    print(f"{'classifier':>14} {'accuracy':>9} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    report("router", predictions, labels, latencies)
+
+    if args.compare_llm:
+        llm_predictions, llm_latencies = [], []
+        for question in df["question"]:
+            start = time.perf_counter()
+            answer = detect_query_type_llm(question)
+            llm_latencies.append(time.perf_counter() - start)
+            llm_predictions.append("SQL" if "SQL" in answer else "RAG")
+        report("gpt-4", llm_predictions, labels, llm_latencies)
+
+    stats = router.stats()
+    print(f"\nDecided by rules: {stats['rules']}, embeddings: {stats['embedding']}, LLM fallback: {stats['llm']}")
+    for label, route, question in misses:
+        print(f"  miss: expected {label}, got {route['mode']} ({route['source']}, {route['confidence']}): {question}")
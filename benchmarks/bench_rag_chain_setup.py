@@ -0,0 +1,41 @@
+"""
+Per-request chain setup cost on the /chat hot path: rebuilding the retriever +
+retrieval chain every time (old behaviour) vs the per-role chain registry.
+
+No LLM or embedding calls are made; only chain construction is timed.
+
+Run from the repo root:
+    python benchmarks/bench_rag_chain_setup.py --iterations 2000
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.rag_utils.rag_module import build_rag_chain, get_rag_chain, invalidate_rag_chains
+
+ROLES = ["C-Level", "General", "finance", "hr", "marketing", "engineering"]
+
+
+def per_request_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(ROLES[i % len(ROLES)])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    invalidate_rag_chains()
+    rebuild = per_request_us(build_rag_chain, args.iterations)
+    cached = per_request_us(get_rag_chain, args.iterations)
+
+    print("=== RAG chain setup per request ===")
+    print(f"Rebuild every request: {rebuild:10.1f} µs")
+    print(f"Role registry:         {cached:10.1f} µs")
+    print(f"Removed from hot path: {rebuild - cached:10.1f} µs ({rebuild / cached:.0f}x)")
@@ -0,0 +1,151 @@
+"""
+Retrieval recall@k and latency: dense-only (the previous path) vs hybrid
+BM25 + vector with reciprocal rank fusion vs hybrid over-fetching
+--rerank-fetch-k candidates cut to k by the local reranker (cosine + lexical
+overlap + MMR). "rerank ms" is the reranker's own cost per query.
+
+resources/data is indexed into a throwaway Chroma collection and keyword index
+(role = folder name, CSVs in --csv-mode, "rows" by default so employee ids are
+in the chunk text). Questions are the evaluator's QA pairs
+(app/rag_evaluator/qa_pairs_openai.csv: a chunk is relevant when it comes from
+the pair's source and covers at least half of the reference answer) plus
+--id-questions exact-term lookups of random employee ids (relevant = the
+chunk containing the id). Each question runs with its pair's role filter.
+recall@k = share of questions with a relevant chunk in the top k.
+
+Needs OPENAI_API_KEY for the embeddings (cached on disk after the first run).
+
+Run from the repo root:
+    python benchmarks/bench_retrieval.py --k 4 8 --id-questions 30
+"""
+import sys
+import csv
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+import sqlite3
+import pandas as pd
+from langchain_community.vectorstores import Chroma
+from app.rag_utils.rag_module import load_file, split_into_chunks, openai_embeddings, get_readable_roles
+from app.rag_utils.hybrid_search import HybridRetriever, TOKEN_PATTERN, index_chunks
+from app.rag_utils.reranker import LocalReranker
+
+DATA_DIR = ROOT / "resources" / "data"
+QA_PAIRS = ROOT / "app" / "rag_evaluator" / "qa_pairs_openai.csv"
+HR_CSV = DATA_DIR / "hr" / "hr_data.csv"
+
+
+def tokens(text: str) -> set:
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def build_index(tmp: str, csv_mode: str):
+    chunks = {}
+    for path in sorted(DATA_DIR.glob("*/*")):
+        docs = load_file(str(path), path.parent.name, csv_mode=csv_mode)
+        if docs:
+            chunks.update(split_into_chunks(docs, str(path)))
+    ids, docs = list(chunks), list(chunks.values())
+
+    store = Chroma(collection_name="bench", persist_directory=f"{tmp}/chroma", embedding_function=openai_embeddings)
+    for start in range(0, len(docs), 500):
+        store.add_documents(docs[start:start + 500], ids=ids[start:start + 500])
+
+    db_path = f"{tmp}/bm25.db"
+    conn = sqlite3.connect(db_path)
+    index_chunks(conn.cursor(), zip(ids, docs))
+    conn.commit()
+    conn.close()
+    return store, db_path, len(docs)
+
+
+def load_questions(id_questions: int):
+    questions = []
+    with open(QA_PAIRS, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            answer = tokens(row["answer"])
+
+            def relevant(doc, source=row["source"], answer=answer):
+                if source and doc.metadata.get("source") != source:
+                    return False
+                return len(answer & tokens(doc.page_content)) >= 0.5 * len(answer)
+
+            questions.append(("qa", row["question"], row["role"], relevant))
+
+    ids = pd.read_csv(HR_CSV)["employee_id"].tolist()
+    for employee_id in random.Random(0).sample(ids, min(id_questions, len(ids))):
+        questions.append(("id", f"What is the performance rating of employee {employee_id}?", "hr",
+                          lambda doc, employee_id=employee_id: employee_id in doc.page_content))
+    return questions
+
+
+def retriever_for(mode: str, store, db_path: str, role: str, k: int, fetch_k: int):
+    roles = get_readable_roles(role)
+    search_kwargs = {"k": k if mode == "dense" else fetch_k}
+    if roles is not None:
+        search_kwargs["filter"] = {"role": {"$in": roles}}
+    dense = store.as_retriever(search_kwargs=search_kwargs)
+    if mode == "dense":
+        return dense
+    return HybridRetriever(vector_retriever=dense, roles=roles, k=k, fetch_k=fetch_k, db_path=db_path)
+
+
+async def run(mode: str, store, db_path: str, questions, k: int, fetch_k: int, rerank_fetch_k: int) -> dict:
+    hits = {"qa": [], "id": []}
+    latencies, rerank_ms = [], []
+    reranker = LocalReranker(embeddings=openai_embeddings, top_n=k)
+    for kind, question, role, relevant in questions:
+        if mode == "hybrid+rerank":
+            retriever = retriever_for("hybrid", store, db_path, role, rerank_fetch_k, max(fetch_k, rerank_fetch_k))
+        else:
+            retriever = retriever_for(mode, store, db_path, role, k, fetch_k)
+        start = time.perf_counter()
+        docs = await retriever.ainvoke(question)
+        if mode == "hybrid+rerank":
+            rerank_start = time.perf_counter()
+            docs = reranker.compress_documents(docs, question)
+            rerank_ms.append((time.perf_counter() - rerank_start) * 1000)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits[kind].append(any(relevant(doc) for doc in docs))
+    every = hits["qa"] + hits["id"]
+    return {
+        "recall": sum(every) / len(every),
+        "qa_recall": sum(hits["qa"]) / len(hits["qa"]) if hits["qa"] else 0.0,
+        "id_recall": sum(hits["id"]) / len(hits["id"]) if hits["id"] else 0.0,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        "rerank_ms": statistics.median(rerank_ms) if rerank_ms else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--fetch-k", type=int, default=20, help="candidates per side before fusion")
+    parser.add_argument("--rerank-fetch-k", type=int, default=20, help="candidates handed to the reranker")
+    parser.add_argument("--id-questions", type=int, default=30)
+    parser.add_argument("--csv-mode", default="rows")
+    args = parser.parse_args()
+
+    questions = load_questions(args.id_questions)
+    with tempfile.TemporaryDirectory() as tmp:
+        store, db_path, n_chunks = build_index(tmp, args.csv_mode)
+        # Warm the query embedding cache so both modes time retrieval, not the embedding API
+        openai_embeddings.embed_documents([q for _, q, _, _ in questions])
+
+        print(f"{n_chunks} chunks, {len(questions)} questions "
+              f"({sum(q[0] == 'qa' for q in questions)} QA pairs, {sum(q[0] == 'id' for q in questions)} id lookups)")
+        print(f"{'k':>3} {'mode':>14} {'recall@k':>9} {'QA':>6} {'ids':>6} {'p50 ms':>8} {'p95 ms':>8} {'rerank ms':>10}")
+        for k in args.k:
+            for mode in ("dense", "hybrid", "hybrid+rerank"):
+                r = asyncio.run(run(mode, store, db_path, questions, k, args.fetch_k, args.rerank_fetch_k))
+                print(f"{k:>3} {mode:>14} {r['recall']:>9.2f} {r['qa_recall']:>6.2f} {r['id_recall']:>6.2f} "
+                      f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['rerank_ms']:>10.2f}")
@@ -0,0 +1,88 @@
+"""
+NL->SQL prompt size and schema-building latency as the number of tables grows.
+
+"all tables" is the previous behaviour: every uploaded CSV's header list goes
+into every prompt. "catalog" is the cached DuckDB schema catalog filtered to
+the tables one role may query (--allowed, default 1), with column types and
+stats. Cold = first build after an upload, warm = served from the cache.
+Pass --llm to also time the GPT-4 translation with each prompt (needs
+OPENAI_API_KEY).
+
+Run from the repo root:
+    python benchmarks/bench_schema_prompt.py --tables 1 10 50 200
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import duckdb
+from app.rag_utils.schema_catalog import SchemaCatalog
+from app.rag_utils.csv_query import build_sql_prompt, aclient
+from app.rag_utils.embedding_pipeline import count_tokens
+
+HR_CSV = Path(__file__).resolve().parent.parent / "resources" / "data" / "hr" / "hr_data.csv"
+QUESTION = "What is the average salary per department?"
+
+
+def make_tables(duck, n):
+    duck.execute("CREATE OR REPLACE TABLE hr_data AS SELECT * FROM read_csv_auto(?)", [str(HR_CSV)])
+    for i in range(1, n):
+        duck.execute(f"CREATE OR REPLACE TABLE dept_{i}_data AS SELECT * FROM hr_data")
+    return ["hr_data"] + [f"dept_{i}_data" for i in range(1, n)]
+
+
+def header_block(duck, tables):
+    schemas = []
+    for table in tables:
+        cols = [row[0] for row in duck.execute(f'DESCRIBE "{table}"').fetchall()]
+        schemas.append(f"Table: {table}\nColumns: {', '.join(cols)}")
+    return "\n\n".join(schemas)
+
+
+async def llm_seconds(prompt):
+    start = time.perf_counter()
+    await aclient.chat.completions.create(model="gpt-4", messages=[{"role": "user", "content": prompt}],
+                                          temperature=0)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--allowed", type=int, default=1, help="tables the querying role may use")
+    parser.add_argument("--llm", action="store_true")
+    args = parser.parse_args()
+
+    duck = duckdb.connect()
+
+    def fetch(sql, params=None):
+        cur = duck.cursor()
+        cur.execute(sql, params or [])
+        return [d[0] for d in cur.description], cur.fetchall()
+
+    print("=== NL->SQL prompt size vs number of tables ===")
+    print(f"{'tables':>7} {'all tokens':>11} {'catalog tokens':>15} {'cold ms':>9} {'warm ms':>9}"
+          + (f" {'all llm s':>10} {'catalog llm s':>14}" if args.llm else ""))
+    for n in args.tables:
+        tables = make_tables(duck, n)
+        allowed = tables[:args.allowed]
+        catalog = SchemaCatalog(fetch)
+
+        all_prompt = build_sql_prompt(QUESTION, header_block(duck, tables))
+
+        start = time.perf_counter()
+        catalog.schema_block(allowed)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        catalog_prompt = build_sql_prompt(QUESTION, catalog.schema_block(allowed))
+        warm = time.perf_counter() - start
+
+        line = (f"{n:>7} {count_tokens(all_prompt):>11} {count_tokens(catalog_prompt):>15} "
+                f"{cold * 1000:>9.2f} {warm * 1000:>9.3f}")
+        if args.llm:
+            line += f" {asyncio.run(llm_seconds(all_prompt)):>10.2f} {asyncio.run(llm_seconds(catalog_prompt)):>14.2f}"
+        print(line)
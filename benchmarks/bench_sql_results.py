@@ -0,0 +1,112 @@
+"""
+Memory and latency of returning `SELECT * FROM <table>` to the API: legacy path
+(fetchall -> Python lists -> tabulate over every row) vs the Arrow page path
+(record batches capped by SQL_MAX_ROWS / SQL_MAX_BYTES, columnar JSON + markdown
+preview).
+
+Every measurement runs in a fresh subprocess against a file-backed DuckDB so
+peaks don't leak between runs. "RSS MB" is the growth over the process baseline
+after the table was created.
+
+Run from the repo root:
+    python benchmarks/bench_sql_results.py --rows 10000 1000000 10000000
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_db(path: str, rows: int):
+    import duckdb
+
+    conn = duckdb.connect(path)
+    conn.execute(f"""
+        CREATE TABLE employees AS
+        SELECT 'EMP' || lpad(range::VARCHAR, 9, '0') AS employee_id,
+               'Name ' || range AS full_name,
+               ['Finance', 'HR', 'Marketing', 'Engineering', 'Sales'][range % 5 + 1] AS department,
+               30000 + (range * 7919) % 170000 AS salary,
+               range % 5 + 1 AS rating,
+               DATE '2018-01-01' + (range % 2500)::INTEGER AS joined
+        FROM range({rows})
+    """)
+    conn.close()
+
+
+def child(mode: str, db_path: str, max_rows: int):
+    import duckdb
+    import tabulate
+    from app.rag_utils.sql_results import fetch_page, columnar_json, markdown_preview
+
+    conn = duckdb.connect(db_path, read_only=True)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+
+    if mode == "legacy":
+        cur = conn.execute("SELECT * FROM employees")
+        result = cur.fetchall()
+        columns = [desc[0] for desc in cur.description]
+        output = [list(row) for row in result]
+        answer = tabulate.tabulate(output, headers=columns, tablefmt="github")
+        rows = len(output)
+        payload = len(answer)
+    else:
+        page = fetch_page(conn, "SELECT * FROM employees", max_rows=max_rows)
+        table = columnar_json(page, next_cursor="next" if page["truncated"] else None)
+        answer = markdown_preview(page)
+        rows = table["row_count"]
+        payload = len(json.dumps(table, default=str)) + len(answer)
+
+    elapsed = time.perf_counter() - start
+    conn.close()
+    print(json.dumps({"seconds": elapsed, "rows": rows, "payload_kb": payload / 1024,
+                      "peak_rss_mb": peak_rss_mb(), "baseline_rss_mb": baseline}))
+
+
+def measure(mode: str, db_path: str, max_rows: int) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, db_path, str(max_rows)],
+        capture_output=True, text=True, check=True, cwd=ROOT,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000, 10000000])
+    parser.add_argument("--max-rows", type=int, default=1000)
+    parser.add_argument("--skip-legacy-above", type=int, default=10000000,
+                        help="legacy path needs several GB of RAM on very large tables")
+    args = parser.parse_args()
+
+    print(f"{'table rows':>11} {'path':>8} {'rows out':>9} {'payload KB':>11} {'seconds':>9} {'RSS MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            db_path = os.path.join(tmp, f"bench_{rows}.duckdb")
+            make_db(db_path, rows)
+            for mode in ("legacy", "arrow"):
+                if mode == "legacy" and rows > args.skip_legacy_above:
+                    print(f"{rows:>11} {mode:>8} {'skipped':>9}")
+                    continue
+                r = measure(mode, db_path, args.max_rows)
+                print(f"{rows:>11} {mode:>8} {r['rows']:>9} {r['payload_kb']:>11.1f} {r['seconds']:>9.3f} "
+                      f"{r['peak_rss_mb'] - r['baseline_rss_mb']:>9.1f}")
+            os.remove(db_path)
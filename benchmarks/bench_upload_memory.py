@@ -0,0 +1,115 @@
+"""
+Peak RSS of the CSV upload path: legacy (read whole body + pandas twice) vs streamed
+(chunked copy to disk + single DuckDB parse), for several file and chunk sizes.
+
+Every measurement runs in a fresh subprocess so peaks don't leak between runs.
+"save" is the RSS growth while receiving the upload (bounded by the chunk size on the
+streamed path); "total" also includes the DuckDB load, which is capped by its memory_limit.
+
+Run from the repo root:
+    python benchmarks/bench_upload_memory.py --sizes-mb 50 200 --chunk-kb 64 1024 8192
+"""
+import sys
+import os
+import csv
+import json
+import random
+import asyncio
+import argparse
+import resource
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_csv(path: str, size_mb: int):
+    departments = ["Finance", "HR", "Marketing", "Engineering", "Sales"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["employee_id", "full_name", "department", "salary", "rating", "joined"])
+        i = 0
+        while f.tell() < size_mb * 1024 * 1024:
+            writer.writerow([f"EMP{i:08d}", f"Name {i}", random.choice(departments),
+                             random.randint(30000, 200000), random.randint(1, 5), "2021-04-01"])
+            i += 1
+
+
+def child(mode: str, csv_path: str, chunk_size: int, memory_limit: str):
+    import duckdb
+    from starlette.datastructures import UploadFile
+
+    # file-backed like static/data/structured_queries.duckdb
+    db_path = csv_path + ".duckdb"
+    conn = duckdb.connect(db_path)
+    conn.execute(f"SET memory_limit = '{memory_limit}'")
+    baseline = peak_rss_mb()
+    out_path = csv_path + ".saved"
+
+    with open(csv_path, "rb") as src:
+        upload = UploadFile(src, filename="bench.csv")
+
+        if mode == "legacy":
+            import pandas as pd
+            from io import BytesIO
+
+            data = asyncio.run(upload.read())
+            with open(out_path, "wb") as f:
+                f.write(data)
+            saved_rss = peak_rss_mb()
+            df = pd.read_csv(BytesIO(data))
+            content = df.to_string(index=False)
+            df1 = pd.read_csv(out_path)
+            conn.execute("CREATE OR REPLACE TABLE bench AS SELECT * FROM df1")
+        else:
+            from app.rag_utils.ingest import save_upload_stream, ingest_csv_to_duckdb
+
+            asyncio.run(save_upload_stream(upload, out_path, chunk_size=chunk_size))
+            saved_rss = peak_rss_mb()
+            ingest_csv_to_duckdb(conn, out_path, "bench")
+
+    conn.close()
+    os.remove(out_path)
+    os.remove(db_path)
+    print(json.dumps({"peak_rss_mb": peak_rss_mb(), "saved_rss_mb": saved_rss, "baseline_rss_mb": baseline}))
+
+
+def measure(mode: str, csv_path: str, chunk_size: int, memory_limit: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, csv_path, str(chunk_size), memory_limit],
+        capture_output=True, text=True, check=True, cwd=ROOT,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--chunk-kb", type=int, nargs="+", default=[64, 1024, 8192])
+    parser.add_argument("--duckdb-memory-limit", default="256MB")
+    args = parser.parse_args()
+
+    print(f"{'file MB':>8} {'path':>16} {'save MB':>10} {'total MB':>10} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes_mb:
+            csv_path = os.path.join(tmp, f"bench_{size_mb}.csv")
+            make_csv(csv_path, size_mb)
+
+            runs = [("legacy", 0)] + [("stream", kb * 1024) for kb in args.chunk_kb]
+            for mode, chunk_size in runs:
+                r = measure(mode, csv_path, chunk_size, args.duckdb_memory_limit)
+                label = mode if mode == "legacy" else f"stream {chunk_size // 1024}KB"
+                save_delta = r["saved_rss_mb"] - r["baseline_rss_mb"]
+                total_delta = r["peak_rss_mb"] - r["baseline_rss_mb"]
+                print(f"{size_mb:>8} {label:>16} {save_delta:>10.1f} {total_delta:>10.1f} {r['peak_rss_mb']:>12.1f}")
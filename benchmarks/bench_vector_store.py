@@ -0,0 +1,161 @@
+"""
+Vector store backends: Chroma (persistent client, HNSW) vs the memory-mapped
+NumPy store (float32 and int8), on synthetic clustered 1536-d embeddings
+spread over --roles roles.
+
+Every step runs in a fresh subprocess. "build s" is the time to add all
+vectors; "open s" is the time for a new process to open the store and answer
+its first query; "RSS MB" is the growth of that process after --queries
+filtered queries. Query latency is the median over the same queries, without
+a filter and with a two-role filter like a department user's
+({"role": {"$in": [role, "general"]}}). recall@10 compares each backend's
+results to the exact float32 scan.
+
+Run from the repo root:
+    python benchmarks/bench_vector_store.py --chunks 10000 100000 1000000 --chroma-max 100000
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+import numpy as np
+
+DIM = 1536
+CLUSTERS = 200
+BATCH = 5000
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def role_names(n_roles: int):
+    return ["general"] + [f"role{i}" for i in range(1, n_roles)]
+
+
+def batches(n: int, n_roles: int, seed: int = 0):
+    """Deterministic (ids, vectors, metadatas) batches of clustered unit vectors."""
+    centers = np.random.default_rng(seed).standard_normal((CLUSTERS, DIM)).astype(np.float32)
+    roles = role_names(n_roles)
+    for start in range(0, n, BATCH):
+        rng = np.random.default_rng(seed + 1 + start)
+        size = min(BATCH, n - start)
+        vectors = centers[rng.integers(0, CLUSTERS, size)] + 0.5 * rng.standard_normal((size, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"chunk-{start + i}" for i in range(size)]
+        metadatas = [{"role": roles[(start + i) % n_roles], "source": f"doc{(start + i) // 50}.md"} for i in range(size)]
+        yield ids, vectors, metadatas
+
+
+def queries(n_queries: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    centers = np.random.default_rng(0).standard_normal((CLUSTERS, DIM)).astype(np.float32)
+    q = centers[rng.integers(0, CLUSTERS, n_queries)] + 0.5 * rng.standard_normal((n_queries, DIM)).astype(np.float32)
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def open_store(backend: str, path: str):
+    if backend == "chroma":
+        import chromadb
+        return chromadb.PersistentClient(path=path).get_or_create_collection("bench", metadata={"hnsw:space": "cosine"})
+    from app.rag_utils.numpy_store import NumpyVectorStore
+    return NumpyVectorStore(embedding_function=None, persist_directory=path, dtype=backend.split("-")[1])
+
+
+def search(backend: str, store, vector, k: int, roles):
+    if backend == "chroma":
+        where = {"role": {"$in": roles}} if roles else None
+        return store.query(query_embeddings=[vector.tolist()], n_results=k, where=where, include=[])["ids"][0]
+    return [f"chunk-{row}" for row, _ in store.search_rows(vector, k, roles)]
+
+
+def child_build(backend: str, path: str, n: int, n_roles: int):
+    store = open_store(backend, path)
+    start = time.perf_counter()
+    for ids, vectors, metadatas in batches(n, n_roles):
+        if backend == "chroma":
+            store.add(ids=ids, embeddings=vectors, documents=ids, metadatas=metadatas)
+        else:
+            store.add_vectors(vectors, ids, metadatas, ids)
+    print(json.dumps({"build_s": time.perf_counter() - start}))
+
+
+def child_query(backend: str, path: str, n_roles: int, n_queries: int, k: int):
+    baseline = peak_rss_mb()
+    qs = queries(n_queries)
+    start = time.perf_counter()
+    store = open_store(backend, path)
+    search(backend, store, qs[0], k, None)
+    open_s = time.perf_counter() - start
+
+    results = {"open_s": open_s, "plain_ms": [], "filtered_ms": [], "ids": []}
+    roles = role_names(n_roles)
+    for i, q in enumerate(qs):
+        start = time.perf_counter()
+        search(backend, store, q, k, None)
+        results["plain_ms"].append((time.perf_counter() - start) * 1000)
+        role_filter = [roles[1 + i % (n_roles - 1)], "general"]
+        start = time.perf_counter()
+        results["ids"].append(search(backend, store, q, k, role_filter))
+        results["filtered_ms"].append((time.perf_counter() - start) * 1000)
+    results["rss_mb"] = peak_rss_mb() - baseline
+    print(json.dumps(results))
+
+
+def run_child(*args) -> dict:
+    out = subprocess.run([sys.executable, __file__, *map(str, args)], capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def disk_mb(path: str) -> float:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file()) / 1024 / 1024
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--build":
+        child_build(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "--query":
+        child_query(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]), int(sys.argv[6]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy-float32", "numpy-int8"])
+    parser.add_argument("--chroma-max", type=int, default=100000, help="Chroma builds take very long beyond this")
+    parser.add_argument("--roles", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'backend':>14} {'build s':>8} {'disk MB':>8} {'open s':>7} {'RSS MB':>7} "
+          f"{'query ms':>9} {'filtered ms':>12} {'recall@10':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.chunks:
+            exact = None
+            backends = sorted(args.backends, key=lambda b: b != "numpy-float32")   # exact scan first
+            for backend in backends:
+                if backend == "chroma" and n > args.chroma_max:
+                    print(f"{n:>8} {backend:>14} {'skipped':>8}")
+                    continue
+                path = os.path.join(tmp, f"{backend}_{n}")
+                build = run_child("--build", backend, path, n, args.roles)
+                r = run_child("--query", backend, path, args.roles, args.queries, args.k)
+                if backend == "numpy-float32":
+                    exact = r["ids"]
+                recall = (np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(r["ids"], exact) if b])
+                          if exact else float("nan"))
+                print(f"{n:>8} {backend:>14} {build['build_s']:>8.1f} {disk_mb(path):>8.1f} {r['open_s']:>7.2f} "
+                      f"{r['rss_mb']:>7.1f} {np.median(r['plain_ms']):>9.2f} {np.median(r['filtered_ms']):>12.2f} "
+                      f"{recall:>10.3f}")
+                subprocess.run(["rm", "-rf", path])
@@ -1,9 +1,39 @@
-import pytest
-
-@pytest.fixture(scope="function")
-def context(browser):
-    return browser.new_context(record_video_dir="videos/")
-
-@pytest.fixture(scope="function")
-def page(context):
-    return context.new_page()
\ No newline at end of file
+import pytest
+from langchain_core.documents import Document
+
+@pytest.fixture(scope="function")
+def context(browser):
+    return browser.new_context(record_video_dir="videos/")
+
+@pytest.fixture(scope="function")
+def page(context):
+    return context.new_page()
+
+
+# ===== Shared vector-store fixtures =====
+class KeywordEmbeddings:
+    """Deterministic 4-d vectors: (leave, revenue, campaign, bias)."""
+
+    def _vector(self, text):
+        text = text.lower()
+        return [text.count("leave"), text.count("revenue"), text.count("campaign"), 0.1]
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+@pytest.fixture
+def keyword_embeddings():
+    return KeywordEmbeddings()
+
+
+def fill(store):
+    """One chunk each for general, finance and marketing, ids a/b/c."""
+    store.add_documents([
+        Document(page_content="Annual leave is 20 days", metadata={"role": "general", "source": "handbook.md"}),
+        Document(page_content="Q3 revenue grew 12%", metadata={"role": "finance", "source": "q3.md"}),
+        Document(page_content="Campaign revenue by channel", metadata={"role": "marketing", "source": "mkt.md"}),
+    ], ids=["a", "b", "c"])
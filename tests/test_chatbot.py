@@ -74,7 +74,75 @@ def test_upload_md_doc(c_level_auth):
     assert res.status_code == 200
     assert "uploaded successfully" in res.json()["message"]
 
-@patch("app.main.detect_query_type_llm", return_value="RAG")
+    job_id = res.json()["job_id"]
+    res = client.get(f"/index-jobs/{job_id}", auth=c_level_auth)
+    assert res.status_code == 200
+    assert res.json()["status"] in ("queued", "running", "done", "failed")
+
+def test_concurrent_indexers_claim_disjoint_documents(tmp_path):
+    import sqlite3
+    from app.rag_utils.rag_module import claim_pending_documents
+
+    db = tmp_path / "docs.db"
+    setup = sqlite3.connect(db)
+    setup.execute("CREATE TABLE documents (id INTEGER PRIMARY KEY, filepath TEXT, role TEXT, embedded INTEGER DEFAULT 0)")
+    setup.executemany("INSERT INTO documents (filepath, role) VALUES (?, ?)", [("a.md", "hr"), ("b.md", "hr")])
+    setup.commit()
+    setup.close()
+
+    first = sqlite3.connect(db)
+    claimed_first = claim_pending_documents(first.cursor())
+    first.commit()
+    second = sqlite3.connect(db)
+    claimed_second = claim_pending_documents(second.cursor())
+
+    assert len(claimed_first) == 2
+    assert claimed_second == []
+
+def test_reindex_embeds_only_changed_chunks():
+    import sqlite3
+    from unittest.mock import MagicMock
+    from langchain_core.documents import Document
+    from app.rag_utils import rag_module
+
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE chunk_manifest (filepath TEXT, chunk_id TEXT, PRIMARY KEY (filepath, chunk_id))")
+    c = db.cursor()
+    meta = {"role": "finance", "source": "summary.md"}
+
+    with patch.object(rag_module, "vectorstore", MagicMock()) as store:
+        store.get.return_value = {"ids": [], "documents": [], "metadatas": []}
+        assert rag_module.embed_documents_to_vectorstore([Document(page_content="Q1 revenue up", metadata=meta)], "f/summary.md", c) == (1, 0)
+        assert rag_module.embed_documents_to_vectorstore([Document(page_content="Q1 revenue up", metadata=meta)], "f/summary.md", c) == (0, 0)
+        assert rag_module.embed_documents_to_vectorstore([Document(page_content="Q1 revenue down", metadata=meta)], "f/summary.md", c) == (1, 1)
+
+def test_csv_profile_mode_replaces_row_documents():
+    from app.rag_utils.rag_module import load_file
+
+    hr_csv = "resources/data/hr/hr_data.csv"
+    assert len(load_file(hr_csv, "hr", csv_mode="rows")) == 100
+
+    profile = load_file(hr_csv, "hr", csv_mode="profile")
+    assert len(profile) == 1
+    assert "Rows: 100" in profile[0].page_content
+    assert "department" in profile[0].page_content
+    assert profile[0].metadata == {"role": "hr", "source": "hr_data.csv"}
+
+def test_rag_chains_are_reused_per_role():
+    from app.rag_utils.rag_module import get_rag_chain, invalidate_rag_chains
+
+    chain = get_rag_chain("Finance")
+    assert get_rag_chain("finance") is chain
+    assert get_rag_chain("hr") is not chain
+
+    invalidate_rag_chains()
+    assert get_rag_chain("finance") is not chain
+
+def test_index_job_unknown(c_level_auth):
+    res = client.get("/index-jobs/does-not-exist", auth=c_level_auth)
+    assert res.status_code == 404
+
+@patch("app.main.query_router.aroute", return_value={"mode": "RAG", "confidence": 0.9, "source": "rules"})
 @patch("app.main.ask_rag", return_value={"answer": "This is RAG response"})
 def test_chat_rag_mode(mock_ask_rag, mock_detect, c_level_auth):
     res = client.post(
@@ -86,7 +154,7 @@ def test_chat_rag_mode(mock_ask_rag, mock_detect, c_level_auth):
     assert res.json()["mode"] == "RAG"
     assert res.json()["answer"] == "This is RAG response"
 
-@patch("app.main.detect_query_type_llm", return_value="SQL")
+@patch("app.main.query_router.aroute", return_value={"mode": "SQL", "confidence": 0.9, "source": "rules"})
 @patch("app.main.ask_csv", return_value={"answer": "Here is the SQL data", "sql": "SELECT * FROM table"})
 def test_chat_sql_mode(mock_ask_csv, mock_detect, c_level_auth):
     res = client.post(
@@ -99,10 +167,144 @@ def test_chat_sql_mode(mock_ask_csv, mock_detect, c_level_auth):
     assert res.json()["answer"] == "Here is the SQL data"
     assert "sql" in res.json()
 
+def test_metrics_c_level_only(c_level_auth):
+    res = client.get("/metrics", auth=c_level_auth)
+    assert res.status_code == 200
+    assert "hits" in res.json()["embedding_cache"]
+
+@patch("app.main.query_router.aroute", return_value={"mode": "RAG", "confidence": 0.9, "source": "rules"})
+@patch("app.main.ask_rag", return_value={"answer": "20 days of annual leave"})
+def test_chat_repeat_served_from_cache(mock_ask_rag, mock_detect, c_level_auth):
+    from app.rag_utils.index_version import bump_index_version
+
+    first = client.post("/chat", auth=c_level_auth, json={"question": "What is the leave policy?"})
+    second = client.post("/chat", auth=c_level_auth, json={"question": "  what is the LEAVE policy "})
+    assert first.json()["cached"] is False
+    assert second.json()["cached"] is True
+    assert second.json()["answer"] == "20 days of annual leave"
+    assert mock_ask_rag.call_count == 1
+
+    # New data invalidates cached answers
+    bump_index_version("test")
+    third = client.post("/chat", auth=c_level_auth, json={"question": "What is the leave policy?"})
+    assert third.json()["cached"] is False
+    assert mock_ask_rag.call_count == 2
+
+def test_cached_sql_answers_drop_their_page_cursor():
+    from app.rag_utils.answer_cache import AnswerCache
+    cache = AnswerCache(enabled=True)
+    response = {"answer": "| n |", "mode": "SQL", "table": {"row_count": 1000, "truncated": True, "next_cursor": "abc"}}
+    cache.put("hr", "List all employees", 1, response)
+    assert cache.get("hr", "list all employees", 1)["table"] == {"row_count": 1000, "truncated": True, "next_cursor": None}
+    assert response["table"]["next_cursor"] == "abc"   # the live response keeps it
+
+@patch("app.main.SPECULATIVE_CHAT", True)
+@patch("app.main.query_router.aroute", return_value={"mode": "SQL", "confidence": 0.9, "source": "rules"})
+@patch("app.main.retrieve_context", return_value=["retrieved while routing"])
+@patch("app.main.ask_csv", return_value={"answer": "❌ Error: no such table", "error": True})
+@patch("app.main.ask_rag", return_value={"answer": "Answer from documents"})
+def test_speculative_fallback_reuses_retrieval(mock_ask_rag, mock_ask_csv, mock_retrieve, mock_route, c_level_auth):
+    res = client.post("/chat", auth=c_level_auth, json={"question": "Average bonus by region?"})
+    assert res.status_code == 200
+    assert res.json()["fallback"] is True
+    assert res.json()["answer"] == "Answer from documents"
+    assert mock_retrieve.call_count == 1
+    assert mock_ask_rag.call_args.kwargs["context"] == ["retrieved while routing"]
+    assert {"route", "retrieval", "sql", "rag", "total"} <= set(res.json()["timings_ms"])
+
+@patch("app.main.SPECULATIVE_CHAT", True)
+@patch("app.main.SPECULATIVE_SQL", True)
+@patch("app.main.sql_cache.covers", return_value=True)
+@patch("app.main.query_router.aroute", return_value={"mode": "SQL", "confidence": 0.9, "source": "rules"})
+@patch("app.main.retrieve_context", return_value=[])
+@patch("app.main.generate_sql")
+@patch("app.main.ask_csv", return_value={"answer": "| n |\n|---|\n| 12 |", "sql": "SELECT 12 AS n"})
+def test_speculative_sql_skipped_when_the_sql_cache_covers_the_question(mock_ask_csv, mock_generate, mock_retrieve,
+                                                                        mock_route, mock_covers, c_level_auth):
+    res = client.post("/chat", auth=c_level_auth, json={"question": "Headcount in Pune?"})
+    assert res.status_code == 200
+    assert mock_generate.call_count == 0
+    assert mock_ask_csv.call_args.kwargs["sql"] is None
+
+async def failing_route(question, vector=None):
+    import asyncio
+    await asyncio.sleep(0.01)   # let the speculative retrieval start
+    raise RuntimeError("router down")
+
+@patch("app.main.SPECULATIVE_CHAT", True)
+@patch("app.main.query_router.aroute", side_effect=failing_route)
+def test_speculative_tasks_are_cancelled_when_routing_fails(mock_route, c_level_auth):
+    import asyncio
+    cancelled = []
+
+    async def slow_retrieval(question, role):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(question)
+            raise
+
+    with patch("app.main.retrieve_context", side_effect=slow_retrieval):
+        with pytest.raises(RuntimeError):
+            client.post("/chat", auth=c_level_auth, json={"question": "Average bonus by department?"})
+    assert cancelled == ["Average bonus by department?"]
+
+async def fake_token_stream(question, context):
+    for text in ["Employees get ", "20 days ", "of leave."]:
+        yield text
+
+@patch("app.main.query_router.aroute", return_value={"mode": "RAG", "confidence": 0.9, "source": "rules"})
+@patch("app.main.retrieve_context")
+@patch("app.main.stream_rag_answer", new=fake_token_stream)
+def test_chat_stream_sends_meta_tokens_done(mock_retrieve, mock_route, c_level_auth):
+    from langchain_core.documents import Document
+    mock_retrieve.return_value = [Document(page_content="...", metadata={"source": "employee_handbook.md"})]
+
+    res = client.post("/chat/stream", auth=c_level_auth, json={"question": "How much leave do new joiners get?"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+
+    events = [block.split("\n", 1) for block in res.text.strip().split("\n\n")]
+    names = [e[0].removeprefix("event: ") for e in events]
+    assert names == ["meta", "token", "token", "token", "done"]
+    assert '"sources": ["employee_handbook.md"]' in events[0][1]
+    assert '"ttft_ms"' in events[-1][1]
+
+@patch("app.main.query_router.aroute", return_value={"mode": "RAG", "confidence": 0.9, "source": "rules"})
+@patch("app.main.ask_rag", return_value={"answer": "New joiners get 18 days", "sources": ["employee_handbook.md"]})
+def test_stream_hit_on_a_chat_answer_keeps_its_sources(mock_ask_rag, mock_route, c_level_auth):
+    question = "How much leave do interns get?"
+    first = client.post("/chat", auth=c_level_auth, json={"question": question})
+    assert first.json()["sources"] == ["employee_handbook.md"]
+
+    res = client.post("/chat/stream", auth=c_level_auth, json={"question": question})
+    events = [block.split("\n", 1) for block in res.text.strip().split("\n\n")]
+    assert [e[0].removeprefix("event: ") for e in events] == ["meta", "token", "done"]
+    assert '"sources": ["employee_handbook.md"]' in events[0][1] and '"cached": true' in events[0][1]
+
 def test_create_role_no_auth():
     res = client.post("/create-role", data={"role_name": "bad"})
     assert res.status_code == 401 or res.status_code == 403
 
+def test_login_issues_bearer_token(c_level_auth):
+    res = client.get("/login", auth=c_level_auth)
+    assert res.status_code == 200
+    token = res.json()["access_token"]
+
+    res = client.get("/roles", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+
+    res = client.post("/logout", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+
+    res = client.get("/roles", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 401
+
+def test_login_rejects_bearer_token(c_level_auth):
+    token = client.get("/login", auth=c_level_auth).json()["access_token"]
+    res = client.get("/login", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 401
+
 
 from unittest.mock import patch
 """
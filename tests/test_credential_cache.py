@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import time
+from app.cache_utils import TTLCache
+from app.auth_utils.credential_cache import CredentialCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")          # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_credential_cache_never_keys_on_plaintext():
+    cache = CredentialCache(maxsize=4, ttl=60, enabled=True)
+    cache.put("admin", "admin123", {"username": "admin", "role": "C-Level"})
+    assert cache.get("admin", "admin123") == {"username": "admin", "role": "C-Level"}
+    assert cache.get("admin", "wrong") is None
+    assert all("admin123" not in key for key in cache._cache._data)
+
+
+def test_credential_cache_invalidation():
+    cache = CredentialCache(maxsize=4, ttl=60, enabled=True)
+    cache.put("tony", "pw", {"username": "tony", "role": "engineering"})
+    cache.put("sam", "pw", {"username": "sam", "role": "finance"})
+
+    assert cache.invalidate_user("tony") == 1
+    assert cache.get("tony", "pw") is None
+
+    assert cache.invalidate_role("Finance") == 1
+    assert cache.get("sam", "pw") is None
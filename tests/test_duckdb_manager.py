@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import time
+import threading
+import subprocess
+import duckdb
+import pytest
+from app.rag_utils.duckdb_manager import DuckDBManager
+from app.rag_utils.ingest import ingest_csv_to_duckdb
+from app.rag_utils.sql_results import fetch_page
+
+
+def write_csv(path, rows):
+    lines = ["employee_id,department,salary"]
+    lines += [f"E{i},{['Finance', 'HR', 'Sales'][i % 3]},{30000 + i}" for i in range(rows)]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def load(manager, csv, table, role):
+    with manager.writer() as cur:
+        ingest_csv_to_duckdb(cur, str(csv), table)
+        cur.execute("INSERT INTO tables_metadata (table_name, role) VALUES (?, ?)", (table, role))
+
+
+def test_uploads_and_concurrent_queries(tmp_path):
+    manager = DuckDBManager(str(tmp_path / "stress.duckdb"))
+    manager.execute_write("CREATE TABLE tables_metadata (table_name TEXT, role TEXT)")
+    csv = tmp_path / "hr_data.csv"
+    write_csv(csv, 20000)
+    load(manager, csv, "hr_data", "HR")
+
+    errors, read_seconds = [], []
+    stop = threading.Event()
+
+    def uploader(n):
+        try:
+            for i in range(8):
+                load(manager, csv, "hr_data" if i % 2 else f"upload_{n}_{i}", "HR")
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                page = fetch_page(manager, "SELECT department, AVG(salary) AS avg_salary FROM hr_data GROUP BY 1")
+                manager.fetch("SELECT DISTINCT table_name FROM tables_metadata WHERE role = ?", ["HR"])
+                read_seconds.append(time.perf_counter() - start)
+                assert page["arrow"].num_rows == 3
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=reader) for _ in range(8)]
+    uploaders = [threading.Thread(target=uploader, args=(n,)) for n in range(3)]
+    for t in readers + uploaders:
+        t.start()
+    for t in uploaders:
+        t.join(timeout=60)
+    stop.set()
+    for t in readers:
+        t.join(timeout=10)
+
+    assert errors == []
+    assert read_seconds and max(read_seconds) < 5
+    assert manager.stats()["writes"] == 2 + 3 * 8
+    manager.close()
+
+
+def test_read_only_manager_rejects_writes(tmp_path):
+    path = str(tmp_path / "ro.duckdb")
+    writer = DuckDBManager(path)
+    writer.execute_write("CREATE TABLE t AS SELECT 1 AS x")
+    writer.close()
+
+    reader = DuckDBManager(path, read_only=True)
+    assert reader.fetch("SELECT x FROM t") == (["x"], [(1,)])
+    with pytest.raises(PermissionError):
+        reader.execute_write("DROP TABLE t")
+    reader.close()
+
+
+def test_read_only_open_fails_while_another_process_writes(tmp_path):
+    path = str(tmp_path / "locked.duckdb")
+    holder = subprocess.Popen(
+        [sys.executable, "-c",
+         "import sys, duckdb; conn = duckdb.connect(sys.argv[1]); "
+         "conn.execute('CREATE TABLE t AS SELECT 1 AS x'); print('ready', flush=True); sys.stdin.read()", path],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "ready"
+        with pytest.raises(duckdb.IOException, match="lock"):
+            DuckDBManager(path, read_only=True)
+    finally:
+        holder.stdin.close()
+        holder.wait(timeout=30)
+
+    reader = DuckDBManager(path, read_only=True)
+    assert reader.fetch("SELECT x FROM t") == (["x"], [(1,)])
+    reader.close()
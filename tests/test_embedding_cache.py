@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.embeddings import Embeddings
+from app.rag_utils.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_repeated_texts_are_served_from_disk(tmp_path):
+    underlying = CountingEmbeddings()
+    cache = CachedEmbeddings(underlying, "test-model", cache_dir=str(tmp_path))
+
+    first = cache.embed_documents(["leave policy", "Q3 spend"])
+    second = cache.embed_documents(["Q3 spend", "leave policy"])
+    assert second == first[::-1]
+    assert underlying.calls == 2
+    assert cache.stats()["hits"] == 2
+
+    # A fresh process (new wrapper) reuses the persisted vectors
+    reopened = CachedEmbeddings(underlying, "test-model", cache_dir=str(tmp_path))
+    assert reopened.embed_query("leave policy") == first[0]
+    assert underlying.calls == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    underlying = CountingEmbeddings()
+    cache = CachedEmbeddings(underlying, "tiny", cache_dir=str(tmp_path), max_mb=0)
+    cache.store.max_bytes = 2 * 3 * 4   # room for two 3-dim vectors
+
+    cache.embed_documents(["a", "bb"])
+    cache.embed_documents(["a"])        # "bb" is now least recently used
+    cache.embed_documents(["ccc"])
+    assert cache.stats()["entries"] == 2
+
+    calls = underlying.calls
+    cache.embed_documents(["a"])
+    assert underlying.calls == calls
+    cache.embed_documents(["bb"])
+    assert underlying.calls == calls + 1
+
+
+def test_async_lookups_run_off_the_event_loop(tmp_path):
+    import asyncio
+    import threading
+
+    cache = CachedEmbeddings(CountingEmbeddings(), "test-model", cache_dir=str(tmp_path))
+    cache.embed_documents(["leave policy"])
+    threads = []
+    get_many = cache.store.get_many
+
+    def recording_get_many(keys):
+        threads.append(threading.current_thread())
+        return get_many(keys)
+
+    cache.store.get_many = recording_get_many
+    assert asyncio.run(cache.aembed_query("leave policy")) == cache.embed_query("leave policy")
+    assert threads[0] is not threading.main_thread()
@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from app.rag_utils import embedding_pipeline
+from app.rag_utils.embedding_pipeline import batch_by_tokens, call_with_backoff, run_embedding_pipeline
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def test_batches_respect_token_budget(monkeypatch):
+    monkeypatch.setattr(embedding_pipeline, "count_tokens", len)
+    batches = batch_by_tokens(["aaaa", "bbbb", "cc", "dddddd"], max_tokens=8)
+    assert batches == [["aaaa", "bbbb"], ["cc", "dddddd"]]
+
+
+def test_rate_limits_are_retried(monkeypatch):
+    monkeypatch.setattr(embedding_pipeline.time, "sleep", lambda s: None)
+    attempts = []
+
+    def flaky(texts):
+        attempts.append(texts)
+        if len(attempts) < 3:
+            raise RateLimited()
+        return [[1.0]] * len(texts)
+
+    assert call_with_backoff(flaky, ["a"]) == [[1.0]]
+    assert len(attempts) == 3
+
+
+def test_failed_run_keeps_committed_batches():
+    committed = []
+
+    def embed(texts):
+        if texts == ["bad"]:
+            raise ValueError("boom")
+        return [[0.0]] * len(texts)
+
+    with pytest.raises(ValueError):
+        run_embedding_pipeline([["a"], ["bad"], ["b"]], embed, lambda i, v: committed.append(i), concurrency=1)
+    assert 0 in committed
+
+
+def test_embed_chunks_writes_the_pipeline_vectors(monkeypatch, tmp_path):
+    import sqlite3
+    from langchain_core.documents import Document
+    from app.rag_utils import rag_module
+    from app.rag_utils.numpy_store import NumpyVectorStore
+
+    calls = []
+
+    def embed(texts):
+        calls.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    store = NumpyVectorStore(embedding_function=None, persist_directory=str(tmp_path / "store"))
+    monkeypatch.setattr(rag_module, "vectorstore", store)
+    monkeypatch.setattr(embedding_pipeline, "count_tokens", len)
+    monkeypatch.setattr(store, "_embedding", type("E", (), {"embed_documents": staticmethod(embed)})())
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE chunk_manifest (filepath TEXT, chunk_id TEXT, PRIMARY KEY (filepath, chunk_id))")
+    chunks = [Document(page_content=text, metadata={"role": "hr", "source": "a.md"}) for text in ("leave", "pay")]
+    rag_module.embed_chunks(conn.cursor(), [("a.md", f"id{i}", chunk) for i, chunk in enumerate(chunks)])
+
+    assert sorted(calls) == ["leave", "pay"]      # each chunk embedded once, by the pipeline
+    assert sorted(store.get(include=[])["ids"]) == ["id0", "id1"]
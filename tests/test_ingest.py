@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import duckdb
+from app.rag_utils.ingest import ingest_csv_to_duckdb
+
+
+def relation_kind(conn, name):
+    return conn.execute("SELECT table_type FROM information_schema.tables WHERE table_name = ?", [name]).fetchone()[0]
+
+
+def test_parquet_storage_switches_between_view_and_table(tmp_path):
+    csv = tmp_path / "sales.csv"
+    csv.write_text("region,amount\nNorth,10\nSouth,20\n")
+    parquet_dir = tmp_path / "parquet"
+    conn = duckdb.connect(str(tmp_path / "db.duckdb"))
+
+    assert ingest_csv_to_duckdb(conn, str(csv), "sales", storage="table", parquet_dir=str(parquet_dir)) == ["region", "amount"]
+    assert relation_kind(conn, "sales") == "BASE TABLE"
+
+    headers = ingest_csv_to_duckdb(conn, str(csv), "sales", storage="parquet", parquet_dir=str(parquet_dir))
+    assert headers == ["region", "amount"]
+    assert relation_kind(conn, "sales") == "VIEW"
+    assert (parquet_dir / "sales.parquet").exists()
+    assert conn.execute("SELECT SUM(amount) FROM sales").fetchone()[0] == 30
+
+    ingest_csv_to_duckdb(conn, str(csv), "sales", storage="table", parquet_dir=str(parquet_dir))
+    assert relation_kind(conn, "sales") == "BASE TABLE"
+    assert not (parquet_dir / "sales.parquet").exists()
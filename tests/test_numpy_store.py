@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+from app.rag_utils.numpy_store import NumpyVectorStore
+from conftest import fill
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8", "binary"])
+def test_role_filtered_search_and_reopen(tmp_path, dtype, keyword_embeddings):
+    store = NumpyVectorStore(keyword_embeddings, persist_directory=str(tmp_path), dtype=dtype)
+    fill(store)
+
+    top = store.similarity_search("revenue", k=1)
+    assert top[0].metadata["source"] in ("q3.md", "mkt.md")
+    hits = store.similarity_search("revenue", k=3, filter={"role": {"$in": ["marketing", "general"]}})
+    assert [d.metadata["source"] for d in hits] == ["mkt.md", "handbook.md"]
+    assert store.similarity_search("revenue", k=2, filter={"role": "general"})[0].metadata["source"] == "handbook.md"
+
+    # Retriever interface used by get_rag_chain
+    retriever = store.as_retriever(search_kwargs={"k": 1, "filter": {"role": {"$in": ["finance", "general"]}}})
+    assert retriever.invoke("revenue")[0].page_content == "Q3 revenue grew 12%"
+
+    store.delete(ids=["b"])
+    reopened = NumpyVectorStore(keyword_embeddings, persist_directory=str(tmp_path))
+    assert reopened.dtype == dtype
+    assert reopened.count() == 2
+    assert reopened.similarity_search("revenue", k=1, filter={"role": "finance"}) == []
+    assert reopened.get(where={"$and": [{"source": "mkt.md"}, {"role": "marketing"}]}, include=[])["ids"] == ["c"]
+
+
+def test_re_adding_an_id_replaces_it(tmp_path, keyword_embeddings):
+    store = NumpyVectorStore(keyword_embeddings, persist_directory=str(tmp_path))
+    fill(store)
+    store.add_texts(["Leave policy updated"], [{"role": "general", "source": "handbook.md"}], ids=["a"])
+    assert store.count() == 3
+    assert store.get(ids=["a"])["documents"] == ["Leave policy updated"]
+
+
+def test_truncated_binary_index_rescored_at_full_precision(tmp_path, keyword_embeddings):
+    store = NumpyVectorStore(keyword_embeddings, persist_directory=str(tmp_path), dtype="binary", dims=3,
+                             rescore="float32")
+    fill(store)
+    assert (tmp_path / "vectors.bits").stat().st_size < (tmp_path / "rescore.f32").stat().st_size
+
+    reopened = NumpyVectorStore(keyword_embeddings, persist_directory=str(tmp_path))
+    assert (reopened.dtype, reopened.index_dims, reopened.rescore) == ("binary", 3, "float32")
+    (doc, score), = reopened.similarity_search_with_score("revenue", k=1)
+    assert doc.metadata["source"] == "q3.md"
+    assert score == pytest.approx(1.0)    # exact cosine of identical vectors, not the bit estimate
+    hits = reopened.similarity_search("campaign revenue", k=3, filter={"role": {"$in": ["marketing", "general"]}})
+    assert [d.metadata["source"] for d in hits] == ["mkt.md", "handbook.md"]
+
+
+def test_missing_or_stale_masks_are_rebuilt(tmp_path, keyword_embeddings):
+    store = NumpyVectorStore(keyword_embeddings, persist_directory=str(tmp_path))
+    fill(store)
+    (tmp_path / "masks.npz").unlink()
+    reopened = NumpyVectorStore(keyword_embeddings, persist_directory=str(tmp_path))
+    assert [d.metadata["source"] for d in reopened.similarity_search("revenue", k=3, filter={"role": "finance"})] == ["q3.md"]
+
+
+def test_popcount_lookup_table_matches_bitwise_count():
+    from app.rag_utils import numpy_store
+
+    bits = np.random.default_rng(0).integers(0, 256, (5, 24), dtype=np.uint8)
+    expected = np.unpackbits(bits, axis=1).sum(axis=1)
+    assert (numpy_store._popcount_rows(bits) == expected).all()
+    assert (numpy_store._POPCOUNT[bits].sum(axis=1) == expected).all()
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from app.rag_utils.partitioned_store import PartitionedVectorStore
+from conftest import fill
+
+
+@pytest.mark.parametrize("backend", ["chroma", "numpy"])
+def test_each_role_gets_its_own_partition(tmp_path, backend, keyword_embeddings):
+    store = PartitionedVectorStore(keyword_embeddings, backend=backend, persist_directory=str(tmp_path))
+    fill(store)
+    assert store.roles() == ["finance", "general", "marketing"]
+    assert store.get(where={"role": "finance"}, include=[])["ids"] == ["b"]
+
+    # Department user: own partition + general only
+    retriever = store.as_retriever(search_kwargs={"k": 3, "filter": {"role": {"$in": ["marketing", "general"]}}})
+    assert [d.metadata["source"] for d in retriever.invoke("revenue")] == ["mkt.md", "handbook.md"]
+    # C-Level: no filter, every partition merged by score
+    assert {d.metadata["source"] for d in store.similarity_search("revenue", k=2)} == {"q3.md", "mkt.md"}
+    assert store.similarity_search("revenue", k=1, filter={"role": "hr"}) == []
+
+    store.delete(ids=["b"])
+    reopened = PartitionedVectorStore(keyword_embeddings, backend=backend, persist_directory=str(tmp_path))
+    assert reopened.roles() == ["finance", "general", "marketing"]
+    assert reopened.count() == 2
+    assert sorted(reopened.get(include=[])["ids"]) == ["a", "c"]
+    assert reopened.get(where={"$and": [{"source": "mkt.md"}, {"role": "marketing"}]}, include=[])["ids"] == ["c"]
+
+
+def test_chunks_without_a_role_are_rejected(tmp_path, keyword_embeddings):
+    store = PartitionedVectorStore(keyword_embeddings, backend="numpy", persist_directory=str(tmp_path))
+    with pytest.raises(ValueError):
+        store.add_texts(["orphan"], [{"source": "x.md"}], ids=["x"])
+
+
+def test_roles_that_sanitize_alike_get_separate_collections(tmp_path, keyword_embeddings):
+    store = PartitionedVectorStore(keyword_embeddings, backend="chroma", persist_directory=str(tmp_path))
+    store.add_texts(["R&D revenue plan"], [{"role": "r&d", "source": "rd.md"}], ids=["rd"])
+    store.add_texts(["R_D revenue notes"], [{"role": "r_d", "source": "r_d.md"}], ids=["r_d"])
+
+    reopened = PartitionedVectorStore(keyword_embeddings, backend="chroma", persist_directory=str(tmp_path))
+    assert reopened.roles() == ["r&d", "r_d"]
+    hits = reopened.similarity_search("revenue", k=5, filter={"role": {"$in": ["r_d", "general"]}})
+    assert [d.metadata["source"] for d in hits] == ["r_d.md"]
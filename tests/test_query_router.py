@@ -0,0 +1,87 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import duckdb
+from app.rag_utils.query_router import QueryRouter
+
+HR_CSV = Path(__file__).resolve().parent.parent / "resources" / "data" / "hr" / "hr_data.csv"
+
+
+def make_router(llm_answer=None):
+    calls = []
+
+    def llm(question):
+        calls.append(question)
+        return llm_answer
+
+    duck = duckdb.connect()
+    duck.execute(f"CREATE TABLE hr_data AS SELECT * FROM read_csv_auto('{HR_CSV}')")
+    duck.execute("CREATE TABLE tables_metadata AS SELECT 'hr_data' AS table_name, 'HR' AS role")
+    router = QueryRouter(llm_fallback=llm if llm_answer else None, confidence=0.8, use_llm=bool(llm_answer))
+    router.refresh_schema(duck)
+    return router, calls
+
+
+def test_confident_questions_stay_local():
+    router, calls = make_router(llm_answer="SQL")
+
+    sql = router.route("What is the average salary per department?")
+    rag = router.route("Summarize the company's leave policy")
+    assert (sql["mode"], sql["source"]) == ("SQL", "rules")
+    assert (rag["mode"], rag["source"]) == ("RAG", "rules")
+    assert calls == []
+
+
+def test_schema_columns_count_as_sql_evidence():
+    router, _ = make_router()
+    assert router.route("Which employees have a leave balance under 5?")["mode"] == "SQL"
+    assert router._score("What is the leave balance of Aadhya Patel?") > router._score("What is the mission of FinSolve?")
+
+
+def test_low_confidence_falls_back_to_llm():
+    router, calls = make_router(llm_answer="RAG")
+
+    route = router.route("What was the total revenue in 2024?")
+    assert route["source"] == "llm"
+    assert route["mode"] == "RAG"
+    assert calls == ["What was the total revenue in 2024?"]
+    assert router.stats()["llm"] == 1
+
+
+def test_async_route_awaits_llm_fallback():
+    import asyncio
+
+    router, _ = make_router()
+    calls = []
+
+    async def allm(question):
+        calls.append(question)
+        return "SQL"
+
+    router.use_llm = True
+    router.allm_fallback = allm
+    route = asyncio.run(router.aroute("What was the total revenue in 2024?"))
+    assert (route["mode"], route["source"]) == ("SQL", "llm")
+    assert calls == ["What was the total revenue in 2024?"]
+
+
+def test_sync_and_async_routes_agree():
+    import asyncio
+
+    router, _ = make_router()
+
+    def failing_llm(question):
+        raise RuntimeError("LLM down")
+
+    async def afailing_llm(question):
+        failing_llm(question)
+
+    router.use_llm = True
+    router.llm_fallback = failing_llm
+    router.allm_fallback = afailing_llm
+    for question in ["What is the average salary per department?", "What was the total revenue in 2024?"]:
+        assert router.route(question) == asyncio.run(router.aroute(question))
+    assert router.stats()["rules"] == 4 and router.stats()["llm"] == 0
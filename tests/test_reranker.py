@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.documents import Document
+from app.rag_utils.reranker import LocalReranker
+
+
+def docs(*texts):
+    return [Document(page_content=t, metadata={"source": f"doc{i}.md"}) for i, t in enumerate(texts)]
+
+
+def test_mmr_skips_near_duplicates(keyword_embeddings):
+    candidates = docs("Annual leave: 20 days of leave",
+                      "Annual leave: 20 days of leave per year",
+                      "Sick leave and revenue policy",
+                      "Q3 revenue grew 12%")
+    reranked = LocalReranker(embeddings=keyword_embeddings, top_n=2, mmr_lambda=0.5).compress_documents(
+        candidates, "How many days of annual leave?")
+    assert reranked[0].page_content.startswith("Annual leave")
+    # The second pick is not the duplicate of the first
+    assert not reranked[1].page_content.startswith("Annual leave")
+
+
+def test_lexical_only_ranks_exact_terms_first():
+    candidates = docs("Employee FINEMP1007 rating 3", "Employee FINEMP1006 rating 4", "Leave policy")
+    reranked = LocalReranker(top_n=1).compress_documents(candidates, "rating of FINEMP1006")
+    assert [d.page_content for d in reranked] == ["Employee FINEMP1006 rating 4"]
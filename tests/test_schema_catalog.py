@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import duckdb
+from app.rag_utils.schema_catalog import SchemaCatalog
+
+HR_CSV = Path(__file__).resolve().parent.parent / "resources" / "data" / "hr" / "hr_data.csv"
+
+
+def make_catalog():
+    duck = duckdb.connect()
+    duck.execute(f"CREATE TABLE hr_data AS SELECT * FROM read_csv_auto('{HR_CSV}')")
+    duck.execute("CREATE TABLE finance_ledger AS SELECT 1 AS entry_id, 250.0 AS amount")
+
+    def fetch(sql, params=None):
+        cur = duck.execute(sql, params or [])
+        return [d[0] for d in cur.description], cur.fetchall()
+
+    return duck, SchemaCatalog(fetch)
+
+
+def test_schema_block_has_types_and_stats_for_allowed_tables_only():
+    _, catalog = make_catalog()
+    block = catalog.schema_block(["hr_data"])
+
+    assert "Table: hr_data (100 rows)" in block
+    assert "salary DOUBLE (range" in block
+    assert "performance_rating BIGINT (range 1 .. 5" in block
+    assert "finance_ledger" not in block
+    assert catalog.schema_block(["missing_table"]) == ""
+
+
+def test_schema_is_cached_until_invalidated():
+    duck, catalog = make_catalog()
+    catalog.schema_block(["hr_data", "finance_ledger"])
+    catalog.schema_block(["hr_data"])
+    assert catalog.builds == 2
+
+    duck.execute("CREATE OR REPLACE TABLE finance_ledger AS SELECT 1 AS entry_id, 'Q1' AS quarter")
+    version = catalog.version
+    catalog.invalidate("finance_ledger")
+    assert catalog.version == version + 1
+    assert "quarter VARCHAR" in catalog.schema_block(["finance_ledger"])
+    assert catalog.builds == 3
+
+
+def test_known_values_of_low_cardinality_columns():
+    duck, catalog = make_catalog()
+    assert "Pune" in catalog.known_values("hr_data", "location")
+    assert "Mumbai" not in catalog.known_values("hr_data", "department")
+    assert catalog.known_values("hr_data", "no_such_column") is None
+
+    assert catalog.known_values("finance_ledger", "quarter") is None
+    duck.execute("CREATE OR REPLACE TABLE finance_ledger AS SELECT 'Q1' AS quarter")
+    assert catalog.known_values("finance_ledger", "quarter") is None   # cached until the table is invalidated
+    catalog.invalidate("finance_ledger")
+    assert catalog.known_values("finance_ledger", "quarter") == {"Q1"}
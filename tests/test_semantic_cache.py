@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+from langchain_core.embeddings import Embeddings
+from app.rag_utils.semantic_cache import SemanticCache
+
+VECTORS = {
+    "how many leave days do i get": [1.0, 0.1, 0.0],
+    "annual leave entitlement": [0.98, 0.12, 0.02],
+    "q3 marketing spend": [0.0, 0.2, 1.0],
+}
+
+
+class FixedEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [VECTORS[t] for t in texts]
+
+    def embed_query(self, text):
+        return VECTORS[text]
+
+
+def lookup(cache, role, question, version=1):
+    return asyncio.run(cache.lookup(role, question, version))
+
+
+def test_paraphrase_hits_within_role_only():
+    cache = SemanticCache(FixedEmbeddings(), threshold=0.95, capacity=4, enabled=True)
+    _, _, vec = lookup(cache, "hr", "how many leave days do i get")
+    cache.store("hr", "how many leave days do i get", 1, {"answer": "24 days"}, latency=2.0, vector=vec)
+
+    response, similarity, _ = lookup(cache, "hr", "annual leave entitlement")
+    assert response == {"answer": "24 days"} and similarity > 0.95
+    assert lookup(cache, "finance", "annual leave entitlement")[0] is None
+    assert lookup(cache, "hr", "q3 marketing spend")[0] is None
+    assert cache.stats()["latency_saved_s"] > 0
+
+
+def test_new_index_version_invalidates_entries():
+    cache = SemanticCache(FixedEmbeddings(), threshold=0.95, capacity=4, enabled=True)
+    _, _, vec = lookup(cache, "hr", "how many leave days do i get")
+    cache.store("hr", "how many leave days do i get", 1, {"answer": "24 days"}, latency=1.0, vector=vec)
+    assert lookup(cache, "hr", "annual leave entitlement", version=2)[0] is None
+
+
+def test_capacity_evicts_least_recently_used():
+    cache = SemanticCache(FixedEmbeddings(), threshold=0.99, capacity=1, enabled=True)
+    for question in ("how many leave days do i get", "q3 marketing spend"):
+        _, _, vec = lookup(cache, "hr", question)
+        cache.store("hr", question, 1, {"answer": question}, latency=1.0, vector=vec)
+    assert cache.stats()["entries"] == 1
+    assert lookup(cache, "hr", "q3 marketing spend")[0] == {"answer": "q3 marketing spend"}
+
+
+def test_sql_answers_are_not_stored():
+    cache = SemanticCache(FixedEmbeddings(), threshold=0.95, capacity=4, enabled=True)
+    _, _, vec = lookup(cache, "hr", "how many leave days do i get")
+    cache.store("hr", "how many leave days do i get", 1, {"answer": "| 24 |", "mode": "SQL"}, latency=2.0, vector=vec)
+    cache.store("hr", "how many leave days do i get", 1, {"answer": "24 days", "mode": "SQL → fallback to RAG"},
+                latency=2.0, vector=vec)
+    assert lookup(cache, "hr", "annual leave entitlement")[0] is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.auth_utils.session_tokens import issue_token, verify_token, revoke_token
+
+
+def test_token_round_trip():
+    claims = verify_token(issue_token("tony", "engineering"))
+    assert claims["sub"] == "tony"
+    assert claims["role"] == "engineering"
+
+
+def test_tampered_token_is_rejected():
+    payload, signature = issue_token("tony", "engineering").split(".")
+    forged = issue_token("tony", "C-Level").split(".")[0]
+    assert verify_token(f"{forged}.{signature}") is None
+    assert verify_token("not-a-token") is None
+    assert verify_token("päyload.sig") is None
+    assert verify_token("payload.sïg") is None
+
+
+def test_expired_token_is_rejected():
+    assert verify_token(issue_token("tony", "engineering", ttl=-1)) is None
+
+
+def test_revoked_token_is_rejected():
+    token = issue_token("tony", "engineering")
+    assert revoke_token(token)
+    assert verify_token(token) is None
+    assert not revoke_token(token)
@@ -0,0 +1,97 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+from unittest.mock import patch, AsyncMock
+from app.rag_utils.sql_cache import SqlCache, SqlTemplate
+
+
+def test_template_swaps_literals_from_the_question():
+    template = SqlTemplate.learn(
+        "List the top 5 employees in Marketing by salary",
+        "SELECT full_name FROM hr_data WHERE department = 'Marketing' ORDER BY salary DESC LIMIT 5",
+    )
+    assert template.sql == "SELECT full_name FROM hr_data WHERE department = ? ORDER BY salary DESC LIMIT ?"
+    assert template.match("list the top 3 employees in Quality Assurance by salary?") == ["Quality Assurance", 3]
+    assert template.string_filters(["Quality Assurance", 3]) == [("department", "Quality Assurance")]
+    assert template.match("List the top 5 employees in Marketing by age") is None
+    assert SqlTemplate.learn("How many employees are there?", "SELECT COUNT(*) FROM hr_data") is None
+
+
+def test_exact_and_template_hits_are_scoped_by_role_and_schema_version():
+    cache = SqlCache(enabled=True, templates=True)
+    sql = "SELECT AVG(salary) FROM hr_data WHERE department = 'Finance'"
+    cache.store("HR", "Average salary in Finance?", 1, sql, returned_rows=True)
+
+    assert cache.lookup("hr", "average salary in finance", 1) == (sql, None, None)
+    templated_sql, params, template = cache.lookup("HR", "Average salary in Sales", 1)
+    assert templated_sql.endswith("department = ?") and params == ["Sales"]
+
+    assert cache.lookup("Finance", "Average salary in Sales", 1) is None
+    assert cache.lookup("HR", "Average salary in Sales", 2) is None
+
+    cache.reject(template)
+    stats = cache.stats()
+    assert stats["templates"][0]["fallbacks"] == 1
+    assert stats["template_hits"] == 0
+
+
+def test_ask_csv_runs_templates_without_the_llm():
+    from app.rag_utils import csv_query
+
+    generated = AsyncMock(return_value="SELECT COUNT(*) AS n FROM hr_data WHERE location = 'Mumbai'")
+    with patch.object(csv_query, "sql_cache", SqlCache(enabled=True, templates=True)), \
+            patch.object(csv_query, "translate_nl_to_sql", generated):
+        first = asyncio.run(csv_query.ask_csv("How many employees work in Mumbai?", "C-Level", "admin", return_sql=True))
+        second = asyncio.run(csv_query.ask_csv("How many employees work in Pune?", "C-Level", "admin", return_sql=True))
+
+    assert not first.get("error") and not second.get("error")
+    assert generated.call_count == 1
+    assert second["sql_params"] == ["Pune"]
+
+
+def test_template_slot_rejects_values_from_another_column():
+    from app.rag_utils import csv_query
+
+    generated = AsyncMock(side_effect=[
+        "SELECT COUNT(*) AS n FROM hr_data WHERE department = 'Finance'",
+        "SELECT COUNT(*) AS n FROM hr_data WHERE location = 'Mumbai'",
+    ])
+    with patch.object(csv_query, "sql_cache", SqlCache(enabled=True, templates=True)), \
+            patch.object(csv_query, "translate_nl_to_sql", generated):
+        asyncio.run(csv_query.ask_csv("How many employees are in Finance?", "C-Level", "admin"))
+        second = asyncio.run(csv_query.ask_csv("How many employees are in Mumbai?", "C-Level", "admin",
+                                               return_sql=True))
+
+    # "Mumbai" is a location, not a department: the template is skipped and the LLM translates
+    assert generated.call_count == 2
+    assert "location" in second["sql"] and "sql_params" not in second
+
+
+def test_zero_count_is_an_empty_answer():
+    import pyarrow as pa
+    from app.rag_utils.csv_query import is_empty_answer
+
+    assert is_empty_answer({"arrow": pa.table({"count_star()": [0]})})
+    assert is_empty_answer({"arrow": pa.table({"avg": [None]})})
+    assert not is_empty_answer({"arrow": pa.table({"n": [12]})})
+    assert not is_empty_answer({"arrow": pa.table({"name": ["a", "b"], "n": [0, 0]})})
+
+
+def test_cached_sql_wins_over_speculative_sql():
+    from app.rag_utils import csv_query
+
+    cache = SqlCache(enabled=True, templates=True)
+    cache.store("C-Level", "How many employees work in Mumbai?", csv_query.schema_catalog.version,
+                "SELECT COUNT(*) AS n FROM hr_data WHERE location = 'Mumbai'", returned_rows=True)
+    assert cache.covers("C-Level", "How many employees work in Pune?", csv_query.schema_catalog.version)
+    assert not cache.covers("C-Level", "Average salary by department?", csv_query.schema_catalog.version)
+    assert cache.template_lookups == 0
+
+    with patch.object(csv_query, "sql_cache", cache):
+        result = asyncio.run(csv_query.ask_csv("How many employees work in Pune?", "C-Level", "admin",
+                                               return_sql=True, sql="SELECT 'speculative' AS n"))
+    assert result["sql_params"] == ["Pune"]
@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+# Add root directory to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+import functools
+import duckdb
+import pytest
+from unittest.mock import patch
+from app.rag_utils.sql_results import fetch_page, columnar_json, markdown_preview, QueryTimeout
+
+
+@pytest.fixture
+def duck():
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE big AS SELECT range AS id, 'row ' || range AS label FROM range(50000)")
+    return conn
+
+
+def test_rows_are_capped_and_paged(duck):
+    page = fetch_page(duck, "SELECT * FROM big ORDER BY id", max_rows=1000)
+    assert page["arrow"].num_rows == 1000
+    assert page["truncated"] is True
+
+    table = columnar_json(page, next_cursor="abc")
+    assert table["columns"][0] == {"name": "id", "type": "int64"}
+    assert table["data"]["id"][:3] == [0, 1, 2]
+
+    last = fetch_page(duck, "SELECT * FROM big ORDER BY id;", offset=49500, max_rows=1000)
+    assert last["arrow"].num_rows == 500
+    assert last["truncated"] is False
+    assert last["arrow"].column("id")[0].as_py() == 49500
+
+
+def test_byte_cap_and_preview(duck):
+    page = fetch_page(duck, "SELECT * FROM big", max_rows=50000, max_bytes=64 * 1024)
+    assert page["truncated"] is True
+    assert 0 < page["bytes"] <= 64 * 1024
+
+    preview = markdown_preview(page, rows=5)
+    assert preview.count("\n") < 12
+    assert "more rows available" in preview
+
+
+def test_a_row_larger_than_the_byte_cap_still_makes_progress(duck):
+    sql = "SELECT id, repeat('x', 10000) AS blob FROM big WHERE id < 3 ORDER BY id"
+    page = fetch_page(duck, sql, max_bytes=1000)
+    assert page["arrow"].num_rows == 1 and page["truncated"] is True
+    assert fetch_page(duck, sql, offset=1, max_bytes=1000)["arrow"].column("id")[0].as_py() == 1
+
+
+def test_trailing_comments_and_semicolons(duck):
+    for sql in ["SELECT id FROM big WHERE id < 3 -- first three",
+                "SELECT id FROM big WHERE id < 3; -- first three\n",
+                "SELECT id FROM big WHERE id < 3 /* first three */;",
+                "SELECT '--;' AS label FROM big WHERE id < 3"]:
+        assert fetch_page(duck, sql)["arrow"].num_rows == 3
+
+
+def test_long_queries_are_interrupted(duck):
+    with pytest.raises(QueryTimeout):
+        fetch_page(duck, "SELECT count(*) FROM range(100000000000)", timeout=0.2)
+
+
+def test_ask_csv_returns_table_and_cursor_for_next_page():
+    from app.rag_utils import csv_query
+
+    small_pages = functools.partial(fetch_page, max_rows=30)
+    with patch.object(csv_query, "fetch_page", small_pages):
+        first = asyncio.run(csv_query.ask_csv("all employees", "C-Level", "admin",
+                                              sql="SELECT employee_id FROM hr_data ORDER BY employee_id"))
+        cursor = first["table"]["next_cursor"]
+        assert first["table"]["row_count"] == 30 and cursor
+
+        assert asyncio.run(csv_query.fetch_sql_page(cursor, "HR")) is None   # cursors are bound to the role
+        second = asyncio.run(csv_query.fetch_sql_page(cursor, "C-Level"))
+
+    assert second["table"]["offset"] == 30
+    assert second["table"]["data"]["employee_id"][0] == "FINEMP1030"